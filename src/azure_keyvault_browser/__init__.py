@@ -4,7 +4,7 @@ if (sys.version_info[0], sys.version_info[1]) < (3, 7):
     sys.exit("azure-keyvault-browser requires Python 3.7 or later.")
 
 try:
-    import importlib.metadata
+    import importlib.metadata  # novermin
 
     __version__ = importlib.metadata.version("azure_keyvault_browser")
 except ModuleNotFoundError:
@@ -1,19 +1,32 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Any, MutableMapping
+import asyncio
+import os
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, MutableMapping, Sequence
 
-import click
+from azure.core.exceptions import AzureError
 from azure.keyvault.secrets import SecretProperties
-from click import Path
 from textual.app import App
 from textual.keys import Keys
 from textual.reactive import Reactive
 from textual.widget import Widget
 
-from . import __version__
-from .azure import KeyVault
-from .config import CLI_HELP, get_config
+from .azure import SecretBackend
+from .backend import MetricsLayer, find_layer, open_backend
+from .commands.options import write_record
+from .config import REPORT_DIR, get_config
+from .daemon_client import DaemonClient
+from .dataset import Dataset
+from .history import AccessHistory, prefetch_versions
+from .hygiene import HygieneScanner
+from .names import NameIndex
+from .scheduler import FrameScheduler
+from .timeline import AS_OF_PREFIX, VaultTimeline
+from .value_cache import CacheKeyException, ValueCache, get_cache_key
+from .value_search import VALUE_SEARCH_PREFIX, ValueIndex
+from .watchdog import LoopWatchdog
 from .widgets import (
     FilterWidget,
     FlashWidget,
@@ -24,37 +37,96 @@ from .widgets import (
     SecretVersionsWidget,
     ShowFlashNotification,
 )
+from .widgets.flash import FlashMessageType
 
 
 class KeyVaultBrowser(App):
 
     config_path: str | None = None
+    debug: bool = False
+    watchdog: LoopWatchdog | None = None
+    value_search: bool = False
+    value_index: ValueIndex | None = None
+    value_index_task: asyncio.Future | None = None
+    value_index_generation: int = 0
+    use_value_cache: bool = False
+    value_cache: ValueCache | None = None
+    value_cache_error: str = ""
     config: MutableMapping[str, Any]
-    client: KeyVault
-    reveal_secret_value: Reactive[bool] = Reactive(False)
-    show_help: Reactive[bool] = Reactive(False)
-    selected_version: Reactive[SecretProperties] = Reactive(None)
-    selected_secret: Reactive[str] = Reactive("")
-    searchable_nodes: Reactive[list[SecretProperties]] = Reactive([])
-    search_result: Reactive[list[str]] = Reactive([])
+    client: SecretBackend
+    daemon: DaemonClient | None = None
+    history: AccessHistory | None = None
+    pinned: list[str] = []
+    prefetched: dict[str, list[SecretProperties]] = {}
+    prefetch_task: asyncio.Future | None = None
+    name_index: NameIndex | None = None
+    name_index_generation: int = 0
+    name_index_task: asyncio.Future | None = None
+    daemon_task: asyncio.Future | None = None
+    as_of: datetime | None = None
+    timeline: VaultTimeline | None = None
+    timeline_loading: asyncio.Future[VaultTimeline] | None = None
+    travel_task: asyncio.Future | None = None
+    reveal_secret_value: Reactive[bool] = Reactive(False, repaint=False)
+    show_help: Reactive[bool] = Reactive(False, repaint=False)
+    selected_version: Reactive[SecretProperties] = Reactive(None, repaint=False)
+    selected_secret: Reactive[str] = Reactive("", repaint=False)
+    dataset: Dataset
+    dataset_generation: Reactive[int] = Reactive(0, repaint=False)
+    search_result: Reactive[Sequence[str]] = Reactive([], repaint=False)
     widget_deque: deque[Widget] = deque([])
+    frames: FrameScheduler
 
     async def on_load(self) -> None:
         """Overrides on_load from App()"""
 
         self.config = get_config(self.config_path)
         keyvault = self.config["keyvault"]
-        self.client = KeyVault(vault_name=keyvault)
+        self.client = await open_backend(keyvault, self.config)
+        self.daemon = find_layer(self.client, DaemonClient)
+        if self.daemon is None:
+            # The daemon saves the names of the vaults it keeps warm itself.
+            self.name_index = NameIndex(keyvault)
+        self.frames = FrameScheduler(max_fps=self.config.get("max_fps", 30))
+        self.dataset = Dataset()
+        self.prefetched = {}
+
+        if self.config.get("access_history", True):
+            self.history = AccessHistory(keyvault)
+            self.history.load()
+            self.pinned = self.history.frecent(self.config.get("pinned_secrets", 10))
+
+        if self.value_search or self.config.get("value_search", False):
+            self.value_index = ValueIndex()
+
+        if self.use_value_cache or self.config.get("value_cache", False):
+            try:
+                self.value_cache = ValueCache(
+                    get_cache_key(),
+                    ttl=timedelta(hours=self.config.get("value_cache_ttl_hours", 24)),
+                    max_entries=self.config.get("value_cache_max_entries", 500),
+                )
+            except CacheKeyException as e:
+                self.value_cache_error = str(e)
 
         await self.bind("?", "toggle_help", "show help")
         await self.bind("ctrl+i", "cycle_widget('forward')", show=False)
         await self.bind("shift+tab", "cycle_widget('backward')", show=False)
         await self.bind(Keys.Escape, "refocus", show=False)
         await self.bind(Keys.ControlK, "toggle_search", show=False)
+        await self.bind(Keys.ControlE, "scan", "scan")
+        await self.bind(Keys.ControlX, "wipe_cache", "wipe cache")
 
     async def on_mount(self) -> None:
         """Overrides on_mount from App()"""
 
+        if self.debug:
+            self.watchdog = LoopWatchdog(
+                self.log,
+                threshold=self.config.get("watchdog_threshold_ms", 100) / 1000,
+            )
+            self.watchdog.start()
+
         await self.view.dock(HeaderWidget(), size=7)
 
         self.search = FilterWidget()
@@ -87,6 +159,277 @@ class KeyVaultBrowser(App):
 
         await self.app.set_focus(self.search)
 
+        if self.daemon is not None:
+            self.daemon_task = asyncio.ensure_future(self.follow_daemon(self.daemon))
+
+        if self.pinned:
+            self.prefetch_task = asyncio.ensure_future(self.prefetch(self.pinned))
+
+        if self.as_of is not None:
+            self.time_travel(self.as_of)
+
+        if self.value_cache_error:
+            await self.flash.update_flash_message(
+                type=FlashMessageType.WARNING,
+                value=f"The value cache is disabled. {self.value_cache_error}",
+            )
+
+    async def shutdown(self) -> None:
+        """Overrides shutdown from App() so that the watchdog totals are logged while the log is still open."""
+
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+        metrics = find_layer(self.client, MetricsLayer)
+        if metrics is not None:
+            self.log(metrics.summary())
+
+        await super().shutdown()
+
+    async def process_messages(self) -> None:
+        """Overrides process_messages from App() so that secret values never outlive the app."""
+
+        try:
+            await super().process_messages()
+        finally:
+            if self.daemon_task is not None:
+                self.daemon_task.cancel()
+            if self.prefetch_task is not None:
+                self.prefetch_task.cancel()
+            if self.travel_task is not None:
+                self.travel_task.cancel()
+            if self.timeline_loading is not None:
+                self.timeline_loading.cancel()
+            if self.history is not None:
+                self.history.save()
+            self.versions.cancel()
+            if self.value_index_task is not None:
+                self.value_index_task.cancel()
+            if self.value_index is not None:
+                self.value_index.wipe()
+            if self.value_cache is not None:
+                self.value_cache.close()
+
+    async def follow_daemon(self, client: DaemonClient) -> None:
+        """Apply the changes the daemon finds in the vault to the listed secrets.
+
+        Args:
+            client (DaemonClient): The client attached to the daemon.
+        """
+
+        try:
+            async for changes in client.watch():
+                if self.as_of is not None:
+                    # The vault is listed again when the browser returns to the present.
+                    continue
+                if changes.reset:
+                    self.dataset.reset(changes.added.values())
+                else:
+                    self.dataset.apply(
+                        added=changes.added.values(),
+                        removed=list(changes.removed),
+                        updated=changes.updated.values(),
+                    )
+                self.dataset_generation = self.dataset.generation
+        except AzureError:
+            await self.flash.update_flash_message(
+                type=FlashMessageType.WARNING,
+                value="Lost the connection to the daemon. Restart the browser to reconnect.",
+            )
+
+    async def prefetch(self, names: list[str]) -> None:
+        """Fetch the versions of the pinned secrets so that they show as soon as a pinned secret is opened.
+
+        Args:
+            names (list[str]): The names of the pinned secrets.
+        """
+
+        async for name, versions in prefetch_versions(
+            self.client, names, self.config.get("prefetch_concurrency", 4)
+        ):
+            self.prefetched[name] = versions
+
+    async def watch_dataset_generation(self, generation: int) -> None:
+        """Watch dataset_generation and keep the name and value indexes in step with the listed secrets.
+
+        Args:
+            generation (int): The generation of the dataset.
+        """
+
+        if self.as_of is not None:
+            # A snapshot of the past would drop the secrets created since from both indexes.
+            return
+
+        if self.name_index is not None:
+            changes = self.dataset.changes_since(self.name_index_generation)
+            self.name_index_generation = self.dataset.generation
+            if changes is None or changes.reset or changes.added or changes.removed:
+                names = [x.name for x in self.dataset if x.name]
+                self.name_index_task = asyncio.ensure_future(
+                    self.save_names(names, self.name_index_task)
+                )
+
+        if self.value_index is None:
+            return
+
+        changes = self.dataset.changes_since(self.value_index_generation)
+        self.value_index_generation = self.dataset.generation
+
+        if changes is None or self.value_index_task is None:
+            if self.value_index_task is not None:
+                self.value_index_task.cancel()
+            self.value_index.wipe()
+            nodes = list(self.dataset)
+        else:
+            # Updated secrets may have a new value, so their old one is dropped and the value is fetched again.
+            for name in [*changes.removed, *changes.updated]:
+                self.value_index.remove(name)
+            nodes = [*changes.added.values(), *changes.updated.values()]
+
+        if nodes:
+            self.value_index_task = asyncio.ensure_future(self.index_values(nodes))
+
+    def time_travel(self, when: datetime | None) -> None:
+        """Start showing the vault as it was at a moment, or as it is now.
+
+        Args:
+            when (datetime | None): The moment, or None for the present.
+        """
+
+        if self.travel_task is not None:
+            self.travel_task.cancel()
+        self.travel_task = asyncio.ensure_future(self.travel(when))
+
+    async def travel(self, when: datetime | None) -> None:
+        """Show the vault as it was at a moment, or as it is now.
+
+        The version histories of every secret are fetched the first time, after which any moment is shown at once.
+
+        Args:
+            when (datetime | None): The moment, or None for the present.
+        """
+
+        if when is None:
+            await self.return_to_present()
+            return
+
+        timeline = self.timeline
+        try:
+            if timeline is None:
+                if self.timeline_loading is None:
+                    self.timeline_loading = asyncio.ensure_future(self.load_timeline())
+                # Shielded, so that picking another moment while loading does not start the load again.
+                timeline = self.timeline = await asyncio.shield(self.timeline_loading)
+        except AzureError as e:
+            self.timeline_loading = None
+            self.log(f"Failed to load the version histories: {e}")
+            await self.flash.update_flash_message(
+                type=FlashMessageType.ERROR,
+                value="Unable to load the version histories of the vault.",
+            )
+            return
+
+        self.as_of = when
+        snapshot = timeline.snapshot(when)
+        self.dataset.reset(snapshot)
+        self.dataset_generation = self.dataset.generation
+        await self.flash.update_flash_message(
+            type=FlashMessageType.SUCCESS,
+            value=(
+                f"Showing {len(snapshot)} secrets as they were at {when.astimezone(timezone.utc):%Y-%m-%d %H:%M:%S} "
+                f"UTC. Search for {AS_OF_PREFIX}now to return to the present."
+            ),
+        )
+
+    async def return_to_present(self) -> None:
+        """List the vault again and show it as it is now."""
+
+        if self.as_of is None:
+            return
+
+        try:
+            secrets = await self.client.get_secrets()
+        except AzureError as e:
+            self.log(f"Failed to list the secrets: {e}")
+            await self.flash.update_flash_message(
+                type=FlashMessageType.ERROR, value="Unable to list the secrets."
+            )
+            return
+
+        self.as_of = None
+        self.dataset.reset(secrets)
+        self.dataset_generation = self.dataset.generation
+        await self.flash.update_flash_message(
+            type=FlashMessageType.INFO, value="Showing the vault as it is now."
+        )
+
+    async def load_timeline(self) -> VaultTimeline:
+        """Fetch the version history of every secret in the vault.
+
+        Returns:
+            VaultTimeline: The version intervals of every secret.
+        """
+
+        names = [x.name for x in await self.client.get_secrets() if x.name]
+        timeline = VaultTimeline()
+        concurrency = self.config.get("timeline_concurrency", 8)
+
+        async for _ in timeline.load(self.client, names, concurrency):
+            if len(timeline) % 50 == 0 or len(timeline) == len(names):
+                await self.flash.update_flash_message(
+                    type=FlashMessageType.INFO,
+                    value=f"Loading version histories... {len(timeline)} of {len(names)} secrets.",
+                )
+
+        return timeline
+
+    async def save_names(
+        self, names: list[str], previous: asyncio.Future | None = None
+    ) -> None:
+        """Save the listed names for shell completion, off the event loop.
+
+        Args:
+            names (list[str]): The names of the listed secrets.
+            previous (asyncio.Future | None): The previous save, which has to finish first so that an older listing
+                never replaces a newer one. Defaults to None.
+        """
+
+        assert self.name_index is not None
+        if previous is not None:
+            await asyncio.wait([previous])
+
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                None, self.name_index.write, names
+            )
+        except OSError as e:
+            self.log(f"Failed to save the secret names for completion: {e}")
+
+    async def index_values(self, nodes: list[SecretProperties]) -> None:
+        """Fetch and index secret values in memory.
+
+        Args:
+            nodes (list[SecretProperties]): The secrets to fetch values for.
+        """
+
+        assert self.value_index is not None
+        await self.flash.update_flash_message(
+            type=FlashMessageType.INFO, value="Indexing secret values in memory..."
+        )
+
+        count = await self.value_index.build(
+            self.client,
+            nodes,
+            rate=self.config.get("value_search_rate", 10),
+            concurrency=self.config.get("value_search_concurrency", 8),
+        )
+
+        await self.flash.update_flash_message(
+            type=FlashMessageType.SUCCESS,
+            value=f"{count} secret values indexed. Start a search with {VALUE_SEARCH_PREFIX} to search values.",
+        )
+
     async def watch_show_help(self, show_help: bool) -> None:
         """Watch show_help and update widget visibility.
 
@@ -98,8 +441,6 @@ class KeyVaultBrowser(App):
         if self.show_help:
             await self.app.set_focus(self.help)
 
-        self.refresh(layout=True)
-
     async def action_toggle_help(self) -> None:
         """Toggle the help widget."""
 
@@ -117,6 +458,49 @@ class KeyVaultBrowser(App):
         self.log("Handling ShowFlashNotification message")
         await self.flash.update_flash_message(value=message.value, type=message.type)
 
+    async def action_scan(self) -> None:
+        """Scan the listed secrets for hygiene problems and filter the table to the ones affected."""
+
+        vault = self.config["keyvault"]
+        findings = HygieneScanner().check_all(vault, self.dataset)
+
+        if not findings:
+            await self.flash.update_flash_message(
+                type=FlashMessageType.SUCCESS, value="No hygiene problems found."
+            )
+            return
+
+        if not os.path.exists(REPORT_DIR):
+            os.makedirs(REPORT_DIR)
+
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        path = f"{REPORT_DIR}/{vault}-scan-{timestamp}.ndjson"
+        with open(path, "w") as f:
+            for finding in findings:
+                write_record(f, finding.to_dict())
+
+        totals = Counter(x.type.value for x in findings)
+        summary = ", ".join(f"{v} {k}" for k, v in sorted(totals.items()))
+        self.search_result = sorted({x.name.lower() for x in findings})
+        await self.flash.update_flash_message(
+            type=FlashMessageType.WARNING, value=f"{summary}. Report written to {path}"
+        )
+
+    async def action_wipe_cache(self) -> None:
+        """Delete every value held in the value cache."""
+
+        if self.value_cache is None:
+            await self.flash.update_flash_message(
+                type=FlashMessageType.WARNING,
+                value="The value cache is not enabled. Start the browser with --value-cache to enable it.",
+            )
+            return
+
+        self.value_cache.wipe()
+        await self.flash.update_flash_message(
+            type=FlashMessageType.SUCCESS, value="Value cache wiped."
+        )
+
     async def action_cycle_widget(self, direction: str) -> None:
         """Cycle through the widgets.
 
@@ -133,7 +517,6 @@ class KeyVaultBrowser(App):
             current_widget = self.widget_deque[0]
 
         await self.set_focus(current_widget)
-        self.refresh(layout=True)
 
     async def action_refocus(self) -> None:
         """Refocus the app."""
@@ -145,42 +528,3 @@ class KeyVaultBrowser(App):
         else:
             await self.set_focus(self.search)
             self.show_help = False
-
-
-@click.command(help=CLI_HELP)
-@click.option(
-    "--config",
-    default=None,
-    envvar="AZURE_KEYVAULT_BROWSER_CONFIG",
-    type=Path(file_okay=True, dir_okay=False, exists=False, resolve_path=True),
-    help="Explicitly override the config that will be used by azure-keyvault-browser.",
-)
-@click.option(
-    "--debug",
-    is_flag=True,
-    help="Enable debug mode.",
-)
-@click.version_option(__version__)
-def run(config: str | None, debug: bool) -> None:
-    """The entry point.
-
-    Args:
-        config (str | None): The config file to use.
-        debug (bool): Enable debug mode.
-    """
-
-    title = "Azure Key Vault Browser"
-    app = KeyVaultBrowser
-    app.config_path = config
-    if debug:
-        app.run(log="azure-keyvault-browser.log", title=title)
-    else:
-        try:
-            app.run()
-        except Exception:
-            from rich.console import Console
-
-            console = Console()
-            console.print(
-                "💥 It looks like there has been an error. For more information use the --debug option!"
-            )
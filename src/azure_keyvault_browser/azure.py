@@ -1,32 +1,226 @@
 from __future__ import annotations
 
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
 from azure.identity.aio import AzureCliCredential
 from azure.keyvault.secrets import SecretProperties
 from azure.keyvault.secrets.aio import SecretClient
 
 
-class KeyVault:
+def throttle_delay(error: Exception, backoff: float = 1.0) -> float | None:
+    """Work out how long to wait before retrying a failed request.
+
+    Args:
+        error (Exception): The error raised by the request.
+        backoff (float): The delay used when the service does not provide one. Defaults to 1.0.
+
+    Returns:
+        float | None: The delay in seconds, or None if the error is not transient.
+    """
+
+    if isinstance(error, ServiceRequestError):
+        return backoff
+
+    if not isinstance(error, HttpResponseError):
+        return None
+
+    status = error.status_code or 0
+    if status != 429 and status < 500:
+        return None
+
+    retry_after = error.response.headers.get("Retry-After") if error.response else None
+    try:
+        return float(retry_after) if retry_after else backoff
+    except ValueError:
+        return backoff
+
+
+class SecretBackend(ABC):
+    """The operations the browser and the commands need from a vault.
+
+    The Key Vault SDK, the daemon and the emulator are backends, and layers such as caching and rate limiting wrap a
+    backend in another one, so that they can be stacked in any order.
+    """
+
+    vault_name: str
+
+    async def __aenter__(self) -> SecretBackend:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Release the resources held by the backend."""
+
+    @abstractmethod
+    def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        """Stream the properties of every secret in the vault.
+
+        Returns:
+            AsyncIterator[SecretProperties]: The properties.
+        """
+
+    @abstractmethod
+    def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        """Stream the versions of a secret.
+
+        Args:
+            name (str): The name of the secret.
+
+        Returns:
+            AsyncIterator[SecretProperties]: The properties of each version.
+        """
+
+    @abstractmethod
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        """Get the value of a secret.
+
+        Args:
+            name (str): The name of the secret.
+            version (str | None): The version. Defaults to the latest version.
+
+        Returns:
+            str: The value.
+        """
+
+    @abstractmethod
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        """Update the properties of a secret version.
+
+        Args:
+            name (str): The name of the secret.
+            version (str | None): The version to update. Defaults to the latest version.
+            **changes (Any): The properties to change, such as tags, enabled or expires_on.
+
+        Returns:
+            SecretProperties: The updated properties.
+        """
+
+    @abstractmethod
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        """Set the value of a secret, creating a new version or the secret itself.
+
+        Args:
+            name (str): The name of the secret.
+            value (str): The value.
+
+        Returns:
+            SecretProperties: The properties of the new version.
+        """
+
+    async def get_secrets(self) -> list[SecretProperties]:
+        """List the properties of every secret in the vault.
+
+        Returns:
+            list[SecretProperties]: The properties.
+        """
+
+        return [x async for x in self.iter_secrets()]
+
+    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+        """List the versions of a secret, newest first.
+
+        Args:
+            name (str): The name of the secret.
+
+        Returns:
+            list[SecretProperties]: The properties of each version.
+        """
+
+        oldest = datetime.min.replace(tzinfo=timezone.utc)
+        versions = [x async for x in self.iter_secret_versions(name)]
+        return sorted(versions, key=lambda x: x.created_on or oldest, reverse=True)
+
+
+class KeyVault(SecretBackend):
     def __init__(self, vault_name: str):
-        credential = AzureCliCredential()
+        self.vault_name = vault_name
+        self.credential = AzureCliCredential()
         self.client = SecretClient(
-            vault_url=f"https://{vault_name}.vault.azure.net", credential=credential
+            vault_url=f"https://{vault_name}.vault.azure.net",
+            credential=self.credential,
         )
 
-    async def get_secret_value(self, name: str, version: str) -> str:
+    async def __aenter__(self) -> KeyVault:
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying client and credential."""
+
+        await self.client.close()
+        await self.credential.close()
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
 
         secret = await self.client.get_secret(name=name, version=version)
         return secret.value
 
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        """Update the properties of a secret version.
+
+        Args:
+            name (str): The name of the secret.
+            version (str | None): The version to update. Defaults to the latest version.
+            **changes (Any): The properties to change, such as tags, enabled or expires_on.
+
+        Returns:
+            SecretProperties: The updated properties.
+        """
+
+        return await self.client.update_secret_properties(
+            name, version=version, **changes
+        )
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        """Set the value of a secret, creating a new version or the secret itself.
+
+        Args:
+            name (str): The name of the secret.
+            value (str): The value.
+
+        Returns:
+            SecretProperties: The properties of the new version.
+        """
+
+        secret = await self.client.set_secret(name, value)
+        return secret.properties
+
+    async def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        """Stream secret properties as pages are returned by the service.
+
+        Yields:
+            SecretProperties: The properties of a secret.
+        """
+
+        async for p in self.client.list_properties_of_secrets():
+            yield p
+
     async def get_secrets(self) -> list[SecretProperties]:
         properties = []
-        async for p in self.client.list_properties_of_secrets():
+        async for p in self.iter_secrets():
             properties.append(p)
         return properties
 
-    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+    async def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        """Stream the versions of a secret in the order returned by the service.
 
-        versions = []
-        async for v in self.client.list_properties_of_secret_versions(name=name):
-            versions.append(v)
+        Args:
+            name (str): The name of the secret.
+
+        Yields:
+            SecretProperties: The properties of a secret version.
+        """
 
-        return sorted(list(versions), key=lambda d: d.created_on, reverse=True)
+        async for v in self.client.list_properties_of_secret_versions(name=name):
+            yield v
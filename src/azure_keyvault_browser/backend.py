@@ -0,0 +1,624 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Mapping, TypeVar
+from uuid import uuid4
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import KeyVault, SecretBackend, throttle_delay
+from .codec import decode_properties, encode_properties, encode_value
+from .concurrency import RateLimiter, retry
+from .config import EMULATOR_PATH
+from .daemon_client import DaemonClient
+
+"""
+Backends and the layers that can be stacked on them. A stack is chosen in the config with backend (sdk or emulator)
+and backend_layers, listed from the outermost layer in, for example ["cache", "coalesce", "rate_limit", "metrics"].
+"""
+
+R = TypeVar("R")
+L = TypeVar("L", bound=SecretBackend)
+
+
+class Layer(SecretBackend):
+    """A backend that wraps another and passes every operation through to it."""
+
+    def __init__(self, inner: SecretBackend) -> None:
+        """A backend that wraps another and passes every operation through to it.
+
+        Args:
+            inner (SecretBackend): The backend to wrap.
+        """
+
+        self.inner = inner
+        self.vault_name = inner.vault_name
+
+    async def close(self) -> None:
+        """Close the wrapped backend."""
+
+        await self.inner.close()
+
+    def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        return self.inner.iter_secrets()
+
+    def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        return self.inner.iter_secret_versions(name)
+
+    async def get_secrets(self) -> list[SecretProperties]:
+        return await self.inner.get_secrets()
+
+    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+        return await self.inner.get_secret_versions(name)
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        return await self.inner.get_secret_value(name, version)
+
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        return await self.inner.update_secret_properties(name, version, **changes)
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        return await self.inner.set_secret(name, value)
+
+
+class CacheLayer(Layer):
+    """Keeps listings and version histories for a short time. Secret values are never cached by this layer."""
+
+    def __init__(self, inner: SecretBackend, ttl: float = 30) -> None:
+        """Keeps listings and version histories for a short time. Secret values are never cached by this layer.
+
+        Args:
+            inner (SecretBackend): The backend to wrap.
+            ttl (float): The number of seconds a listing is kept for. Defaults to 30.
+        """
+
+        super().__init__(inner)
+        self.ttl = ttl
+        self._secrets: tuple[float, list[SecretProperties]] | None = None
+        self._versions: dict[str, tuple[float, list[SecretProperties]]] = {}
+
+    def _fresh(self, entry: tuple[float, Any] | None) -> bool:
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    async def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        """Stream the cached listing, or stream and cache a new one.
+
+        Yields:
+            SecretProperties: The properties of a secret.
+        """
+
+        if self._secrets is not None and self._fresh(self._secrets):
+            for properties in self._secrets[1]:
+                yield properties
+            return
+
+        started = time.monotonic()
+        items = []
+        async for properties in self.inner.iter_secrets():
+            items.append(properties)
+            yield properties
+        self._secrets = (started, items)
+
+    async def get_secrets(self) -> list[SecretProperties]:
+        if self._secrets is None or not self._fresh(self._secrets):
+            started = time.monotonic()
+            self._secrets = (started, await self.inner.get_secrets())
+        return list(self._secrets[1])
+
+    async def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        """Stream the cached versions of a secret, or stream and cache them.
+
+        Args:
+            name (str): The name of the secret.
+
+        Yields:
+            SecretProperties: The properties of a secret version.
+        """
+
+        entry = self._versions.get(name)
+        if entry is not None and self._fresh(entry):
+            for properties in entry[1]:
+                yield properties
+            return
+
+        started = time.monotonic()
+        items = []
+        async for properties in self.inner.iter_secret_versions(name):
+            items.append(properties)
+            yield properties
+        self._versions[name] = (started, items)
+
+    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+        entry = self._versions.get(name)
+        if entry is None or not self._fresh(entry):
+            started = time.monotonic()
+            entry = (started, await self.inner.get_secret_versions(name))
+            self._versions[name] = entry
+        return list(entry[1])
+
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        properties = await self.inner.update_secret_properties(name, version, **changes)
+        self._secrets = None
+        self._versions.pop(name, None)
+        return properties
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        properties = await self.inner.set_secret(name, value)
+        self._secrets = None
+        self._versions.pop(name, None)
+        return properties
+
+
+class CoalescingLayer(Layer):
+    """Shares one request between callers that ask for the same thing at the same time."""
+
+    def __init__(self, inner: SecretBackend) -> None:
+        """Shares one request between callers that ask for the same thing at the same time.
+
+        Args:
+            inner (SecretBackend): The backend to wrap.
+        """
+
+        super().__init__(inner)
+        self._in_flight: dict[tuple[Any, ...], asyncio.Future] = {}
+
+    async def _coalesce(
+        self, key: tuple[Any, ...], factory: Callable[[], Awaitable[R]]
+    ) -> R:
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shielded, so that one caller giving up does not cancel the request for the others.
+        return await asyncio.shield(future)
+
+    async def get_secrets(self) -> list[SecretProperties]:
+        return list(await self._coalesce(("secrets",), self.inner.get_secrets))
+
+    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+        return list(
+            await self._coalesce(
+                ("versions", name), lambda: self.inner.get_secret_versions(name)
+            )
+        )
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        return await self._coalesce(
+            ("value", name, version),
+            lambda: self.inner.get_secret_value(name, version),
+        )
+
+
+class RateLimitLayer(Layer):
+    """Limits how often requests start and retries the ones that are throttled or fail transiently."""
+
+    def __init__(
+        self, inner: SecretBackend, rate: float = 20, attempts: int = 3
+    ) -> None:
+        """Limits how often requests start and retries the ones that are throttled or fail transiently.
+
+        Args:
+            inner (SecretBackend): The backend to wrap.
+            rate (float): The maximum number of requests started per second. Defaults to 20.
+            attempts (int): The maximum number of attempts per request. Defaults to 3.
+        """
+
+        super().__init__(inner)
+        self.limiter = RateLimiter(rate)
+        self.attempts = attempts
+
+    async def _call(self, func: Callable[[], Awaitable[R]]) -> R:
+        result, _ = await retry(func, throttle_delay, self.attempts, self.limiter)
+        return result
+
+    async def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        """Stream the listing once the limiter allows it. A stream is not retried once it has started.
+
+        Yields:
+            SecretProperties: The properties of a secret.
+        """
+
+        await self.limiter.acquire()
+        async for properties in self.inner.iter_secrets():
+            yield properties
+
+    async def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        """Stream the versions of a secret once the limiter allows it.
+
+        Args:
+            name (str): The name of the secret.
+
+        Yields:
+            SecretProperties: The properties of a secret version.
+        """
+
+        await self.limiter.acquire()
+        async for properties in self.inner.iter_secret_versions(name):
+            yield properties
+
+    async def get_secrets(self) -> list[SecretProperties]:
+        return await self._call(self.inner.get_secrets)
+
+    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+        return await self._call(lambda: self.inner.get_secret_versions(name))
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        return await self._call(lambda: self.inner.get_secret_value(name, version))
+
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        return await self._call(
+            lambda: self.inner.update_secret_properties(name, version, **changes)
+        )
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        return await self._call(lambda: self.inner.set_secret(name, value))
+
+
+class OperationMetrics:
+    """The number, failures and duration of the calls made to one operation."""
+
+    def __init__(self) -> None:
+        """The number, failures and duration of the calls made to one operation."""
+
+        self.calls = 0
+        self.errors = 0
+        self.items = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def add(self, seconds: float, items: int = 0, error: bool = False) -> None:
+        """Record a call.
+
+        Args:
+            seconds (float): How long the call took.
+            items (int): The number of items it returned. Defaults to 0.
+            error (bool): Whether the call failed. Defaults to False.
+        """
+
+        self.calls += 1
+        self.errors += int(error)
+        self.items += items
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+
+
+class MetricsLayer(Layer):
+    """Counts and times the calls made to the backend it wraps."""
+
+    def __init__(self, inner: SecretBackend) -> None:
+        """Counts and times the calls made to the backend it wraps.
+
+        Args:
+            inner (SecretBackend): The backend to wrap.
+        """
+
+        super().__init__(inner)
+        self.operations: dict[str, OperationMetrics] = {}
+
+    def _record(
+        self, operation: str, started: float, items: int = 0, error: bool = False
+    ) -> None:
+        metrics = self.operations.setdefault(operation, OperationMetrics())
+        metrics.add(time.perf_counter() - started, items, error)
+
+    async def _call(self, operation: str, func: Callable[[], Awaitable[R]]) -> R:
+        started = time.perf_counter()
+        try:
+            result = await func()
+        except Exception:
+            self._record(operation, started, error=True)
+            raise
+
+        self._record(operation, started, len(result) if isinstance(result, list) else 1)
+        return result
+
+    async def _stream(
+        self, operation: str, items: AsyncIterator[SecretProperties]
+    ) -> AsyncIterator[SecretProperties]:
+        started = time.perf_counter()
+        count = 0
+        try:
+            async for properties in items:
+                count += 1
+                yield properties
+        except Exception:
+            self._record(operation, started, count, error=True)
+            raise
+
+        self._record(operation, started, count)
+
+    def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        return self._stream("iter_secrets", self.inner.iter_secrets())
+
+    def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        return self._stream(
+            "iter_secret_versions", self.inner.iter_secret_versions(name)
+        )
+
+    async def get_secrets(self) -> list[SecretProperties]:
+        return await self._call("get_secrets", self.inner.get_secrets)
+
+    async def get_secret_versions(self, name: str) -> list[SecretProperties]:
+        return await self._call(
+            "get_secret_versions", lambda: self.inner.get_secret_versions(name)
+        )
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        return await self._call(
+            "get_secret_value", lambda: self.inner.get_secret_value(name, version)
+        )
+
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        return await self._call(
+            "update_secret_properties",
+            lambda: self.inner.update_secret_properties(name, version, **changes),
+        )
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        return await self._call(
+            "set_secret", lambda: self.inner.set_secret(name, value)
+        )
+
+    def summary(self) -> str:
+        """Summarise the calls made to each operation.
+
+        Returns:
+            str: The summary, with the operations that took the longest first.
+        """
+
+        lines = [f"Backend calls to {self.vault_name}:"]
+        for operation, metrics in sorted(
+            self.operations.items(), key=lambda x: -x[1].total
+        ):
+            mean = metrics.total / metrics.calls if metrics.calls else 0.0
+            lines.append(
+                f"  {operation}: {metrics.calls} calls, {metrics.errors} errors, {metrics.items} items, "
+                f"mean {mean * 1000:.0f}ms, longest {metrics.longest * 1000:.0f}ms"
+            )
+
+        return "\n".join(lines)
+
+
+class MemoryVault(SecretBackend):
+    """An in-memory emulator of a vault, for working offline and benchmarking without touching Azure."""
+
+    def __init__(
+        self,
+        vault_name: str,
+        secrets: Mapping[str, Any],
+        timestamp: datetime | None = None,
+    ) -> None:
+        """An in-memory emulator of a vault, for working offline and benchmarking without touching Azure.
+
+        Args:
+            vault_name (str): The name of the vault.
+            secrets (Mapping[str, Any]): The secrets, by name. Each is a value, or a mapping with a value and optional
+                enabled, content_type, created_on, updated_on, expires_on and tags. Dates are ISO 8601 strings.
+            timestamp (datetime | None): The date secrets without one were created and updated. Defaults to now.
+        """
+
+        self.vault_name = vault_name
+        self.values: dict[str, str] = {}
+        self.properties: dict[str, SecretProperties] = {}
+        now = (timestamp or datetime.now(timezone.utc)).isoformat()
+
+        for name, secret in secrets.items():
+            if not isinstance(secret, Mapping):
+                secret = {"value": secret}
+
+            self.values[name] = str(secret.get("value", ""))
+            self.properties[name] = decode_properties(
+                {
+                    "id": f"https://{vault_name}.vault.azure.net/secrets/{name}/1",
+                    "enabled": secret.get("enabled", True),
+                    "expires": secret.get("expires_on"),
+                    "created": secret.get("created_on", now),
+                    "updated": secret.get("updated_on", now),
+                    "content_type": secret.get("content_type"),
+                    "tags": secret.get("tags") or {},
+                }
+            )
+
+    @classmethod
+    def from_file(cls, vault_name: str, path: str = EMULATOR_PATH) -> MemoryVault:
+        """Load the emulated vault from a JSON file that maps vault names to their secrets.
+
+        Args:
+            vault_name (str): The name of the vault.
+            path (str): The path of the file. Defaults to EMULATOR_PATH.
+
+        Returns:
+            MemoryVault: The emulated vault. It is empty if the file does not list the vault.
+        """
+
+        if not os.path.exists(path):
+            return cls(vault_name, {})
+
+        with open(path) as f:
+            secrets = json.load(f).get(vault_name, {})
+
+        modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+        return cls(vault_name, secrets, modified)
+
+    def _get(self, name: str) -> SecretProperties:
+        properties = self.properties.get(name)
+        if properties is None:
+            raise ResourceNotFoundError(message=f"Secret not found: {name}")
+        return properties
+
+    async def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        """Stream the emulated secrets.
+
+        Yields:
+            SecretProperties: The properties of a secret.
+        """
+
+        for properties in list(self.properties.values()):
+            yield properties
+
+    async def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        """Stream the only version of an emulated secret.
+
+        Args:
+            name (str): The name of the secret.
+
+        Yields:
+            SecretProperties: The properties of the version.
+        """
+
+        yield self._get(name)
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        self._get(name)
+        return self.values[name]
+
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        data = encode_properties(self._get(name))
+        for key, value in changes.items():
+            key = {"expires_on": "expires"}.get(key, key)
+            data[key] = encode_value(value)
+
+        self.properties[name] = decode_properties(data)
+        return self.properties[name]
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        now = datetime.now(timezone.utc).isoformat()
+        previous = self.properties.get(name)
+        self.values[name] = value
+        self.properties[name] = decode_properties(
+            {
+                "id": f"https://{self.vault_name}.vault.azure.net/secrets/{name}/{uuid4().hex}",
+                "enabled": True,
+                "created": encode_value(previous.created_on) if previous else now,
+                "updated": now,
+                "tags": {},
+            }
+        )
+        return self.properties[name]
+
+
+class BackendLayer(Enum):
+    """An enum containing the layers that can be stacked on a backend."""
+
+    CACHE = "cache"
+    COALESCE = "coalesce"
+    RATE_LIMIT = "rate_limit"
+    METRICS = "metrics"
+
+    def wrap(self, inner: SecretBackend, config: Mapping[str, Any]) -> SecretBackend:
+        """Wrap a backend in the layer.
+
+        Args:
+            inner (SecretBackend): The backend to wrap.
+            config (Mapping[str, Any]): The configuration the layer's settings are read from.
+
+        Returns:
+            SecretBackend: The layer.
+        """
+
+        if self is BackendLayer.CACHE:
+            return CacheLayer(inner, ttl=config.get("backend_cache_ttl", 30))
+        if self is BackendLayer.COALESCE:
+            return CoalescingLayer(inner)
+        if self is BackendLayer.RATE_LIMIT:
+            return RateLimitLayer(
+                inner,
+                rate=config.get("backend_rate", 20),
+                attempts=config.get("backend_attempts", 3),
+            )
+        return MetricsLayer(inner)
+
+
+def stack_layers(
+    backend: SecretBackend, layers: Iterable[str], config: Mapping[str, Any]
+) -> SecretBackend:
+    """Stack layers on a backend.
+
+    Args:
+        backend (SecretBackend): The backend at the bottom of the stack.
+        layers (Iterable[str]): The names of the layers, outermost first.
+        config (Mapping[str, Any]): The configuration the layers' settings are read from.
+
+    Returns:
+        SecretBackend: The outermost layer, or the backend if there are no layers.
+    """
+
+    for name in reversed(list(layers)):
+        backend = BackendLayer(name).wrap(backend, config)
+    return backend
+
+
+def find_layer(backend: SecretBackend, cls: type[L]) -> L | None:
+    """Find a layer, or the backend at the bottom, of a type in a stack.
+
+    Args:
+        backend (SecretBackend): The outermost layer of the stack.
+        cls (type[L]): The type to find.
+
+    Returns:
+        L | None: The outermost match, or None if there is none.
+    """
+
+    current: SecretBackend | None = backend
+    while current is not None:
+        if isinstance(current, cls):
+            return current
+        current = current.inner if isinstance(current, Layer) else None
+    return None
+
+
+async def open_backend(
+    vault_name: str, config: Mapping[str, Any] | None = None
+) -> SecretBackend:
+    """Open the configured backend stack for a vault.
+
+    The daemon is used when it is running, unless daemon is false in the config. Otherwise the backend setting picks
+    the Key Vault SDK (the default) or the emulator.
+
+    Args:
+        vault_name (str): The name of the vault.
+        config (Mapping[str, Any] | None): The configuration. Defaults to None, which uses the defaults.
+
+    Returns:
+        SecretBackend: The outermost layer of the stack.
+
+    Raises:
+        ValueError: If the backend or a layer is not known.
+    """
+
+    config = config or {}
+    kind = config.get("backend", "sdk")
+
+    backend: SecretBackend | None = None
+    if kind == "emulator":
+        backend = MemoryVault.from_file(
+            vault_name, config.get("emulator_path", EMULATOR_PATH)
+        )
+    elif kind != "sdk":
+        raise ValueError(f"Unknown backend {kind}. Use sdk or emulator.")
+    elif config.get("daemon", True):
+        backend = await DaemonClient.attach(vault_name)
+
+    return stack_layers(
+        backend or KeyVault(vault_name=vault_name),
+        config.get("backend_layers", []),
+        config,
+    )
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable
+
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend, throttle_delay
+from .concurrency import RateLimiter, attempts_made, map_bounded, retry
+
+
+class PropertyChange:
+    """A change to apply to the properties of many secrets."""
+
+    def __init__(
+        self,
+        tags: dict[str, str] | None = None,
+        remove_tags: Iterable[str] | None = None,
+        enabled: bool | None = None,
+        expires_on: datetime | None = None,
+    ) -> None:
+        """A change to apply to the properties of many secrets.
+
+        Args:
+            tags (dict[str, str] | None): Tags to add or overwrite. Existing tags are kept. Defaults to None.
+            remove_tags (Iterable[str] | None): Tag names to remove. Defaults to None.
+            enabled (bool | None): Enable or disable the secrets. Defaults to None, which leaves them unchanged.
+            expires_on (datetime | None): A new expiry date. Defaults to None, which leaves it unchanged.
+        """
+
+        self.tags = tags or {}
+        self.remove_tags = set(remove_tags or [])
+        self.enabled = enabled
+        self.expires_on = expires_on
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.tags
+            or self.remove_tags
+            or self.enabled is not None
+            or self.expires_on is not None
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PropertyChange:
+        """Create a change from a dictionary, such as parsed TOML.
+
+        Args:
+            data (dict[str, Any]): A dictionary with optional tags, remove_tags, enabled and expires_on keys.
+
+        Returns:
+            PropertyChange: The change.
+
+        Raises:
+            ValueError: If a value has the wrong type.
+        """
+
+        expires_on = data.get("expires_on")
+        if isinstance(expires_on, str):
+            expires_on = datetime.fromisoformat(expires_on)
+        elif isinstance(expires_on, date) and not isinstance(expires_on, datetime):
+            expires_on = datetime.combine(expires_on, time())
+        if expires_on is not None and not isinstance(expires_on, datetime):
+            raise ValueError("expires_on must be a date and time")
+        if expires_on is not None and expires_on.tzinfo is None:
+            expires_on = expires_on.replace(tzinfo=timezone.utc)
+
+        enabled = data.get("enabled")
+        if enabled is not None and not isinstance(enabled, bool):
+            raise ValueError("enabled must be true or false")
+
+        tags = data.get("tags") or {}
+        if not isinstance(tags, dict):
+            raise ValueError("tags must be a table of names and values")
+        if any(isinstance(x, (dict, list)) for x in tags.values()):
+            raise ValueError("tag values must be strings, not tables or lists")
+
+        remove_tags = data.get("remove_tags") or []
+        if not isinstance(remove_tags, (list, tuple, set)) or not all(
+            isinstance(x, str) for x in remove_tags
+        ):
+            raise ValueError("remove_tags must be a list of tag names")
+
+        return cls(
+            tags={str(k): str(v) for k, v in tags.items()},
+            remove_tags=remove_tags,
+            enabled=enabled,
+            expires_on=expires_on,
+        )
+
+    def diff(self, properties: SecretProperties) -> dict[str, Any]:
+        """Work out which properties actually need to change for a secret.
+
+        Args:
+            properties (SecretProperties): The current properties of the secret.
+
+        Returns:
+            dict[str, Any]: Keyword arguments for the update, empty if the change is a no-op.
+        """
+
+        changes: dict[str, Any] = {}
+
+        current_tags = properties.tags or {}
+        tags = {k: v for k, v in current_tags.items() if k not in self.remove_tags}
+        tags.update(self.tags)
+        if tags != current_tags:
+            changes["tags"] = tags
+
+        if self.enabled is not None and self.enabled != properties.enabled:
+            changes["enabled"] = self.enabled
+
+        if self.expires_on is not None and self.expires_on != properties.expires_on:
+            changes["expires_on"] = self.expires_on
+
+        return changes
+
+
+class UpdateStatus(Enum):
+    """An enum containing the outcomes of a single update."""
+
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+    PLANNED = "planned"
+    FAILED = "failed"
+
+
+class UpdateResult:
+    """The outcome of updating a single secret."""
+
+    def __init__(
+        self,
+        name: str,
+        status: UpdateStatus,
+        changes: dict[str, Any] | None = None,
+        properties: SecretProperties | None = None,
+        attempts: int = 0,
+        error: str = "",
+    ) -> None:
+        """The outcome of updating a single secret.
+
+        Args:
+            name (str): The name of the secret.
+            status (UpdateStatus): The outcome.
+            changes (dict[str, Any] | None): The properties that were changed. Defaults to None.
+            properties (SecretProperties | None): The updated properties. Defaults to None.
+            attempts (int): The number of attempts made. Defaults to 0.
+            error (str): The error message if the update failed. Defaults to "".
+        """
+
+        self.name = name
+        self.status = status
+        self.changes = changes or {}
+        self.properties = properties
+        self.attempts = attempts
+        self.error = error
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the result to a JSON serialisable dictionary.
+
+        Returns:
+            dict[str, Any]: The result.
+        """
+
+        return {
+            "name": self.name,
+            "status": self.status.value,
+            "changes": {
+                k: v.isoformat() if isinstance(v, datetime) else v
+                for k, v in self.changes.items()
+            },
+            "attempts": self.attempts,
+            "error": self.error,
+        }
+
+
+class BulkUpdater:
+    """Applies a property change to many secrets through a bounded, throttle aware pipeline."""
+
+    def __init__(
+        self,
+        client: SecretBackend,
+        concurrency: int = 8,
+        rate: float = 10,
+        attempts: int = 3,
+    ) -> None:
+        """Applies a property change to many secrets through a bounded, throttle aware pipeline.
+
+        Args:
+            client (SecretBackend): The client for the vault the secrets belong to.
+            concurrency (int): The maximum number of updates in flight. Defaults to 8.
+            rate (float): The maximum number of updates started per second. Defaults to 10.
+            attempts (int): The maximum number of attempts per secret. Defaults to 3.
+        """
+
+        self.client = client
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.attempts = attempts
+
+    async def update(
+        self,
+        properties: SecretProperties,
+        change: PropertyChange,
+        dry_run: bool = False,
+    ) -> UpdateResult:
+        """Apply a change to a single secret, skipping it if nothing would change.
+
+        Args:
+            properties (SecretProperties): The cached properties of the secret.
+            change (PropertyChange): The change to apply.
+            dry_run (bool): Plan the update without applying it. Defaults to False.
+
+        Returns:
+            UpdateResult: The outcome.
+        """
+
+        name = properties.name or ""
+        changes = change.diff(properties)
+
+        if not changes:
+            return UpdateResult(name, UpdateStatus.UNCHANGED)
+
+        if dry_run:
+            return UpdateResult(name, UpdateStatus.PLANNED, changes)
+
+        try:
+            updated, attempts = await retry(
+                lambda: self.client.update_secret_properties(name, **changes),
+                throttle_delay,
+                attempts=self.attempts,
+                limiter=self.limiter,
+            )
+        except Exception as e:
+            attempts = attempts_made(e)
+            return UpdateResult(
+                name, UpdateStatus.FAILED, changes, attempts=attempts, error=str(e)
+            )
+
+        return UpdateResult(name, UpdateStatus.UPDATED, changes, updated, attempts)
+
+    async def apply(
+        self,
+        items: Iterable[SecretProperties],
+        change: PropertyChange,
+        dry_run: bool = False,
+    ) -> AsyncIterator[UpdateResult]:
+        """Apply a change to many secrets, yielding results as they complete.
+
+        Args:
+            items (Iterable[SecretProperties]): The cached properties of the secrets to update.
+            change (PropertyChange): The change to apply.
+            dry_run (bool): Plan the updates without applying them. Defaults to False.
+
+        Yields:
+            UpdateResult: The outcome for each secret.
+        """
+
+        async def update(properties: SecretProperties) -> UpdateResult:
+            return await self.update(properties, change, dry_run)
+
+        async for result in map_bounded(update, items, limit=self.concurrency):
+            yield result
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Iterable
+
+from azure.keyvault.secrets import SecretProperties
+
+from .config import SNAPSHOT_DIR
+
+
+class ChangeType(Enum):
+    """An enum containing the kinds of change a watch can report."""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DISABLED = "disabled"
+    DELETED = "deleted"
+
+
+def snapshot_record(properties: SecretProperties) -> dict[str, Any]:
+    """The listed properties of a secret that are kept in a snapshot.
+
+    Args:
+        properties (SecretProperties): The properties of the secret.
+
+    Returns:
+        dict[str, Any]: The record.
+    """
+
+    return {
+        "version": properties.version,
+        "enabled": properties.enabled,
+        "created_on": (
+            properties.created_on.isoformat() if properties.created_on else None
+        ),
+        "updated_on": (
+            properties.updated_on.isoformat() if properties.updated_on else None
+        ),
+        "expires_on": (
+            properties.expires_on.isoformat() if properties.expires_on else None
+        ),
+    }
+
+
+class ChangeEvent:
+    """A single change to a secret found between two polls of a vault."""
+
+    def __init__(
+        self,
+        vault: str,
+        name: str,
+        type: ChangeType,
+        record: dict[str, Any],
+        previous: dict[str, Any] | None = None,
+    ) -> None:
+        """A single change to a secret found between two polls of a vault.
+
+        Args:
+            vault (str): The name of the vault the secret belongs to.
+            name (str): The name of the secret.
+            type (ChangeType): The kind of change.
+            record (dict[str, Any]): The snapshot record of the secret, or the last one seen if it was deleted.
+            previous (dict[str, Any] | None): The previous snapshot record, if there was one. Defaults to None.
+        """
+
+        self.vault = vault
+        self.name = name
+        self.type = type
+        self.record = record
+        self.previous = previous
+        self.detected_at = datetime.now(timezone.utc)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the event to a JSON serialisable dictionary.
+
+        Returns:
+            dict[str, Any]: The event.
+        """
+
+        return {
+            "vault": self.vault,
+            "name": self.name,
+            "change": self.type.value,
+            **self.record,
+            "previous_version": self.previous["version"] if self.previous else None,
+            "detected_at": self.detected_at.isoformat(),
+        }
+
+
+class Snapshot:
+    """The last seen listing of a vault, stored on disk so that a watch can pick up where it left off."""
+
+    def __init__(self, vault: str, directory: str = SNAPSHOT_DIR) -> None:
+        """The last seen listing of a vault, stored on disk so that a watch can pick up where it left off.
+
+        Args:
+            vault (str): The name of the vault.
+            directory (str): The directory snapshots are kept in. Defaults to SNAPSHOT_DIR.
+        """
+
+        self.vault = vault
+        self.path = f"{directory}/{vault}.json"
+        self.records: dict[str, dict[str, Any]] | None = None
+
+    def load(self) -> bool:
+        """Load the stored snapshot.
+
+        Returns:
+            bool: True if there was a snapshot to load.
+        """
+
+        if not os.path.exists(self.path):
+            return False
+
+        with open(self.path) as f:
+            self.records = json.load(f)
+        return True
+
+    def save(self) -> None:
+        """Store the snapshot, replacing the previous one atomically."""
+
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(self.records or {}, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def diff(
+        self, items: Iterable[SecretProperties], initial: bool = False
+    ) -> list[ChangeEvent]:
+        """Compare a listing with the snapshot and make it the new snapshot.
+
+        Args:
+            items (Iterable[SecretProperties]): The listing.
+            initial (bool): Report every secret as created when there is no snapshot yet. Defaults to False, which
+                only records a baseline.
+
+        Returns:
+            list[ChangeEvent]: The changes, in name order.
+        """
+
+        current = {x.name: snapshot_record(x) for x in items if x.name}
+        previous = self.records
+        self.records = current
+
+        if previous is None:
+            previous = {}
+            if not initial:
+                return []
+
+        events = []
+        for name in sorted(previous.keys() | current.keys()):
+            before = previous.get(name)
+            after = current.get(name)
+
+            if before is None and after is not None:
+                events.append(ChangeEvent(self.vault, name, ChangeType.CREATED, after))
+            elif after is None and before is not None:
+                events.append(ChangeEvent(self.vault, name, ChangeType.DELETED, before))
+            elif before != after and before is not None and after is not None:
+                type = (
+                    ChangeType.DISABLED
+                    if before["enabled"] and not after["enabled"]
+                    else ChangeType.UPDATED
+                )
+                events.append(ChangeEvent(self.vault, name, type, after, before))
+
+        return events
+
+
+class PollInterval:
+    """An adaptive polling interval that backs off while a vault is quiet."""
+
+    def __init__(
+        self, minimum: float = 30, maximum: float = 600, jitter: float = 0.1
+    ) -> None:
+        """An adaptive polling interval that backs off while a vault is quiet.
+
+        Args:
+            minimum (float): The interval after a change, in seconds. Defaults to 30.
+            maximum (float): The longest interval, in seconds. Defaults to 600.
+            jitter (float): The fraction the interval is randomly varied by, so that many vaults are not polled at
+                the same moment. Defaults to 0.1.
+        """
+
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.jitter = jitter
+        self.current = minimum
+
+    def next(self, changed: bool) -> float:
+        """Work out how long to wait before the next poll.
+
+        The interval is reset when something changed, and doubles after every quiet poll up to the maximum.
+
+        Args:
+            changed (bool): Whether the last poll found any changes.
+
+        Returns:
+            float: The delay in seconds.
+        """
+
+        if changed:
+            self.current = self.minimum
+        else:
+            self.current = min(self.current * 2, self.maximum)
+
+        return self.current * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def back_off(self) -> float:
+        """Work out how long to wait after a failed poll.
+
+        Returns:
+            float: The delay in seconds.
+        """
+
+        return self.next(changed=False)
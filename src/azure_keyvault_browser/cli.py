@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from importlib import import_module
+from typing import Any
+
+import click
+from click import Path
+
+from . import __version__
+from .config import CLI_HELP
+
+"""
+The command line. Subcommands are imported when they are run rather than when kv starts, so that completing a command
+line in a shell, or printing the help, does not import the browser or the Azure SDK.
+"""
+
+# The module and attribute of each subcommand.
+COMMANDS = {
+    "cache": "azure_keyvault_browser.commands.cache:cache",
+    "daemon": "azure_keyvault_browser.commands.daemon:daemon",
+    "diff": "azure_keyvault_browser.commands.diff:diff",
+    "duplicates": "azure_keyvault_browser.commands.duplicates:duplicates",
+    "exec": "azure_keyvault_browser.commands.exec:exec_command",
+    "index-report": "azure_keyvault_browser.commands.index_report:index_report",
+    "resolve": "azure_keyvault_browser.commands.resolve:resolve",
+    "scan": "azure_keyvault_browser.commands.scan:scan",
+    "sync": "azure_keyvault_browser.commands.sync:sync",
+    "update": "azure_keyvault_browser.commands.update:update",
+    "watch": "azure_keyvault_browser.commands.watch:watch",
+}
+
+
+class LazyGroup(click.Group):
+    """A command group that imports its subcommands when they are first used."""
+
+    def __init__(
+        self, *args: Any, lazy_commands: dict[str, str], **kwargs: Any
+    ) -> None:
+        """A command group that imports its subcommands when they are first used.
+
+        Args:
+            *args (Any): Passed to click.Group.
+            lazy_commands (dict[str, str]): The import path of each subcommand, as module:attribute.
+            **kwargs (Any): Passed to click.Group.
+        """
+
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        """List the names of the subcommands.
+
+        Args:
+            ctx (click.Context): The click context.
+
+        Returns:
+            list[str]: The names, sorted.
+        """
+
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        """Get a subcommand, importing it if it has not been used yet.
+
+        Args:
+            ctx (click.Context): The click context.
+            cmd_name (str): The name of the subcommand.
+
+        Returns:
+            click.Command | None: The subcommand, or None if there is no such subcommand.
+        """
+
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module, attribute = self.lazy_commands[cmd_name].split(":")
+            self.add_command(getattr(import_module(module), attribute), cmd_name)
+
+        return super().get_command(ctx, cmd_name)
+
+
+@click.group(
+    cls=LazyGroup, lazy_commands=COMMANDS, help=CLI_HELP, invoke_without_command=True
+)
+@click.option(
+    "--config",
+    default=None,
+    envvar="AZURE_KEYVAULT_BROWSER_CONFIG",
+    type=Path(file_okay=True, dir_okay=False, exists=False, resolve_path=True),
+    help="Explicitly override the config that will be used by azure-keyvault-browser.",
+)
+@click.option(
+    "--value-search",
+    is_flag=True,
+    help="Fetch secret values into an in-memory index so that they can be searched.",
+)
+@click.option(
+    "--value-cache",
+    is_flag=True,
+    help="Keep viewed secret values in an encrypted local cache so that they can be shown offline.",
+)
+@click.option(
+    "--as-of",
+    type=click.DateTime(),
+    default=None,
+    help="Start by showing the vault as it was at a moment (UTC), from the version history of every secret.",
+)
+@click.option(
+    "--debug",
+    is_flag=True,
+    help="Enable debug mode.",
+)
+@click.version_option(__version__)
+@click.pass_context
+def run(
+    ctx: click.Context,
+    config: str | None,
+    value_search: bool,
+    value_cache: bool,
+    as_of: datetime | None,
+    debug: bool,
+) -> None:
+    """The entry point. The browser is started when no subcommand is given.
+
+    Args:
+        ctx (click.Context): The click context.
+        config (str | None): The config file to use.
+        value_search (bool): Enable searching secret values.
+        value_cache (bool): Enable the encrypted value cache.
+        as_of (datetime | None): The moment to show the vault at.
+        debug (bool): Enable debug mode.
+    """
+
+    ctx.obj = {"config": config, "debug": debug}
+    if ctx.invoked_subcommand is not None:
+        return
+
+    from .app import KeyVaultBrowser
+
+    title = "Azure Key Vault Browser"
+    app = KeyVaultBrowser
+    app.config_path = config
+    app.value_search = value_search
+    app.use_value_cache = value_cache
+    app.as_of = as_of.replace(tzinfo=timezone.utc) if as_of else None
+    app.debug = debug
+    if debug:
+        app.run(log="azure-keyvault-browser.log", title=title)
+    else:
+        try:
+            app.run()
+        except Exception:
+            from rich.console import Console
+
+            console = Console()
+            console.print(
+                "💥 It looks like there has been an error. For more information use the --debug option!"
+            )
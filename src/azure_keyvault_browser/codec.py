@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any
+
+from azure.keyvault.secrets import SecretProperties
+
+from .dataset import ChangeSet
+
+"""
+The newline delimited JSON encoding of secret properties, change sets and errors, shared by the daemon, its client
+and the emulator backend.
+"""
+
+# Listings are streamed in chunks, so a line can hold many encoded secrets.
+STREAM_LIMIT = 2**24
+
+
+def encode_value(value: Any) -> Any:
+    """Encode a property value as JSON.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        Any: The value, with datetimes as ISO 8601 strings.
+    """
+
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def decode_date(value: str | None) -> datetime | None:
+    """Decode an ISO 8601 string created by encode_value.
+
+    Args:
+        value (str | None): The string.
+
+    Returns:
+        datetime | None: The datetime, or None if there was no value.
+    """
+
+    return datetime.fromisoformat(value) if value else None
+
+
+def encode_properties(properties: SecretProperties) -> dict[str, Any]:
+    """Encode the properties of a secret as JSON.
+
+    Args:
+        properties (SecretProperties): The properties.
+
+    Returns:
+        dict[str, Any]: The encoded properties.
+    """
+
+    return {
+        "id": properties.id,
+        "enabled": properties.enabled,
+        "not_before": encode_value(properties.not_before),
+        "expires": encode_value(properties.expires_on),
+        "created": encode_value(properties.created_on),
+        "updated": encode_value(properties.updated_on),
+        "recoverable_days": properties.recoverable_days,
+        "recovery_level": properties.recovery_level,
+        "content_type": properties.content_type,
+        "key_id": properties.key_id,
+        "managed": properties.managed,
+        "tags": properties.tags,
+    }
+
+
+def decode_properties(data: dict[str, Any]) -> SecretProperties:
+    """Decode the properties of a secret created by encode_properties.
+
+    Args:
+        data (dict[str, Any]): The encoded properties.
+
+    Returns:
+        SecretProperties: The properties.
+    """
+
+    attributes = SimpleNamespace(
+        enabled=data.get("enabled"),
+        not_before=decode_date(data.get("not_before")),
+        expires=decode_date(data.get("expires")),
+        created=decode_date(data.get("created")),
+        updated=decode_date(data.get("updated")),
+        recoverable_days=data.get("recoverable_days"),
+        recovery_level=data.get("recovery_level"),
+    )
+    return SecretProperties(
+        attributes,
+        data.get("id"),
+        content_type=data.get("content_type"),
+        key_id=data.get("key_id"),
+        managed=data.get("managed"),
+        tags=data.get("tags"),
+    )
+
+
+def encode_change_set(changes: ChangeSet) -> dict[str, Any]:
+    """Encode a change set as JSON.
+
+    Args:
+        changes (ChangeSet): The change set.
+
+    Returns:
+        dict[str, Any]: The encoded change set.
+    """
+
+    return {
+        "added": [encode_properties(x) for x in changes.added.values()],
+        "removed": [encode_properties(x) for x in changes.removed.values()],
+        "updated": [encode_properties(x) for x in changes.updated.values()],
+        "reset": changes.reset,
+    }
+
+
+def decode_change_set(data: dict[str, Any]) -> ChangeSet:
+    """Decode a change set created by encode_change_set.
+
+    Args:
+        data (dict[str, Any]): The encoded change set.
+
+    Returns:
+        ChangeSet: The change set.
+    """
+
+    return ChangeSet(
+        added=[decode_properties(x) for x in data.get("added", [])],
+        removed=[decode_properties(x) for x in data.get("removed", [])],
+        updated=[decode_properties(x) for x in data.get("updated", [])],
+        reset=data.get("reset", False),
+    )
+
+
+def encode_error(error: Exception) -> dict[str, Any]:
+    """Encode an error for sending to a client. Throttling and service errors keep their status code.
+
+    Args:
+        error (Exception): The error.
+
+    Returns:
+        dict[str, Any]: The encoded error.
+    """
+
+    return {
+        "type": type(error).__name__,
+        "message": str(error),
+        "status": getattr(error, "status_code", None),
+    }
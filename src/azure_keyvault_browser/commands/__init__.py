@@ -0,0 +1,4 @@
+"""
+The subcommands of kv. Each one lives in its own module and is imported by the command line when it is run, so this
+package does not import them.
+"""
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import click
+from rich.console import Console
+
+from ..config import EXEC_CACHE_PATH
+from ..value_cache import wipe_cache
+
+CACHE_HELP = """
+Manage the encrypted caches of secret values that the browser keeps when it is started with --value-cache, and that
+exec keeps when it is run with --cache-ttl.
+"""
+
+
+@click.group(help=CACHE_HELP)
+def cache() -> None:
+    """Manage the value cache."""
+
+
+@click.command(help="Delete every cached secret value.")
+def clear() -> None:
+    """Delete every cached secret value."""
+
+    console = Console(stderr=True)
+    # Both caches are always wiped, so neither short circuits the other.
+    cleared = [wipe_cache(), wipe_cache(EXEC_CACHE_PATH)]
+    if any(cleared):
+        console.print("Value cache cleared")
+    else:
+        console.print("There is no value cache to clear")
+
+
+cache.add_command(clear)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+import click
+from azure.core.exceptions import AzureError
+from rich.console import Console
+
+from ..config import DAEMON_LOG_PATH, DAEMON_SOCKET_PATH, get_config
+from ..daemon import Daemon
+from ..daemon_client import daemon_request
+from ..search import AnalyzerProfile
+from .options import vault_option
+
+DAEMON_HELP = """
+Manage the local daemon that keeps vault listings and search indexes warm. While it is running the browser and the
+other commands attach to it over a Unix socket, so they start without listing or indexing the vault. Secret values
+are always fetched from the vault and are never held by the daemon.
+"""
+
+
+def ping() -> dict[str, Any] | None:
+    """Ask the daemon which vaults it has loaded.
+
+    Returns:
+        dict[str, Any] | None: The number of secrets listed in each vault, or None if the daemon is not running.
+    """
+
+    if not os.path.exists(DAEMON_SOCKET_PATH):
+        return None
+
+    try:
+        return asyncio.run(daemon_request("ping"))["vaults"]
+    except (OSError, AzureError):
+        return None
+
+
+@click.group(help=DAEMON_HELP)
+def daemon() -> None:
+    """Manage the daemon."""
+
+
+@click.command(name="run", help="Run the daemon in the foreground.")
+@vault_option
+@click.option(
+    "--sync-interval",
+    type=float,
+    default=None,
+    help="The number of seconds between listings of each vault. Defaults to daemon_sync_interval or 60.",
+)
+@click.pass_obj
+def run_daemon(
+    obj: dict[str, Any], vaults: tuple[str, ...], sync_interval: float | None
+) -> None:
+    """Run the daemon in the foreground.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): Vaults to load before the first client attaches. Defaults to the configured vault.
+        sync_interval (float | None): The number of seconds between listings of each vault.
+    """
+
+    config = get_config(obj.get("config"))
+    logging.basicConfig(
+        level=logging.DEBUG if obj.get("debug") else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    server = Daemon(
+        profile=AnalyzerProfile(config.get("search_profile", "ngram")),
+        sync_interval=sync_interval or config.get("daemon_sync_interval", 60),
+    )
+    asyncio.run(server.serve(preload=list(vaults) or [config["keyvault"]]))
+
+
+@click.command(help="Start the daemon in the background.")
+@vault_option
+@click.option(
+    "--sync-interval",
+    type=float,
+    default=None,
+    help="The number of seconds between listings of each vault. Defaults to daemon_sync_interval or 60.",
+)
+@click.pass_obj
+def start(
+    obj: dict[str, Any], vaults: tuple[str, ...], sync_interval: float | None
+) -> None:
+    """Start the daemon in the background.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): Vaults to load before the first client attaches. Defaults to the configured vault.
+        sync_interval (float | None): The number of seconds between listings of each vault.
+
+    Raises:
+        ClickException: If the daemon did not start.
+    """
+
+    console = Console(stderr=True)
+    if ping() is not None:
+        console.print("The daemon is already running")
+        return
+
+    # Resolve the config here, where a first run can still prompt for it.
+    get_config(obj.get("config"))
+
+    command = [sys.executable, "-m", "azure_keyvault_browser"]
+    if obj.get("config"):
+        command += ["--config", obj["config"]]
+    command += ["daemon", "run"]
+    for vault in vaults:
+        command += ["--vault", vault]
+    if sync_interval:
+        command += ["--sync-interval", str(sync_interval)]
+
+    os.makedirs(os.path.dirname(DAEMON_LOG_PATH), mode=0o700, exist_ok=True)
+    with open(DAEMON_LOG_PATH, "a") as log:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if ping() is not None:
+            console.print(
+                f"The daemon is running. Logs are written to {DAEMON_LOG_PATH}"
+            )
+            return
+        time.sleep(0.2)
+
+    raise click.ClickException(
+        f"The daemon did not start. Check {DAEMON_LOG_PATH} for details."
+    )
+
+
+@click.command(help="Stop the daemon.")
+def stop() -> None:
+    """Stop the daemon."""
+
+    console = Console(stderr=True)
+    if ping() is None:
+        console.print("The daemon is not running")
+        return
+
+    asyncio.run(daemon_request("stop"))
+    console.print("The daemon has been stopped")
+
+
+@click.command(help="Show whether the daemon is running and the vaults it has loaded.")
+def status() -> None:
+    """Show whether the daemon is running and the vaults it has loaded."""
+
+    console = Console(stderr=True)
+    vaults = ping()
+    if vaults is None:
+        console.print("The daemon is not running")
+        return
+
+    console.print(f"The daemon is running on {DAEMON_SOCKET_PATH}")
+    for vault, count in sorted(vaults.items()):
+        console.print(f"  {vault}: {count} secrets")
+
+
+daemon.add_command(run_daemon)
+daemon.add_command(start)
+daemon.add_command(stop)
+daemon.add_command(status)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from contextlib import AsyncExitStack
+from typing import IO, Any, Mapping
+
+import click
+from rich.console import Console
+
+from ..backend import open_backend
+from ..diff import DiffStatus, VaultDiff
+from ..duplicates import HashIndex, get_salt
+from .options import read_config, write_record
+
+DIFF_HELP = """
+Compare the secrets in two or more vaults, such as staging and production. The first vault is the one the others are
+compared against: secrets it has that another vault lacks are missing, and secrets it lacks are extra. With --values
+the values of the secrets in every vault are compared by salted hash, and values are never written out. Secrets are
+written as NDJSON as soon as they are compared, while the vaults are still being listed.
+"""
+
+
+async def diff_vaults(
+    vaults: list[str],
+    output: IO[str],
+    index: HashIndex | None,
+    rate: float,
+    concurrency: int,
+    attempts: int,
+    config: Mapping[str, Any] | None = None,
+) -> tuple[Counter, int]:
+    """Compare vaults, writing each secret as it is compared.
+
+    Args:
+        vaults (list[str]): The names of the vaults, starting with the one the others are compared against.
+        output (IO[str]): The stream to write the report to.
+        index (HashIndex | None): The digests to compare values with, or None to only compare names.
+        rate (float): The maximum number of values fetched per second per vault.
+        concurrency (int): The maximum number of secrets compared at once.
+        attempts (int): The maximum number of attempts per value.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        tuple[Counter, int]: The number of secrets with each status, and the number of values fetched.
+    """
+
+    totals: Counter = Counter()
+    async with AsyncExitStack() as stack:
+        clients = [
+            await stack.enter_async_context(await open_backend(x, config))
+            for x in vaults
+        ]
+        diff = VaultDiff(clients, index, rate, concurrency, attempts)
+        async for entry in diff.run():
+            totals[entry.status.value] += 1
+            write_record(output, entry.to_dict())
+
+    return totals, diff.fetched
+
+
+@click.command(help=DIFF_HELP)
+@click.argument("vaults", nargs=-1, required=True)
+@click.option(
+    "--values",
+    is_flag=True,
+    help="Compare the values of secrets that are in every vault as well as their names.",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Exit with status 1 unless every secret is in every vault and, with --values, has the same value.",
+)
+@click.option(
+    "--rate",
+    default=10.0,
+    show_default=True,
+    help="The maximum number of values fetched per second per vault.",
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    show_default=True,
+    help="The maximum number of secrets compared at once.",
+)
+@click.option(
+    "--attempts",
+    default=3,
+    show_default=True,
+    help="The maximum number of attempts per value.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON report to a file instead of stdout.",
+)
+@click.pass_obj
+def diff(
+    obj: dict[str, Any],
+    vaults: tuple[str, ...],
+    values: bool,
+    check: bool,
+    rate: float,
+    concurrency: int,
+    attempts: int,
+    output: IO[str],
+) -> None:
+    """Compare the secrets in two or more vaults.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): The vaults to compare.
+        values (bool): Compare values as well as names.
+        check (bool): Exit with status 1 if the vaults differ.
+        rate (float): The maximum number of values fetched per second per vault.
+        concurrency (int): The maximum number of secrets compared at once.
+        attempts (int): The maximum number of attempts per value.
+        output (IO[str]): The stream to write the report to.
+
+    Raises:
+        UsageError: If fewer than two vaults are given.
+        SystemExit: If --check is given and the vaults differ.
+    """
+
+    names = list(dict.fromkeys(vaults))
+    if len(names) < 2:
+        raise click.UsageError("Give at least two vaults to compare.")
+
+    # Digests are shared with duplicates, so values that have not changed since either last ran are not fetched.
+    index = None
+    if values:
+        index = HashIndex(get_salt())
+        index.load()
+
+    totals, fetched = asyncio.run(
+        diff_vaults(names, output, index, rate, concurrency, attempts, read_config(obj))
+    )
+    if index is not None:
+        index.save()
+
+    console = Console(stderr=True)
+    summary = ", ".join(f"{v} {k}" for k, v in sorted(totals.items())) or "no secrets"
+    console.print(f"Diff complete: {summary}, {fetched} values fetched")
+
+    matching = {DiffStatus.IDENTICAL.value if values else DiffStatus.PRESENT.value}
+    if check and (totals.keys() - matching):
+        raise SystemExit(1)
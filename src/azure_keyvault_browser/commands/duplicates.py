@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+from typing import IO, Any, Mapping
+
+import click
+from rich.console import Console
+
+from ..backend import open_backend
+from ..duplicates import HashIndex, get_salt, group_to_dict
+from .options import read_config, resolve_vaults, vault_option, write_record
+
+DUPLICATES_HELP = """
+Find secrets that share a value, within and across vaults. Only salted hashes of values are kept and re-runs only
+fetch values that have changed since the last run. Duplicate groups are written as NDJSON.
+"""
+
+
+async def refresh_vaults(
+    index: HashIndex,
+    vaults: list[str],
+    rate: float,
+    concurrency: int,
+    config: Mapping[str, Any] | None = None,
+) -> int:
+    """Refresh the hash index for each vault concurrently.
+
+    Args:
+        index (HashIndex): The hash index.
+        vaults (list[str]): The names of the vaults to refresh.
+        rate (float): The maximum number of values fetched per second per vault.
+        concurrency (int): The maximum number of fetches in flight per vault.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        int: The number of values fetched.
+    """
+
+    async def refresh(vault: str) -> int:
+        async with await open_backend(vault, config) as client:
+            return await index.refresh(client, rate=rate, concurrency=concurrency)
+
+    return sum(await asyncio.gather(*[refresh(x) for x in vaults]))
+
+
+@click.command(help=DUPLICATES_HELP)
+@vault_option
+@click.option(
+    "--rate",
+    default=10.0,
+    show_default=True,
+    help="The maximum number of values fetched per second per vault.",
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    show_default=True,
+    help="The maximum number of values fetched at once per vault.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON report to a file instead of stdout.",
+)
+@click.pass_obj
+def duplicates(
+    obj: dict[str, Any],
+    vaults: tuple[str, ...],
+    rate: float,
+    concurrency: int,
+    output: IO[str],
+) -> None:
+    """Find secrets that share a value.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): The vaults to analyse.
+        rate (float): The maximum number of values fetched per second per vault.
+        concurrency (int): The maximum number of values fetched at once per vault.
+        output (IO[str]): The stream to write the report to.
+    """
+
+    names = resolve_vaults(obj, vaults)
+    index = HashIndex(get_salt())
+    index.load()
+    fetched = asyncio.run(
+        refresh_vaults(index, names, rate, concurrency, read_config(obj))
+    )
+    index.save()
+
+    groups = index.duplicates(names)
+    for group in groups:
+        write_record(output, group_to_dict(group))
+
+    console = Console(stderr=True)
+    console.print(f"{len(groups)} duplicate groups found, {fetched} values hashed")
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from datetime import timedelta
+from typing import IO, Any
+
+import click
+from click.shell_completion import CompletionItem
+from rich.console import Console
+
+from ..config import EXEC_CACHE_PATH
+from ..references import ResolveStatus, SecretReference, resolve_references
+from ..value_cache import CacheKeyException, ValueCache, get_cache_key
+from .options import complete_secret_names, read_config
+
+EXEC_HELP = """
+Run a command with secrets in its environment. Map environment variables to secrets with --env VAR=SECRET, where a
+secret is a name in the default vault, vault/name, vault/name/version or a Key Vault reference. Every secret is
+fetched at once, so ten secrets cost about one round trip, and the command replaces kv once they have all been
+fetched. Nothing is run if a secret cannot be fetched.
+"""
+
+
+def complete_env(
+    ctx: click.Context, param: click.Parameter, incomplete: str
+) -> list[CompletionItem]:
+    """Complete the secret name in a VAR=SECRET mapping, keeping the variable in front of each name.
+
+    Args:
+        ctx (click.Context): The context of the command being completed.
+        param (click.Parameter): The parameter being completed.
+        incomplete (str): The mapping typed so far.
+
+    Returns:
+        list[CompletionItem]: The mappings with matching names. Nothing is completed until the = has been typed.
+    """
+
+    var, separator, secret = incomplete.partition("=")
+    if not separator:
+        return []
+
+    return [
+        CompletionItem(f"{var}={x.value}")
+        for x in complete_secret_names(ctx, param, secret)
+    ]
+
+
+def read_mapping(
+    envs: tuple[str, ...], env_files: tuple[IO[str], ...], vault: str | None
+) -> dict[str, SecretReference]:
+    """Collect the environment variables to set and the secrets they come from.
+
+    Args:
+        envs (tuple[str, ...]): Mappings passed on the command line, as VAR=SECRET.
+        env_files (tuple[IO[str], ...]): Files with one VAR=SECRET mapping per line. Blank lines and lines starting
+            with # are skipped.
+        vault (str | None): The vault of bare secret names.
+
+    Returns:
+        dict[str, SecretReference]: The secret for each variable. Later mappings win.
+
+    Raises:
+        UsageError: If a mapping is malformed.
+    """
+
+    lines = [(f.name, x) for f in env_files for x in f]
+    lines.extend(("--env", x) for x in envs)
+
+    mapping = {}
+    for source, line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        variable, _, spec = line.partition("=")
+        variable = variable.strip()
+        if variable.startswith("export "):
+            variable = variable[len("export ") :].strip()
+
+        if not variable or not spec.strip():
+            raise click.UsageError(
+                f"'{line}' in {source} must be in the form VAR=SECRET."
+            )
+        try:
+            mapping[variable] = SecretReference.from_spec(
+                spec.strip().strip("\"'"), vault
+            )
+        except ValueError as e:
+            raise click.UsageError(f"{e} in {source}.")
+
+    return mapping
+
+
+def open_cache(ttl: float, console: Console) -> ValueCache | None:
+    """Open the cache of values fetched for exec.
+
+    The cache is kept apart from the browser's value cache, so that a short TTL here never expires values there.
+
+    Args:
+        ttl (float): How long values are kept, in seconds. Zero disables the cache.
+        console (Console): The console warnings are reported on.
+
+    Returns:
+        ValueCache | None: The cache, or None if it is disabled or unavailable.
+    """
+
+    if ttl <= 0:
+        return None
+
+    try:
+        return ValueCache(
+            get_cache_key(), path=EXEC_CACHE_PATH, ttl=timedelta(seconds=ttl)
+        )
+    except CacheKeyException as e:
+        console.print(f"Not caching values: {e}")
+        return None
+
+
+@click.command(
+    name="exec",
+    help=EXEC_HELP,
+    context_settings={"allow_interspersed_args": False},
+)
+@click.option(
+    "--vault",
+    default=None,
+    help="The vault of bare secret names. Defaults to the vault in the configuration file.",
+)
+@click.option(
+    "--env",
+    "-e",
+    "envs",
+    multiple=True,
+    shell_complete=complete_env,
+    help="An environment variable to set, as VAR=SECRET. Can be repeated.",
+)
+@click.option(
+    "--env-file",
+    "env_files",
+    type=click.File("r"),
+    multiple=True,
+    help="Read VAR=SECRET mappings from a file, one per line. Can be repeated.",
+)
+@click.option(
+    "--cache-ttl",
+    default=0.0,
+    show_default=True,
+    help="Keep fetched values in an encrypted cache for this many seconds, so that repeated runs skip the vault.",
+)
+@click.option(
+    "--attempts",
+    default=3,
+    show_default=True,
+    help="The maximum number of attempts per secret.",
+)
+@click.argument("command", nargs=-1, required=True, type=click.UNPROCESSED)
+@click.pass_obj
+def exec_command(
+    obj: dict[str, Any],
+    vault: str | None,
+    envs: tuple[str, ...],
+    env_files: tuple[IO[str], ...],
+    cache_ttl: float,
+    attempts: int,
+    command: tuple[str, ...],
+) -> None:
+    """Run a command with secrets in its environment.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vault (str | None): The vault of bare secret names.
+        envs (tuple[str, ...]): Mappings of environment variables to secrets.
+        env_files (tuple[IO[str], ...]): Files of mappings.
+        cache_ttl (float): How long fetched values are cached, in seconds.
+        attempts (int): The maximum number of attempts per secret.
+        command (tuple[str, ...]): The command and its arguments.
+
+    Raises:
+        SystemExit: If a secret could not be fetched or the command could not be run.
+    """
+
+    config = read_config(obj)
+    mapping = read_mapping(envs, env_files, vault or config.get("keyvault"))
+    console = Console(stderr=True)
+
+    cache = open_cache(cache_ttl, console)
+    values: dict[SecretReference, str] = {}
+    if cache is not None:
+        for reference in set(mapping.values()):
+            value = cache.get(*reference.key)
+            if value is not None:
+                values[reference] = value
+
+    # Each distinct secret is fetched once, however many variables it is mapped to.
+    missing = list(set(mapping.values()) - values.keys())
+    failed = False
+    for resolution in asyncio.run(
+        resolve_references(missing, attempts=attempts, config=config)
+    ):
+        reference = resolution.reference
+        if resolution.status is not ResolveStatus.RESOLVED or resolution.value is None:
+            console.print(
+                f"Failed to fetch {reference}: {resolution.status.value} {resolution.error}"
+            )
+            failed = True
+            continue
+
+        values[reference] = resolution.value
+        if cache is not None:
+            cache.put(*reference.key, resolution.value)
+
+    if cache is not None:
+        cache.close()
+    if failed:
+        raise SystemExit(1)
+
+    env = dict(os.environ)
+    env.update({k: values[v] for k, v in mapping.items()})
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execvpe(command[0], list(command), env)
+    except OSError as e:
+        console.print(f"Failed to run {command[0]}: {e}")
+        raise SystemExit(127)
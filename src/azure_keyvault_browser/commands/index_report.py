@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import IO, Any, Mapping
+
+import click
+from azure.keyvault.secrets import SecretProperties
+from rich.console import Console
+from rich.table import Table
+
+from ..backend import open_backend
+from ..search import TOKEN_PATTERN, AnalyzerProfile, Search
+from .options import read_config, resolve_vaults, vault_option, write_record
+
+INDEX_REPORT_HELP = """
+Compare the search analyzer profiles against the secrets in a vault. Each profile is built in a temporary directory
+and its size on disk, build time and query latency are written as NDJSON. Set search_profile in your config to use a
+profile in the browser.
+"""
+
+
+def sample_queries(names: list[str], count: int = 20, seed: int = 0) -> list[str]:
+    """Build a representative set of queries from secret names.
+
+    A short substring, a longer substring and a whole token are taken from a sample of names, which covers the broad
+    queries typed first and the narrower ones that follow.
+
+    Args:
+        names (list[str]): The secret names.
+        count (int): The number of names to sample. Defaults to 20.
+        seed (int): The random seed, so that profiles are compared on the same queries. Defaults to 0.
+
+    Returns:
+        list[str]: The queries.
+    """
+
+    rng = random.Random(seed)
+    queries: list[str] = []
+    for name in rng.sample(names, min(count, len(names))):
+        name = name.lower()
+        tokens = re.findall(TOKEN_PATTERN, name)
+        if tokens:
+            queries.append(rng.choice(tokens))
+        for size in (2, 4):
+            if len(name) >= size:
+                start = rng.randrange(len(name) - size + 1)
+                queries.append(name[start : start + size])
+
+    return queries
+
+
+def directory_size(path: str) -> int:
+    """Sum the size of the files in a directory.
+
+    Args:
+        path (str): The directory.
+
+    Returns:
+        int: The size in bytes.
+    """
+
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def profile_report(
+    profile: AnalyzerProfile,
+    vault: str,
+    items: list[SecretProperties],
+    queries: list[str],
+    repeat: int,
+) -> dict[str, Any]:
+    """Build an index with a profile and measure it.
+
+    Args:
+        profile (AnalyzerProfile): The profile to measure.
+        vault (str): The name of the vault the secrets belong to.
+        items (list[SecretProperties]): The secrets to index.
+        queries (list[str]): The queries to time.
+        repeat (int): The number of times each query is run.
+
+    Returns:
+        dict[str, Any]: The measurements.
+    """
+
+    with tempfile.TemporaryDirectory() as path:
+        search = Search(profile=profile, path=path)
+
+        started = time.perf_counter()
+        search.build(items)
+        build_seconds = time.perf_counter() - started
+
+        assert search.index is not None
+        with search.index.reader() as reader:
+            terms = reader.field_length("title")
+            unique_terms = sum(1 for _ in reader.lexicon("title"))
+
+        latencies = []
+        matches = []
+        for query in queries:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor = search.cursor(query)
+                total = len(cursor)
+                latencies.append(time.perf_counter() - started)
+            matches.append(total)
+
+        size = directory_size(path)
+
+    latencies.sort()
+    return {
+        "vault": vault,
+        "profile": profile.value,
+        "description": profile.description,
+        "secrets": len(items),
+        "size_bytes": size,
+        "terms": terms,
+        "unique_terms": unique_terms,
+        "build_seconds": round(build_seconds, 4),
+        "queries": len(queries),
+        "query_p50_ms": (
+            round(statistics.median(latencies) * 1000, 3) if latencies else None
+        ),
+        "query_p95_ms": (
+            round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3)
+            if latencies
+            else None
+        ),
+        "mean_matches": round(statistics.mean(matches), 1) if matches else None,
+        "queries_without_matches": sum(1 for x in matches if x == 0),
+    }
+
+
+async def list_secrets(
+    vault: str, config: Mapping[str, Any] | None = None
+) -> list[SecretProperties]:
+    """List the secrets in a vault.
+
+    Args:
+        vault (str): The name of the vault.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        list[SecretProperties]: The secrets.
+    """
+
+    async with await open_backend(vault, config) as client:
+        return await client.get_secrets()
+
+
+@click.command(help=INDEX_REPORT_HELP)
+@vault_option
+@click.option(
+    "--profile",
+    "profiles",
+    type=click.Choice([x.value for x in AnalyzerProfile]),
+    multiple=True,
+    help="A profile to measure. Can be repeated. Defaults to every profile.",
+)
+@click.option(
+    "--query",
+    "queries",
+    multiple=True,
+    help="A query to time. Can be repeated. Defaults to queries sampled from the secret names.",
+)
+@click.option(
+    "--repeat",
+    default=5,
+    show_default=True,
+    help="The number of times each query is run.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON report to a file instead of stdout.",
+)
+@click.pass_obj
+def index_report(
+    obj: dict[str, Any],
+    vaults: tuple[str, ...],
+    profiles: tuple[str, ...],
+    queries: tuple[str, ...],
+    repeat: int,
+    output: IO[str],
+) -> None:
+    """Compare the search analyzer profiles against the secrets in a vault.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): The vaults to measure.
+        profiles (tuple[str, ...]): The profiles to measure.
+        queries (tuple[str, ...]): The queries to time.
+        repeat (int): The number of times each query is run.
+        output (IO[str]): The stream to write the report to.
+    """
+
+    selected = [AnalyzerProfile(x) for x in profiles] or list(AnalyzerProfile)
+
+    table = Table(box=None)
+    for column in ("vault", "profile", "size", "build", "p50", "p95", "matches"):
+        table.add_column(column)
+
+    for vault in resolve_vaults(obj, vaults):
+        items = asyncio.run(list_secrets(vault, read_config(obj)))
+        names = [x.name for x in items if x.name]
+        vault_queries = list(queries) or sample_queries(names)
+
+        for profile in selected:
+            record = profile_report(
+                profile, vault, items, vault_queries, max(repeat, 1)
+            )
+            write_record(output, record)
+            table.add_row(
+                vault,
+                profile.value,
+                f"{record['size_bytes'] / 1024:.0f} KiB",
+                f"{record['build_seconds']:.2f}s",
+                f"{record['query_p50_ms']}ms",
+                f"{record['query_p95_ms']}ms",
+                str(record["mean_matches"]),
+            )
+
+    console = Console(stderr=True)
+    console.print(table)
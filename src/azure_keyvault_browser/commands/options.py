@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import IO, Any, Callable, MutableMapping
+
+import click
+import toml
+from click.shell_completion import CompletionItem
+
+from ..config import CONFIG_DIR, get_config
+from ..names import NameIndex
+
+
+def vault_option(func: Callable) -> Callable:
+    """Add a repeatable --vault option to a command.
+
+    Args:
+        func (Callable): The command function.
+
+    Returns:
+        Callable: The decorated command function.
+    """
+
+    return click.option(
+        "--vault",
+        "vaults",
+        multiple=True,
+        help="A Key Vault to use. Can be repeated. Defaults to the vault in the configuration file.",
+    )(func)
+
+
+def resolve_vaults(obj: dict[str, Any], vaults: tuple[str, ...]) -> list[str]:
+    """Resolve the vaults a command should run against.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): Vaults passed on the command line.
+
+    Returns:
+        list[str]: The vault names.
+    """
+
+    if vaults:
+        return list(dict.fromkeys(vaults))
+
+    return [get_config(obj.get("config"))["keyvault"]]
+
+
+def read_config(obj: dict[str, Any]) -> MutableMapping[str, Any]:
+    """Read the configuration file without prompting to create one.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+
+    Returns:
+        MutableMapping[str, Any]: The configuration, or an empty one if there is no configuration file.
+    """
+
+    path = obj.get("config") or f"{CONFIG_DIR}/config.toml"
+    return toml.load(path) if os.path.exists(path) else {}
+
+
+def write_record(output: IO[str], record: dict[str, Any]) -> None:
+    """Write a single record as a line of NDJSON and flush it so consumers see it straight away.
+
+    Args:
+        output (IO[str]): The stream to write to.
+        record (dict[str, Any]): The record to write.
+    """
+
+    output.write(json.dumps(record, default=str) + "\n")
+    output.flush()
+
+
+def complete_secret_names(
+    ctx: click.Context, param: click.Parameter, incomplete: str
+) -> list[CompletionItem]:
+    """Complete a secret name from the name indexes saved by the browser, the daemon and watch.
+
+    Azure is never contacted, so a vault that has not been listed on this machine has nothing to complete.
+
+    Args:
+        ctx (click.Context): The context of the command being completed.
+        param (click.Parameter): The parameter being completed.
+        incomplete (str): The part of the name typed so far.
+
+    Returns:
+        list[CompletionItem]: The matching names.
+    """
+
+    vaults = ctx.params.get("vaults") or ctx.params.get("vault") or ()
+    if isinstance(vaults, str):
+        vaults = (vaults,)
+    if not vaults:
+        # The root command does not run while completing, so read its options from the context directly.
+        config = read_config({"config": ctx.find_root().params.get("config")})
+        vaults = (config["keyvault"],) if config.get("keyvault") else ()
+
+    names: set[str] = set()
+    for vault in vaults:
+        with NameIndex(vault) as index:
+            if index.open():
+                names.update(index.complete(incomplete))
+
+    return [CompletionItem(x) for x in sorted(names, key=str.lower)]
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from collections import Counter, defaultdict
+from typing import IO, Any
+
+import click
+from rich.console import Console
+
+from ..references import (
+    ReferenceMatch,
+    ResolveStatus,
+    SecretReference,
+    find_references,
+    resolve_references,
+    substitute,
+)
+from .options import read_config, write_record
+
+RESOLVE_HELP = """
+Find the Key Vault references in settings files, such as @Microsoft.KeyVault(SecretUri=...) and
+@Microsoft.KeyVault(VaultName=...;SecretName=...), and resolve them. Each distinct reference is fetched once however
+many files use it, and fetches run concurrently per vault. A report of every reference is written as NDJSON, without
+values. With --output-dir a copy of each file is written with the references replaced by their values.
+"""
+
+
+def output_path(output_dir: str, path: str) -> str:
+    """Work out where the resolved copy of a file is written.
+
+    Args:
+        output_dir (str): The output directory.
+        path (str): The file.
+
+    Returns:
+        str: The path of the copy, keeping the file's path relative to the working directory where there is one.
+    """
+
+    relative = os.path.relpath(path)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(path)
+    return os.path.join(output_dir, relative)
+
+
+def plan_outputs(output_dir: str, paths: list[str]) -> dict[str, str]:
+    """Work out where the resolved copy of every file is written, before anything is fetched.
+
+    Args:
+        output_dir (str): The output directory.
+        paths (list[str]): The files.
+
+    Returns:
+        dict[str, str]: The path of the copy of each file.
+
+    Raises:
+        UsageError: If a copy would overwrite one of the files or another copy.
+    """
+
+    sources = {os.path.realpath(x): x for x in paths}
+    written: dict[str, str] = {}
+    outputs = {}
+    for path in paths:
+        output = output_path(output_dir, path)
+        real = os.path.realpath(output)
+        if real in sources:
+            raise click.UsageError(
+                f"The resolved copy of {path} would overwrite {sources[real]}. Choose another --output-dir."
+            )
+        if real in written:
+            raise click.UsageError(
+                f"The resolved copies of {written[real]} and {path} would both be written to {output}."
+            )
+        written[real] = path
+        outputs[path] = output
+
+    return outputs
+
+
+def write_resolved(path: str, text: str) -> None:
+    """Write a resolved file that only the current user can read, since it holds secret values.
+
+    The file is written to a temporary file, which is only readable by the current user, and moved into place, so an
+    existing file does not keep its permissions.
+
+    Args:
+        path (str): The path to write to.
+        text (str): The contents.
+    """
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    fd, temp = tempfile.mkstemp(dir=directory or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.unlink(temp)
+
+
+@click.command(help=RESOLVE_HELP)
+@click.argument(
+    "files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Write a copy of each file with the resolved references replaced by their values.",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Exit with status 1 if any reference is invalid or cannot be resolved.",
+)
+@click.option(
+    "--concurrency",
+    default=32,
+    show_default=True,
+    help="The maximum number of secrets fetched at once per vault.",
+)
+@click.option(
+    "--rate",
+    default=200.0,
+    show_default=True,
+    help="The maximum number of secrets fetched per second per vault.",
+)
+@click.option(
+    "--attempts",
+    default=3,
+    show_default=True,
+    help="The maximum number of attempts per reference.",
+)
+@click.option(
+    "--report",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON report to a file instead of stdout.",
+)
+@click.pass_obj
+def resolve(
+    obj: dict[str, Any],
+    files: tuple[str, ...],
+    output_dir: str | None,
+    check: bool,
+    concurrency: int,
+    rate: float,
+    attempts: int,
+    report: IO[str],
+) -> None:
+    """Resolve the Key Vault references in settings files.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        files (tuple[str, ...]): The files to scan.
+        output_dir (str | None): The directory to write resolved copies to.
+        check (bool): Exit with status 1 if any reference is broken.
+        concurrency (int): The maximum number of fetches in flight per vault.
+        rate (float): The maximum number of fetches started per second per vault.
+        attempts (int): The maximum number of attempts per reference.
+        report (IO[str]): The stream to write the report to.
+
+    Raises:
+        SystemExit: If --check is given and a reference is broken.
+    """
+
+    texts: dict[str, str] = {}
+    locations: dict[SecretReference, list[ReferenceMatch]] = defaultdict(list)
+    invalid: list[ReferenceMatch] = []
+    paths = list(dict.fromkeys(files))
+    outputs = plan_outputs(output_dir, paths) if output_dir is not None else {}
+
+    for path in paths:
+        with open(path) as f:
+            texts[path] = f.read()
+        for match in find_references(texts[path], path):
+            if match.reference is None:
+                invalid.append(match)
+            else:
+                locations[match.reference].append(match)
+
+    resolutions = asyncio.run(
+        resolve_references(
+            list(locations), concurrency, rate, attempts, read_config(obj)
+        )
+    )
+
+    totals: Counter = Counter()
+    for resolution in sorted(resolutions, key=lambda x: x.reference.key):
+        totals[resolution.status.value] += 1
+        write_record(report, resolution.to_dict(locations[resolution.reference]))
+
+    for match in invalid:
+        totals[ResolveStatus.INVALID.value] += 1
+        write_record(
+            report,
+            {
+                "reference": match.text,
+                "status": ResolveStatus.INVALID.value,
+                "error": match.error,
+                "locations": [f"{match.path}:{match.line}"],
+            },
+        )
+
+    if output_dir is not None:
+        values = {
+            x.reference: x.value
+            for x in resolutions
+            if x.status is ResolveStatus.RESOLVED and x.value is not None
+        }
+        for path, text in texts.items():
+            write_resolved(
+                outputs[path],
+                substitute(text, values, escape_json=path.endswith(".json")),
+            )
+
+    console = Console(stderr=True)
+    summary = ", ".join(f"{v} {k}" for k, v in sorted(totals.items())) or "none found"
+    console.print(
+        f"Resolve complete: {len(locations)} distinct references in {len(texts)} files, {summary}"
+    )
+
+    if check and (totals.keys() - {ResolveStatus.RESOLVED.value}):
+        raise SystemExit(1)
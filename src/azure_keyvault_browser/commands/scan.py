@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from datetime import timedelta
+from typing import IO, Any, Mapping
+
+import click
+from azure.core.exceptions import AzureError
+from rich.console import Console
+
+from ..backend import open_backend
+from ..hygiene import FindingType, HygieneScanner
+from .options import read_config, resolve_vaults, vault_option, write_record
+
+
+async def scan_vaults(
+    vaults: list[str],
+    scanner: HygieneScanner,
+    output: IO[str],
+    config: Mapping[str, Any] | None = None,
+) -> Counter:
+    """Scan vaults concurrently, writing findings as they are found. A vault that cannot be scanned is reported as an
+    error finding without a secret, and the other vaults are still scanned.
+
+    Args:
+        vaults (list[str]): The names of the vaults to scan.
+        scanner (HygieneScanner): The configured scanner.
+        output (IO[str]): The stream to write NDJSON findings to.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        Counter: The number of findings of each type.
+    """
+
+    totals: Counter = Counter()
+
+    async def scan_vault(vault: str) -> None:
+        try:
+            async with await open_backend(vault, config) as client:
+                async for finding in scanner.scan(client):
+                    totals[finding.type.value] += 1
+                    write_record(output, finding.to_dict())
+        except AzureError as e:
+            totals[FindingType.ERROR.value] += 1
+            write_record(
+                output,
+                {
+                    "vault": vault,
+                    "name": None,
+                    "version": None,
+                    "finding": FindingType.ERROR.value,
+                    "detail": f"could not scan the vault: {e}",
+                    "enabled": None,
+                    "expires_on": None,
+                    "updated_on": None,
+                },
+            )
+
+    await asyncio.gather(*[scan_vault(x) for x in vaults])
+    return totals
+
+
+SCAN_HELP = """
+Scan vaults for expired, expiring, disabled and poorly described secrets. Findings are streamed as NDJSON while
+each vault is enumerated.
+"""
+
+
+@click.command(help=SCAN_HELP)
+@vault_option
+@click.option(
+    "--expiring-within",
+    default=30,
+    show_default=True,
+    help="Report secrets that expire within this many days.",
+)
+@click.option(
+    "--stale-versions",
+    default=0,
+    show_default=True,
+    help="Walk version histories and report secrets with at least this many stale enabled versions. 0 disables.",
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    show_default=True,
+    help="The maximum number of version histories walked at once per vault.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON report to a file instead of stdout.",
+)
+@click.pass_obj
+def scan(
+    obj: dict[str, Any],
+    vaults: tuple[str, ...],
+    expiring_within: int,
+    stale_versions: int,
+    concurrency: int,
+    output: IO[str],
+) -> None:
+    """Scan vaults for hygiene problems.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): The vaults to scan.
+        expiring_within (int): The expiry window in days.
+        stale_versions (int): The stale enabled version threshold.
+        concurrency (int): The maximum number of version histories walked at once.
+        output (IO[str]): The stream to write the report to.
+
+    Raises:
+        SystemExit: If a vault or a version history could not be scanned.
+    """
+
+    scanner = HygieneScanner(
+        expiring_within=timedelta(days=expiring_within),
+        stale_versions=stale_versions,
+        concurrency=concurrency,
+    )
+    totals = asyncio.run(
+        scan_vaults(resolve_vaults(obj, vaults), scanner, output, read_config(obj))
+    )
+
+    console = Console(stderr=True)
+    summary = ", ".join(f"{v} {k}" for k, v in sorted(totals.items())) or "no findings"
+    console.print(f"Scan complete: {summary}")
+
+    if totals[FindingType.ERROR.value]:
+        raise SystemExit(1)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from typing import IO, Any, Mapping
+
+import click
+from azure.keyvault.secrets import SecretProperties
+from rich.console import Console
+
+from ..backend import open_backend
+from ..duplicates import HashIndex, get_salt
+from ..sync import SecretSync, SyncStatus, read_source
+from .options import read_config, write_record
+
+SYNC_HELP = """
+Sync secrets into a vault from a .env or JSON file. Underscores in keys become dashes, so DB_PASSWORD is synced to the
+DB-PASSWORD secret. Current values are read concurrently and compared by salted hash, and only secrets that are
+missing or have a different value are written, so re-running a sync creates no new versions. Secrets that are not in
+the file are left alone. Per secret results are written as NDJSON, without values.
+"""
+
+
+async def sync_secrets(
+    vault: str,
+    values: Mapping[str, str],
+    index: HashIndex,
+    dry_run: bool,
+    concurrency: int,
+    rate: float,
+    attempts: int,
+    output: IO[str],
+    config: Mapping[str, Any] | None = None,
+) -> Counter:
+    """List the vault once and sync the secrets that differ.
+
+    Args:
+        vault (str): The name of the vault.
+        values (Mapping[str, str]): The values the secrets should have, by name.
+        index (HashIndex): The digests of values already read.
+        dry_run (bool): Plan the writes without making them.
+        concurrency (int): The maximum number of secrets synced at once.
+        rate (float): The maximum number of reads and writes started per second.
+        attempts (int): The maximum number of attempts per request.
+        output (IO[str]): The stream to write NDJSON results to.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        Counter: The number of results with each status.
+    """
+
+    totals: Counter = Counter()
+    wanted = {x.lower() for x in values}
+
+    async with await open_backend(vault, config) as client:
+        existing: dict[str, SecretProperties] = {}
+        async for properties in client.iter_secrets():
+            if properties.name and properties.name.lower() in wanted:
+                existing[properties.name.lower()] = properties
+
+        syncer = SecretSync(
+            client, index, concurrency=concurrency, rate=rate, attempts=attempts
+        )
+        async for result in syncer.apply(values, existing, dry_run=dry_run):
+            totals[result.status.value] += 1
+            write_record(output, result.to_dict())
+
+    return totals
+
+
+@click.command(help=SYNC_HELP)
+@click.argument("source", type=click.File("r"))
+@click.option(
+    "--vault",
+    default=None,
+    help="The Key Vault to sync into. Defaults to the vault in the configuration file.",
+)
+@click.option(
+    "--format",
+    "source_format",
+    type=click.Choice(["auto", "env", "json"]),
+    default="auto",
+    show_default=True,
+    help="The format of the source. auto reads files ending in .json as JSON and anything else as .env.",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Show what would be written without writing anything.",
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    show_default=True,
+    help="The maximum number of secrets synced at once.",
+)
+@click.option(
+    "--rate",
+    default=10.0,
+    show_default=True,
+    help="The maximum number of reads and writes started per second.",
+)
+@click.option(
+    "--attempts",
+    default=3,
+    show_default=True,
+    help="The maximum number of attempts per request.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON results to a file instead of stdout.",
+)
+@click.pass_obj
+def sync(
+    obj: dict[str, Any],
+    source: IO[str],
+    vault: str | None,
+    source_format: str,
+    dry_run: bool,
+    concurrency: int,
+    rate: float,
+    attempts: int,
+    output: IO[str],
+) -> None:
+    """Sync secrets into a vault from a .env or JSON file.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        source (IO[str]): The file to sync from.
+        vault (str | None): The vault to sync into.
+        source_format (str): The format of the file: auto, env or json.
+        dry_run (bool): Plan the writes without making them.
+        concurrency (int): The maximum number of secrets synced at once.
+        rate (float): The maximum number of reads and writes started per second.
+        attempts (int): The maximum number of attempts per request.
+        output (IO[str]): The stream to write results to.
+
+    Raises:
+        UsageError: If the source file is malformed or there is no vault to sync into.
+        SystemExit: If a secret could not be synced.
+    """
+
+    if source_format == "auto":
+        source_format = "json" if source.name.lower().endswith(".json") else "env"
+
+    try:
+        values = read_source(source.read(), is_json=source_format == "json")
+    except ValueError as e:
+        raise click.UsageError(f"Cannot read {source.name}: {e}")
+
+    # A sync often runs unattended, so the configuration is read without prompting to create one.
+    config = read_config(obj)
+    vault_name = vault or config.get("keyvault")
+    if not vault_name:
+        raise click.UsageError(
+            "No vault to sync into. Pass --vault or set keyvault in the configuration file."
+        )
+
+    index = HashIndex(get_salt())
+    index.load()
+
+    totals = asyncio.run(
+        sync_secrets(
+            vault_name,
+            values,
+            index,
+            dry_run,
+            concurrency,
+            rate,
+            attempts,
+            output,
+            config,
+        )
+    )
+    index.save()
+
+    console = Console(stderr=True)
+    summary = (
+        ", ".join(f"{v} {k}" for k, v in sorted(totals.items())) or "nothing to sync"
+    )
+    console.print(f"Sync {'plan' if dry_run else 'complete'}: {summary}")
+
+    if totals[SyncStatus.FAILED.value]:
+        raise SystemExit(1)
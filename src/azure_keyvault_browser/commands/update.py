@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import Counter
+from datetime import datetime
+from typing import IO, TYPE_CHECKING, Any, Mapping
+
+import click
+
+from .options import complete_secret_names, read_config, resolve_vaults, write_record
+
+if TYPE_CHECKING:
+    from ..bulk import PropertyChange
+
+# --name completes secret names, so this module is imported whenever a shell completes an update command line. The
+# Azure SDK and rich are slow to import and are only imported once the command runs.
+
+UPDATE_HELP = """
+Apply tag, enabled and expiry changes to many secrets at once. Secrets whose properties already match are skipped,
+updates run with bounded concurrency and throttled requests are retried. Per secret results are written as NDJSON.
+"""
+
+
+def read_names(
+    names: tuple[str, ...], names_from: IO[str] | None, retry_failed: IO[str] | None
+) -> list[str]:
+    """Collect the secret names to update from every source.
+
+    Args:
+        names (tuple[str, ...]): Names passed on the command line.
+        names_from (IO[str] | None): A file containing one name per line.
+        retry_failed (IO[str] | None): An NDJSON report from a previous run. Failed secrets are selected.
+
+    Returns:
+        list[str]: The de-duplicated names.
+    """
+
+    from ..bulk import UpdateStatus
+
+    selected = list(names)
+
+    if names_from is not None:
+        selected.extend(x.strip() for x in names_from if x.strip())
+
+    if retry_failed is not None:
+        for line in retry_failed:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("status") == UpdateStatus.FAILED.value:
+                selected.append(record["name"])
+
+    return list(dict.fromkeys(selected))
+
+
+async def update_secrets(
+    vault: str,
+    names: list[str],
+    change: PropertyChange,
+    dry_run: bool,
+    concurrency: int,
+    rate: float,
+    attempts: int,
+    output: IO[str],
+    config: Mapping[str, Any] | None = None,
+) -> Counter:
+    """List the vault once and apply the change to the selected secrets.
+
+    Args:
+        vault (str): The name of the vault.
+        names (list[str]): The names of the secrets to update.
+        change (PropertyChange): The change to apply.
+        dry_run (bool): Plan the updates without applying them.
+        concurrency (int): The maximum number of updates in flight.
+        rate (float): The maximum number of updates started per second.
+        attempts (int): The maximum number of attempts per secret.
+        output (IO[str]): The stream to write NDJSON results to.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        Counter: The number of results with each status.
+    """
+
+    from ..backend import open_backend
+    from ..bulk import BulkUpdater, UpdateStatus
+
+    totals: Counter = Counter()
+    wanted = {x.lower(): x for x in names}
+
+    async with await open_backend(vault, config) as client:
+        cached = {}
+        async for properties in client.iter_secrets():
+            if properties.name and properties.name.lower() in wanted:
+                cached[properties.name.lower()] = properties
+
+        for name in wanted.keys() - cached.keys():
+            totals[UpdateStatus.FAILED.value] += 1
+            write_record(
+                output,
+                {
+                    "name": wanted[name],
+                    "status": UpdateStatus.FAILED.value,
+                    "error": "secret not found",
+                },
+            )
+
+        updater = BulkUpdater(
+            client, concurrency=concurrency, rate=rate, attempts=attempts
+        )
+        async for result in updater.apply(cached.values(), change, dry_run=dry_run):
+            totals[result.status.value] += 1
+            write_record(output, result.to_dict())
+
+    return totals
+
+
+@click.command(help=UPDATE_HELP)
+@click.option(
+    "--vault",
+    default=None,
+    help="The Key Vault to update. Defaults to the vault in the configuration file.",
+)
+@click.option(
+    "--name",
+    "names",
+    multiple=True,
+    shell_complete=complete_secret_names,
+    help="A secret to update. Can be repeated.",
+)
+@click.option(
+    "--names-from",
+    type=click.File("r"),
+    default=None,
+    help="Read secret names from a file, one per line.",
+)
+@click.option(
+    "--retry-failed",
+    type=click.File("r"),
+    default=None,
+    help="Retry the secrets that failed in a previous NDJSON report.",
+)
+@click.option(
+    "--tag", "tags", multiple=True, help="A tag to set, as key=value. Can be repeated."
+)
+@click.option(
+    "--remove-tag",
+    "remove_tags",
+    multiple=True,
+    help="A tag to remove. Can be repeated.",
+)
+@click.option(
+    "--enabled/--disabled", default=None, help="Enable or disable the secrets."
+)
+@click.option(
+    "--expires-on",
+    type=click.DateTime(),
+    default=None,
+    help="Set the expiry date (UTC).",
+)
+@click.option(
+    "--dry-run", is_flag=True, help="Show what would change without updating anything."
+)
+@click.option(
+    "--concurrency",
+    default=8,
+    show_default=True,
+    help="The maximum number of updates in flight.",
+)
+@click.option(
+    "--rate",
+    default=10.0,
+    show_default=True,
+    help="The maximum number of updates started per second.",
+)
+@click.option(
+    "--attempts",
+    default=3,
+    show_default=True,
+    help="The maximum number of attempts per secret.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON results to a file instead of stdout.",
+)
+@click.pass_obj
+def update(
+    obj: dict[str, Any],
+    vault: str | None,
+    names: tuple[str, ...],
+    names_from: IO[str] | None,
+    retry_failed: IO[str] | None,
+    tags: tuple[str, ...],
+    remove_tags: tuple[str, ...],
+    enabled: bool | None,
+    expires_on: datetime | None,
+    dry_run: bool,
+    concurrency: int,
+    rate: float,
+    attempts: int,
+    output: IO[str],
+) -> None:
+    """Apply property changes to many secrets.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vault (str | None): The vault to update.
+        names (tuple[str, ...]): The secrets to update.
+        names_from (IO[str] | None): A file of secret names.
+        retry_failed (IO[str] | None): A previous report to retry failures from.
+        tags (tuple[str, ...]): Tags to set as key=value.
+        remove_tags (tuple[str, ...]): Tags to remove.
+        enabled (bool | None): Enable or disable the secrets.
+        expires_on (datetime | None): The new expiry date.
+        dry_run (bool): Plan the updates without applying them.
+        concurrency (int): The maximum number of updates in flight.
+        rate (float): The maximum number of updates started per second.
+        attempts (int): The maximum number of attempts per secret.
+        output (IO[str]): The stream to write results to.
+
+    Raises:
+        UsageError: If a tag is malformed, or there is nothing to change or nothing to update.
+    """
+
+    from rich.console import Console
+
+    from ..bulk import PropertyChange
+
+    for tag in tags:
+        if "=" not in tag:
+            raise click.UsageError(f"Tag '{tag}' must be in the form key=value.")
+
+    change = PropertyChange.from_dict(
+        {
+            "tags": dict(x.split("=", 1) for x in tags),
+            "remove_tags": remove_tags,
+            "enabled": enabled,
+            "expires_on": expires_on,
+        }
+    )
+    if not change:
+        raise click.UsageError(
+            "Nothing to change. Use --tag, --remove-tag, --enabled/--disabled or --expires-on."
+        )
+
+    selected = read_names(names, names_from, retry_failed)
+    if not selected:
+        raise click.UsageError(
+            "No secrets selected. Use --name, --names-from or --retry-failed."
+        )
+
+    vault_name = vault or resolve_vaults(obj, ())[0]
+    totals = asyncio.run(
+        update_secrets(
+            vault_name,
+            selected,
+            change,
+            dry_run,
+            concurrency,
+            rate,
+            attempts,
+            output,
+            read_config(obj),
+        )
+    )
+
+    console = Console(stderr=True)
+    summary = ", ".join(f"{v} {k}" for k, v in sorted(totals.items()))
+    console.print(f"Update complete: {summary}")
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from typing import IO, Any, Mapping
+
+import click
+from rich.console import Console
+
+from ..azure import throttle_delay
+from ..backend import open_backend
+from ..changefeed import ChangeType, PollInterval, Snapshot
+from ..concurrency import RateLimiter, retry
+from ..names import NameIndex
+from .options import read_config, resolve_vaults, vault_option, write_record
+
+WATCH_HELP = """
+Watch vaults for created, updated, disabled and deleted secrets. Each poll is compared with a snapshot stored on disk,
+and only the changes are streamed as NDJSON, so a restarted watch carries on where the last one stopped. Vaults that
+are quiet are polled less often.
+"""
+
+
+async def watch_vault(
+    vault: str,
+    interval: PollInterval,
+    limiter: RateLimiter,
+    output: IO[str],
+    console: Console,
+    totals: Counter,
+    once: bool = False,
+    initial: bool = False,
+    attempts: int = 3,
+    config: Mapping[str, Any] | None = None,
+) -> None:
+    """Poll a vault and write the changes found.
+
+    Args:
+        vault (str): The name of the vault.
+        interval (PollInterval): The adaptive interval between polls.
+        limiter (RateLimiter): Limits how often vaults are listed, shared by every vault being watched.
+        output (IO[str]): The stream to write NDJSON events to.
+        console (Console): The console errors are reported on.
+        totals (Counter): Counts the events of each kind.
+        once (bool): Poll once and return. Defaults to False.
+        initial (bool): Report every secret as created when there is no snapshot yet. Defaults to False.
+        attempts (int): The maximum number of attempts per listing. Defaults to 3.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+    """
+
+    snapshot = Snapshot(vault)
+    snapshot.load()
+    names = NameIndex(vault)
+    names_saved = False
+
+    async with await open_backend(vault, config) as client:
+        while True:
+            try:
+                items, _ = await retry(
+                    client.get_secrets, throttle_delay, attempts, limiter
+                )
+            except Exception as e:
+                console.print(f"Failed to list {vault}: {e}")
+                if once:
+                    return
+                await asyncio.sleep(interval.back_off())
+                continue
+
+            events = snapshot.diff(items, initial=initial)
+            for event in events:
+                totals[event.type.value] += 1
+                write_record(output, event.to_dict())
+            snapshot.save()
+
+            # Keep the names used for shell completion up to date while the vault is being watched anyway.
+            if not names_saved or any(
+                x.type in (ChangeType.CREATED, ChangeType.DELETED) for x in events
+            ):
+                names.write(x.name for x in items if x.name)
+                names_saved = True
+
+            if once:
+                return
+            await asyncio.sleep(interval.next(changed=bool(events)))
+
+
+async def watch_vaults(
+    vaults: list[str],
+    output: IO[str],
+    min_interval: float,
+    max_interval: float,
+    rate: float,
+    once: bool,
+    initial: bool,
+    config: Mapping[str, Any] | None = None,
+) -> Counter:
+    """Watch vaults concurrently.
+
+    Args:
+        vaults (list[str]): The names of the vaults to watch.
+        output (IO[str]): The stream to write NDJSON events to.
+        min_interval (float): The interval after a change, in seconds.
+        max_interval (float): The longest interval, in seconds.
+        rate (float): The maximum number of listings started per second across every vault.
+        once (bool): Poll each vault once and return.
+        initial (bool): Report every secret as created when there is no snapshot yet.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        Counter: The number of events of each kind.
+    """
+
+    totals: Counter = Counter()
+    limiter = RateLimiter(rate, burst=1)
+    console = Console(stderr=True)
+
+    await asyncio.gather(
+        *[
+            watch_vault(
+                vault,
+                PollInterval(min_interval, max_interval),
+                limiter,
+                output,
+                console,
+                totals,
+                once=once,
+                initial=initial,
+                config=config,
+            )
+            for vault in vaults
+        ]
+    )
+    return totals
+
+
+@click.command(help=WATCH_HELP)
+@vault_option
+@click.option(
+    "--interval",
+    default=30.0,
+    show_default=True,
+    help="The number of seconds between polls after a change.",
+)
+@click.option(
+    "--max-interval",
+    default=600.0,
+    show_default=True,
+    help="The longest number of seconds between polls of a quiet vault.",
+)
+@click.option(
+    "--rate",
+    default=1.0,
+    show_default=True,
+    help="The maximum number of vault listings started per second across every vault.",
+)
+@click.option(
+    "--once", is_flag=True, help="Poll each vault once and exit, for use from cron."
+)
+@click.option(
+    "--initial",
+    is_flag=True,
+    help="Report every secret as created when a vault has no snapshot yet.",
+)
+@click.option(
+    "--output",
+    type=click.File("w"),
+    default="-",
+    help="Write the NDJSON events to a file instead of stdout.",
+)
+@click.pass_obj
+def watch(
+    obj: dict[str, Any],
+    vaults: tuple[str, ...],
+    interval: float,
+    max_interval: float,
+    rate: float,
+    once: bool,
+    initial: bool,
+    output: IO[str],
+) -> None:
+    """Watch vaults for changes.
+
+    Args:
+        obj (dict[str, Any]): The context object created by the root command.
+        vaults (tuple[str, ...]): The vaults to watch.
+        interval (float): The interval after a change, in seconds.
+        max_interval (float): The longest interval, in seconds.
+        rate (float): The maximum number of listings started per second.
+        once (bool): Poll each vault once and exit.
+        initial (bool): Report every secret as created when there is no snapshot yet.
+        output (IO[str]): The stream to write the events to.
+    """
+
+    console = Console(stderr=True)
+    try:
+        totals = asyncio.run(
+            watch_vaults(
+                resolve_vaults(obj, vaults),
+                output,
+                interval,
+                max_interval,
+                rate,
+                once,
+                initial,
+                read_config(obj),
+            )
+        )
+    except KeyboardInterrupt:
+        console.print("Watch stopped")
+        return
+
+    summary = ", ".join(f"{v} {k}" for k, v in sorted(totals.items())) or "no changes"
+    console.print(f"Watch complete: {summary}")
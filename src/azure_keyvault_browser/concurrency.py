@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# The attribute retry records its attempts in on the error it gives up with.
+RETRY_ATTEMPTS = "retry_attempts"
+
+
+async def _iterate(items: Iterable[T] | AsyncIterable[T]) -> AsyncIterator[T]:
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def map_bounded(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T] | AsyncIterable[T],
+    limit: int = 8,
+) -> AsyncIterator[R]:
+    """Apply a coroutine function to items with a bounded number of calls in flight.
+
+    Items are consumed lazily, so an async iterable that is still being paged from the service can feed the
+    pipeline. Results are yielded in completion order. If the consumer stops early, or a call raises, any
+    outstanding calls are cancelled.
+
+    Args:
+        func (Callable[[T], Awaitable[R]]): The coroutine function to apply.
+        items (Iterable[T] | AsyncIterable[T]): The items to process.
+        limit (int): The maximum number of concurrent calls. Defaults to 8.
+
+    Yields:
+        R: The result of each call as it completes.
+    """
+
+    pending: set[asyncio.Future] = set()
+    try:
+        async for item in _iterate(items):
+            if len(pending) >= max(limit, 1):
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+
+            pending.add(asyncio.ensure_future(func(item)))
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                yield task.result()
+
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class RateLimiter:
+    """A token bucket that limits how often an operation may start."""
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        """A token bucket that limits how often an operation may start.
+
+        Args:
+            rate (float): The sustained number of operations allowed per second.
+            burst (int | None): The number of operations that may start at once. Defaults to the rate.
+        """
+
+        self.rate = rate
+        self.capacity = burst if burst else max(int(rate), 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: asyncio.Lock | None = None
+
+    async def __aenter__(self) -> RateLimiter:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        pass
+
+    async def acquire(self) -> None:
+        """Wait until an operation is allowed to start."""
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                elapsed = now - self._updated
+                self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop operations from starting for a while, for example when the service is throttling.
+
+        Args:
+            seconds (float): How long to pause for.
+        """
+
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+def attempts_made(error: Exception) -> int:
+    """The number of attempts retry made before giving up with an error.
+
+    Args:
+        error (Exception): The error raised by retry.
+
+    Returns:
+        int: The number of attempts, or 1 if the error was not raised by retry.
+    """
+
+    return getattr(error, RETRY_ATTEMPTS, 1)
+
+
+async def retry(
+    func: Callable[[], Awaitable[R]],
+    delay_for: Callable[[Exception], float | None],
+    attempts: int = 3,
+    limiter: RateLimiter | None = None,
+) -> tuple[R, int]:
+    """Call a coroutine function, retrying failures that are deemed transient.
+
+    Args:
+        func (Callable[[], Awaitable[R]]): The coroutine function to call.
+        delay_for (Callable[[Exception], float | None]): Returns how long to wait before retrying an error, or None
+            if the error should not be retried.
+        attempts (int): The maximum number of attempts. Defaults to 3.
+        limiter (RateLimiter | None): A rate limiter to acquire before each attempt and pause when retrying.
+            Defaults to None.
+
+    Returns:
+        tuple[R, int]: The result and the number of attempts it took.
+
+    Raises:
+        Exception: The last error if it is not transient or attempts are exhausted. The number of attempts made is
+            recorded on it, see attempts_made.
+    """
+
+    attempt = 0
+    while True:
+        attempt += 1
+        if limiter is not None:
+            await limiter.acquire()
+
+        try:
+            return await func(), attempt
+        except Exception as e:
+            delay = delay_for(e)
+            if delay is None or attempt >= attempts:
+                setattr(e, RETRY_ATTEMPTS, attempt)
+                raise
+
+            if limiter is not None:
+                limiter.pause(delay)
+            await asyncio.sleep(delay)
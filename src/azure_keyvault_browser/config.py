@@ -5,14 +5,12 @@ import re
 from typing import Any, MutableMapping
 
 import toml
-from rich.console import Console
-from validators.utils import validator
-
-from . import styles
-from .ask import Ask
 
 """
 All of the good stuff. This is should be the main point for app configuration.
+
+This module is imported when completing command lines in a shell, so anything slow to import that is only needed to
+create a configuration file is imported when it is needed.
 """
 
 # General
@@ -22,9 +20,21 @@ keyvault browser is a tool for browsing and searching for secrets in Azure Key V
 
 CONFIG_DIR = f"{os.getenv('HOME')}/.config/azure-keyvault-browser"
 INDEX_DIR = f"{CONFIG_DIR}/index"
+REPORT_DIR = f"{CONFIG_DIR}/reports"
+SALT_PATH = f"{CONFIG_DIR}/salt"
+HASH_INDEX_PATH = f"{CONFIG_DIR}/hashes.json"
+CACHE_PATH = f"{CONFIG_DIR}/cache.db"
+CACHE_SALT_PATH = f"{CONFIG_DIR}/cache.salt"
+EXEC_CACHE_PATH = f"{CONFIG_DIR}/exec-cache.db"
+EMULATOR_PATH = f"{CONFIG_DIR}/emulator.json"
+SNAPSHOT_DIR = f"{CONFIG_DIR}/snapshots"
+DAEMON_DIR = f"{CONFIG_DIR}/daemon"
+DAEMON_SOCKET_PATH = f"{DAEMON_DIR}/daemon.sock"
+DAEMON_LOG_PATH = f"{DAEMON_DIR}/daemon.log"
+HISTORY_DIR = f"{CONFIG_DIR}/history"
+NAMES_DIR = f"{CONFIG_DIR}/names"
 
 
-@validator
 def keyvault_name(name: str) -> bool:
     """Validate the name of the keyvault.
 
@@ -50,6 +60,11 @@ def set_config(path: str) -> MutableMapping[str, Any]:
         MutableMapping[str, Any]: Configuration for the client.
     """
 
+    from rich.console import Console
+
+    from . import styles
+    from .ask import Ask
+
     config = {}
     console = Console()
     ask = Ask()
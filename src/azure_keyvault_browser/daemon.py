@@ -0,0 +1,435 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import KeyVault
+from .codec import (
+    STREAM_LIMIT,
+    decode_date,
+    encode_change_set,
+    encode_error,
+    encode_properties,
+)
+from .config import DAEMON_DIR, DAEMON_SOCKET_PATH
+from .dataset import ChangeSet, Dataset
+from .names import NameIndex
+from .search import AnalyzerProfile, Search
+
+"""
+A local daemon that keeps the secret listings and search indexes of vaults warm between launches. The browser and the
+headless commands attach to it over a Unix socket owned by the current user and talk newline delimited JSON. Secret
+values are proxied to the vault on demand and are never held by the daemon.
+"""
+
+log = logging.getLogger(__name__)
+
+# Listings are streamed in chunks of this many secrets.
+CHUNK_SIZE = 500
+
+
+def fingerprint(properties: SecretProperties) -> tuple[Any, ...]:
+    """The listed properties of a secret that are compared to detect a change. The id is left out, because a listing
+    returns it without a version while a write returns it with one.
+
+    Args:
+        properties (SecretProperties): The properties.
+
+    Returns:
+        tuple[Any, ...]: The fingerprint.
+    """
+
+    return (
+        properties.name,
+        properties.updated_on,
+        properties.enabled,
+        properties.expires_on,
+        properties.content_type,
+        tuple(sorted((properties.tags or {}).items())),
+    )
+
+
+class VaultState:
+    """The warm listing and search index of a single vault."""
+
+    def __init__(
+        self, vault_name: str, profile: AnalyzerProfile, sync_interval: float
+    ) -> None:
+        """The warm listing and search index of a single vault.
+
+        Args:
+            vault_name (str): The name of the vault.
+            profile (AnalyzerProfile): How names are analysed for searching.
+            sync_interval (float): The number of seconds between listings of the vault.
+        """
+
+        self.vault_name = vault_name
+        self.client = KeyVault(vault_name=vault_name)
+        self.dataset = Dataset()
+        self.search = Search(profile=profile, path=f"{DAEMON_DIR}/{vault_name}/index")
+        self.names = NameIndex(vault_name)
+        self.sync_interval = sync_interval
+        self.listed = False
+        self.first_listing: asyncio.Future[None] = (
+            asyncio.get_event_loop().create_future()
+        )
+        self.subscribers: set[asyncio.Queue[ChangeSet]] = set()
+        self.lock = asyncio.Lock()
+        self.task: asyncio.Future | None = None
+
+    def start(self) -> None:
+        """Start keeping the vault warm in the background."""
+
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self) -> None:
+        """List the vault every sync interval until cancelled. The first listing is resolved once it has been tried."""
+
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                log.warning(f"Failed to sync {self.vault_name}: {e}")
+                if not self.first_listing.done():
+                    self.first_listing.set_exception(e)
+            else:
+                if not self.first_listing.done():
+                    self.first_listing.set_result(None)
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync(self) -> ChangeSet:
+        """List the vault and apply what changed since the last listing.
+
+        Key Vault has no change feed, so the full listing is compared with the dataset. Only the difference is written
+        to the search index and sent to subscribers.
+
+        Returns:
+            ChangeSet: The changes.
+        """
+
+        async with self.lock:
+            items = await self.client.get_secrets()
+            loop = asyncio.get_event_loop()
+
+            if not self.listed:
+                changes = self.dataset.reset(items)
+                await loop.run_in_executor(None, self.search.build, list(self.dataset))
+                self.listed = True
+            else:
+                current = {x.name: x for x in items if x.name}
+                removed = [
+                    x.name for x in self.dataset if x.name and x.name not in current
+                ]
+                changed = []
+                for name, properties in current.items():
+                    previous = self.dataset.get(name)
+                    if previous is None or fingerprint(previous) != fingerprint(
+                        properties
+                    ):
+                        changed.append(properties)
+
+                changes = self.dataset.apply(updated=changed, removed=removed)
+                if changes:
+                    await loop.run_in_executor(
+                        None,
+                        partial(self.search.update, added=changed, removed=removed),
+                    )
+
+            if changes.reset or changes.added or changes.removed:
+                names = [x.name for x in self.dataset if x.name]
+                await loop.run_in_executor(None, self.names.write, names)
+
+            self.publish(changes)
+            log.info(f"Synced {self.vault_name}: {len(changes)} changes")
+            return changes
+
+    async def apply(self, properties: SecretProperties) -> None:
+        """Apply properties returned by an update without waiting for the next listing.
+
+        Args:
+            properties (SecretProperties): The updated properties.
+        """
+
+        async with self.lock:
+            changes = self.dataset.apply(updated=[properties])
+            if changes:
+                await asyncio.get_event_loop().run_in_executor(
+                    None, partial(self.search.update, added=[properties])
+                )
+            self.publish(changes)
+
+    def publish(self, changes: ChangeSet) -> None:
+        """Send a change set to every subscriber.
+
+        Args:
+            changes (ChangeSet): The changes.
+        """
+
+        if changes:
+            for queue in self.subscribers:
+                queue.put_nowait(changes)
+
+    async def close(self) -> None:
+        """Stop syncing and close the client."""
+
+        if self.task is not None:
+            self.task.cancel()
+        await self.client.close()
+
+
+class Daemon:
+    """Serves warm vault state to local clients over a Unix socket."""
+
+    def __init__(
+        self,
+        path: str = DAEMON_SOCKET_PATH,
+        profile: AnalyzerProfile = AnalyzerProfile.NGRAM,
+        sync_interval: float = 60,
+    ) -> None:
+        """Serves warm vault state to local clients over a Unix socket.
+
+        Args:
+            path (str): The path of the socket. Defaults to DAEMON_SOCKET_PATH.
+            profile (AnalyzerProfile): How names are analysed for searching. Defaults to AnalyzerProfile.NGRAM.
+            sync_interval (float): The number of seconds between listings of each vault. Defaults to 60.
+        """
+
+        self.path = path
+        self.profile = profile
+        self.sync_interval = sync_interval
+        self.vaults: dict[str, VaultState] = {}
+        self.connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self.stopped = asyncio.Event()
+
+    async def vault(self, name: str) -> VaultState:
+        """Get the state of a vault, loading it on first use.
+
+        Args:
+            name (str): The name of the vault.
+
+        Returns:
+            VaultState: The warm state.
+
+        Raises:
+            asyncio.CancelledError: If the request is cancelled while the vault is loading.
+            Exception: The error raised by the first listing, if it failed. The vault is unloaded so that the next
+                request tries again.
+        """
+
+        state = self.vaults.get(name)
+        if state is None:
+            state = VaultState(name, self.profile, self.sync_interval)
+            self.vaults[name] = state
+            state.start()
+
+        try:
+            # Shielded so that a cancelled request does not cancel the listing other requests are waiting on.
+            await asyncio.shield(state.first_listing)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if self.vaults.get(name) is state:
+                del self.vaults[name]
+                await state.close()
+            raise
+
+        return state
+
+    async def serve(self, preload: list[str] | None = None) -> None:
+        """Serve clients until a stop request is received.
+
+        Args:
+            preload (list[str] | None): Vaults to load before the first client attaches. Defaults to None.
+        """
+
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self.handle, path=self.path, limit=STREAM_LIMIT
+            )
+        finally:
+            os.umask(umask)
+
+        for name in preload or []:
+            self.vaults[name] = VaultState(name, self.profile, self.sync_interval)
+            self.vaults[name].start()
+
+        log.info(f"Listening on {self.path}")
+        try:
+            async with server:
+                await self.stopped.wait()
+        finally:
+            for writer in self.connections.values():
+                writer.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            for state in self.vaults.values():
+                await state.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Handle the requests of a single client connection.
+
+        Requests are handled concurrently, so a long running watch does not hold up the requests behind it.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's reader.
+            writer (asyncio.StreamWriter): The connection's writer.
+        """
+
+        lock = asyncio.Lock()
+        tasks: set[asyncio.Future] = set()
+        handler = asyncio.current_task()
+        assert handler is not None
+        self.connections[handler] = writer
+
+        async def send(message: dict[str, Any]) -> None:
+            async with lock:
+                writer.write(json.dumps(message, default=str).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self.dispatch(json.loads(line), send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError) as e:
+            log.warning(f"Dropping client: {e}")
+        finally:
+            for pending in list(tasks):
+                pending.cancel()
+            writer.close()
+            del self.connections[handler]
+
+    async def dispatch(
+        self,
+        request: dict[str, Any],
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        """Run a request and send its response.
+
+        Args:
+            request (dict[str, Any]): The request, with an id, a method and params.
+            send (Callable[[dict[str, Any]], Awaitable[None]]): Sends a message to the client.
+
+        Raises:
+            asyncio.CancelledError: If the request is cancelled. Any other error is sent to the client.
+        """
+
+        id = request.get("id")
+        method = getattr(self, f"rpc_{request.get('method')}", None)
+
+        async def chunk(items: list[Any]) -> None:
+            await send({"id": id, "chunk": items})
+
+        if method is None:
+            error = ValueError(f"Unknown method {request.get('method')}")
+            await send({"id": id, "error": encode_error(error)})
+            return
+
+        try:
+            result = await method(chunk, **request.get("params", {}))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await send({"id": id, "error": encode_error(e)})
+        else:
+            await send({"id": id, "result": result})
+
+    # The methods clients can call. Each receives a callback that streams a chunk of items ahead of the result, followed
+    # by the params of the request.
+
+    async def rpc_ping(self, chunk: Callable) -> dict[str, Any]:
+        return {"vaults": {k: len(v.dataset) for k, v in self.vaults.items()}}
+
+    async def rpc_attach(self, chunk: Callable, vault: str) -> dict[str, Any]:
+        state = await self.vault(vault)
+        return {
+            "generation": state.dataset.generation,
+            "index_path": state.search.path,
+            "profile": self.profile.value,
+        }
+
+    async def rpc_list_secrets(self, chunk: Callable, vault: str) -> int:
+        state = await self.vault(vault)
+        items = [encode_properties(x) for x in state.dataset]
+        for i in range(0, len(items), CHUNK_SIZE):
+            await chunk(items[i : i + CHUNK_SIZE])
+        return len(items)
+
+    async def rpc_list_versions(self, chunk: Callable, vault: str, name: str) -> int:
+        state = await self.vault(vault)
+        count = 0
+        async for version in state.client.iter_secret_versions(name):
+            await chunk([encode_properties(version)])
+            count += 1
+        return count
+
+    async def rpc_get_secret_value(
+        self, chunk: Callable, vault: str, name: str, version: str | None = None
+    ) -> str:
+        state = await self.vault(vault)
+        return await state.client.get_secret_value(name, version)
+
+    async def rpc_update_secret_properties(
+        self,
+        chunk: Callable,
+        vault: str,
+        name: str,
+        version: str | None = None,
+        changes: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        state = await self.vault(vault)
+        kwargs = dict(changes or {})
+        for key in ("expires_on", "not_before"):
+            if kwargs.get(key):
+                kwargs[key] = decode_date(kwargs[key])
+
+        properties = await state.client.update_secret_properties(
+            name, version, **kwargs
+        )
+        if version is None:
+            await state.apply(properties)
+        return encode_properties(properties)
+
+    async def rpc_set_secret(
+        self, chunk: Callable, vault: str, name: str, value: str
+    ) -> dict[str, Any]:
+        state = await self.vault(vault)
+        properties = await state.client.set_secret(name, value)
+        await state.apply(properties)
+        return encode_properties(properties)
+
+    async def rpc_sync(self, chunk: Callable, vault: str) -> int:
+        state = await self.vault(vault)
+        return len(await state.sync())
+
+    async def rpc_watch(self, chunk: Callable, vault: str) -> None:
+        state = await self.vault(vault)
+        queue: asyncio.Queue[ChangeSet] = asyncio.Queue()
+        state.subscribers.add(queue)
+        try:
+            while True:
+                await chunk([encode_change_set(await queue.get())])
+        finally:
+            state.subscribers.discard(queue)
+
+    async def rpc_stop(self, chunk: Callable) -> bool:
+        self.stopped.set()
+        return True
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+from typing import Any, AsyncIterator, NoReturn
+
+from azure.core.exceptions import (
+    AzureError,
+    ClientAuthenticationError,
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+)
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend
+from .codec import STREAM_LIMIT, decode_change_set, decode_properties, encode_value
+from .config import DAEMON_SOCKET_PATH
+from .dataset import ChangeSet
+
+# The errors the SDK raises for these status codes, so callers can tell a missing secret from a failed request.
+ERROR_TYPES: dict[int, type[HttpResponseError]] = {
+    401: ClientAuthenticationError,
+    404: ResourceNotFoundError,
+    409: ResourceExistsError,
+}
+
+
+class DaemonException(AzureError):
+    """Exception raised when the daemon reports an error or closes the connection."""
+
+    pass
+
+
+class DaemonClient(SecretBackend):
+    """A backend that is served by the local daemon instead of talking to the vault directly."""
+
+    def __init__(self, vault_name: str, path: str = DAEMON_SOCKET_PATH) -> None:
+        """A backend that is served by the local daemon instead of talking to the vault directly.
+
+        Args:
+            vault_name (str): The name of the vault.
+            path (str): The path of the daemon's socket. Defaults to DAEMON_SOCKET_PATH.
+        """
+
+        self.vault_name = vault_name
+        self.path = path
+        self.index_path: str | None = None
+        self.profile: str | None = None
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Future | None = None
+        self._pending: dict[int, asyncio.Queue[dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+
+    @classmethod
+    async def attach(
+        cls, vault_name: str, path: str = DAEMON_SOCKET_PATH
+    ) -> DaemonClient | None:
+        """Attach to the daemon if it is running, waiting for it to load the vault.
+
+        Args:
+            vault_name (str): The name of the vault.
+            path (str): The path of the daemon's socket. Defaults to DAEMON_SOCKET_PATH.
+
+        Returns:
+            DaemonClient | None: The client, or None if the daemon is not running or could not load the vault.
+        """
+
+        if not os.path.exists(path):
+            return None
+
+        client = cls(vault_name, path)
+        try:
+            await client.connect()
+            info = await client.request("attach", vault=vault_name)
+        except (OSError, AzureError):
+            await client.close()
+            return None
+
+        client.index_path = info["index_path"]
+        client.profile = info["profile"]
+        return client
+
+    async def connect(self) -> None:
+        """Connect to the daemon.
+
+        Raises:
+            DaemonException: If the daemon cannot be reached.
+        """
+
+        try:
+            self._reader, self._writer = await asyncio.open_unix_connection(
+                self.path, limit=STREAM_LIMIT
+            )
+        except OSError as e:
+            raise DaemonException(f"Cannot connect to the daemon: {e}") from e
+        self._reader_task = asyncio.ensure_future(self._read(self._reader))
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                queue = self._pending.get(message.get("id"))
+                if queue is not None:
+                    queue.put_nowait(message)
+        finally:
+            # Nothing reads the connection any more, so the next request reconnects.
+            if self._reader is reader:
+                if self._writer is not None:
+                    self._writer.close()
+                self._reader = self._writer = None
+            for queue in self._pending.values():
+                queue.put_nowait(
+                    {"error": {"message": "The daemon closed the connection."}}
+                )
+
+    async def __aenter__(self) -> DaemonClient:
+        return self
+
+    async def close(self) -> None:
+        """Close the connection to the daemon."""
+
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._reader_task = self._reader = self._writer = None
+
+    def _raise(self, error: dict[str, Any]) -> NoReturn:
+        message = error.get("message") or "The daemon reported an error."
+        status = error.get("status")
+        if status:
+            http_error = ERROR_TYPES.get(status, HttpResponseError)(message=message)
+            http_error.status_code = status
+            raise http_error
+        raise DaemonException(message)
+
+    async def messages(
+        self, method: str, **params: Any
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Send a request and stream the messages sent in response.
+
+        Errors the daemon reports are raised as AzureError. Errors with a status code keep it and are raised as the
+        error the SDK raises for it, such as ResourceNotFoundError for 404.
+
+        Args:
+            method (str): The method to call.
+            **params (Any): The params of the method.
+
+        Yields:
+            dict[str, Any]: Each chunk, followed by the result.
+
+        Raises:
+            DaemonException: If the connection to the daemon was lost.
+        """
+
+        if self._writer is None:
+            await self.connect()
+        assert self._writer is not None
+
+        id = next(self._ids)
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._pending[id] = queue
+
+        try:
+            # A reader that has finished will never answer, so fail rather than wait on the queue forever.
+            if self._reader_task is None or self._reader_task.done():
+                raise DaemonException("The daemon closed the connection.")
+
+            request = {"id": id, "method": method, "params": params}
+            try:
+                self._writer.write(json.dumps(request).encode() + b"\n")
+                await self._writer.drain()
+            except OSError as e:
+                raise DaemonException(f"Lost the connection to the daemon: {e}") from e
+
+            while True:
+                message = await queue.get()
+                if "error" in message:
+                    self._raise(message["error"])
+                yield message
+                if "result" in message:
+                    return
+        finally:
+            del self._pending[id]
+
+    async def request(self, method: str, **params: Any) -> Any:
+        """Send a request and wait for its result.
+
+        Args:
+            method (str): The method to call.
+            **params (Any): The params of the method.
+
+        Returns:
+            Any: The result.
+        """
+
+        result = None
+        async for message in self.messages(method, **params):
+            result = message.get("result")
+        return result
+
+    async def stream(self, method: str, **params: Any) -> AsyncIterator[Any]:
+        """Send a request and stream the items sent in chunks ahead of its result.
+
+        Args:
+            method (str): The method to call.
+            **params (Any): The params of the method.
+
+        Yields:
+            Any: Each item.
+        """
+
+        async for message in self.messages(method, **params):
+            for item in message.get("chunk", []):
+                yield item
+
+    async def get_secret_value(self, name: str, version: str | None = None) -> str:
+        return await self.request(
+            "get_secret_value", vault=self.vault_name, name=name, version=version
+        )
+
+    async def update_secret_properties(
+        self, name: str, version: str | None = None, **changes: Any
+    ) -> SecretProperties:
+        """Update the properties of a secret version through the daemon, which applies them to its listing.
+
+        Args:
+            name (str): The name of the secret.
+            version (str | None): The version to update. Defaults to the latest version.
+            **changes (Any): The properties to change, such as tags, enabled or expires_on.
+
+        Returns:
+            SecretProperties: The updated properties.
+        """
+
+        result = await self.request(
+            "update_secret_properties",
+            vault=self.vault_name,
+            name=name,
+            version=version,
+            changes={k: encode_value(v) for k, v in changes.items()},
+        )
+        return decode_properties(result)
+
+    async def set_secret(self, name: str, value: str) -> SecretProperties:
+        """Set the value of a secret through the daemon, which adds the new version to its listing.
+
+        Args:
+            name (str): The name of the secret.
+            value (str): The value.
+
+        Returns:
+            SecretProperties: The properties of the new version.
+        """
+
+        result = await self.request(
+            "set_secret", vault=self.vault_name, name=name, value=value
+        )
+        return decode_properties(result)
+
+    async def iter_secrets(self) -> AsyncIterator[SecretProperties]:
+        """Stream the daemon's listing of the vault.
+
+        Yields:
+            SecretProperties: The properties of a secret.
+        """
+
+        async for item in self.stream("list_secrets", vault=self.vault_name):
+            yield decode_properties(item)
+
+    async def iter_secret_versions(self, name: str) -> AsyncIterator[SecretProperties]:
+        """Stream the versions of a secret in the order returned by the service.
+
+        Args:
+            name (str): The name of the secret.
+
+        Yields:
+            SecretProperties: The properties of a secret version.
+        """
+
+        async for item in self.stream(
+            "list_versions", vault=self.vault_name, name=name
+        ):
+            yield decode_properties(item)
+
+    async def watch(self) -> AsyncIterator[ChangeSet]:
+        """Stream the changes the daemon finds each time it lists the vault.
+
+        Yields:
+            ChangeSet: The changes.
+        """
+
+        async for item in self.stream("watch", vault=self.vault_name):
+            yield decode_change_set(item)
+
+    async def sync(self) -> int:
+        """Ask the daemon to list the vault now instead of waiting for the next sync.
+
+        Returns:
+            int: The number of changes found.
+        """
+
+        return await self.request("sync", vault=self.vault_name)
+
+
+async def daemon_request(
+    method: str, path: str = DAEMON_SOCKET_PATH, **params: Any
+) -> Any:
+    """Send a single request to the daemon.
+
+    Args:
+        method (str): The method to call.
+        path (str): The path of the daemon's socket. Defaults to DAEMON_SOCKET_PATH.
+        **params (Any): The params of the method.
+
+    Returns:
+        Any: The result.
+    """
+
+    client = DaemonClient("", path)
+    try:
+        return await client.request(method, **params)
+    finally:
+        await client.close()
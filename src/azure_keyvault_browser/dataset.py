@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Iterable, Iterator
+
+from azure.keyvault.secrets import SecretProperties
+
+
+class ChangeSet:
+    """The secrets added, removed and updated between two generations of a dataset."""
+
+    def __init__(
+        self,
+        added: Iterable[SecretProperties] = (),
+        removed: Iterable[SecretProperties] = (),
+        updated: Iterable[SecretProperties] = (),
+        reset: bool = False,
+    ) -> None:
+        """The secrets added, removed and updated between two generations of a dataset.
+
+        Args:
+            added (Iterable[SecretProperties]): Secrets that were added. Defaults to ().
+            removed (Iterable[SecretProperties]): Secrets that were removed. Defaults to ().
+            updated (Iterable[SecretProperties]): The new properties of secrets that changed. Defaults to ().
+            reset (bool): The dataset was replaced wholesale and every derived structure should be rebuilt.
+                Defaults to False.
+        """
+
+        self.added = {x.name: x for x in added if x.name}
+        self.removed = {x.name: x for x in removed if x.name}
+        self.updated = {x.name: x for x in updated if x.name}
+        self.reset = reset
+
+    def __bool__(self) -> bool:
+        return bool(self.reset or self.added or self.removed or self.updated)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.updated)
+
+    def merge(self, other: ChangeSet) -> None:
+        """Fold a later change set into this one, so that it describes both.
+
+        Args:
+            other (ChangeSet): The later change set.
+        """
+
+        if other.reset:
+            self.added = dict(other.added)
+            self.removed = {}
+            self.updated = {}
+            self.reset = True
+            return
+
+        for name, properties in other.added.items():
+            if self.removed.pop(name, None) is not None:
+                self.updated[name] = properties
+            else:
+                self.added[name] = properties
+
+        for name, properties in other.removed.items():
+            if self.added.pop(name, None) is not None:
+                continue
+            self.updated.pop(name, None)
+            self.removed[name] = properties
+
+        for name, properties in other.updated.items():
+            if name in self.added:
+                self.added[name] = properties
+            else:
+                self.updated[name] = properties
+
+
+class Dataset:
+    """The listed secrets of a vault, versioned so that views can follow changes incrementally.
+
+    Every change bumps the generation and records a change set. A view remembers the generation it last saw and asks
+    for the changes since then, so it only does work proportional to what changed. Views that fall too far behind,
+    or that were last synced before a reset, rebuild from the full dataset instead.
+    """
+
+    def __init__(self, history: int = 64) -> None:
+        """The listed secrets of a vault, versioned so that views can follow changes incrementally.
+
+        Args:
+            history (int): The number of change sets to keep. Defaults to 64.
+        """
+
+        self.generation = 0
+        self._items: dict[str, SecretProperties] = {}
+        self._history: deque[tuple[int, ChangeSet]] = deque(maxlen=history)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[SecretProperties]:
+        return iter(self._items.values())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._items
+
+    def get(self, name: str) -> SecretProperties | None:
+        """Get the properties of a secret.
+
+        Args:
+            name (str): The name of the secret.
+
+        Returns:
+            SecretProperties | None: The properties, or None if the secret is not in the dataset.
+        """
+
+        return self._items.get(name)
+
+    def _commit(self, changes: ChangeSet) -> ChangeSet:
+        if changes:
+            self.generation += 1
+            self._history.append((self.generation, changes))
+        return changes
+
+    def reset(self, items: Iterable[SecretProperties]) -> ChangeSet:
+        """Replace every secret in the dataset.
+
+        Args:
+            items (Iterable[SecretProperties]): The secrets.
+
+        Returns:
+            ChangeSet: The recorded change set.
+        """
+
+        self._items = {x.name: x for x in items if x.name}
+        return self._commit(ChangeSet(added=self._items.values(), reset=True))
+
+    def apply(
+        self,
+        added: Iterable[SecretProperties] = (),
+        removed: Iterable[str] = (),
+        updated: Iterable[SecretProperties] = (),
+    ) -> ChangeSet:
+        """Add, remove and update secrets.
+
+        Updates to secrets that are not in the dataset are treated as additions, and removals of secrets that are not
+        in the dataset are ignored.
+
+        Args:
+            added (Iterable[SecretProperties]): Secrets to add. Defaults to ().
+            removed (Iterable[str]): The names of secrets to remove. Defaults to ().
+            updated (Iterable[SecretProperties]): The new properties of secrets that changed. Defaults to ().
+
+        Returns:
+            ChangeSet: The recorded change set, which is empty if nothing changed.
+        """
+
+        changes = ChangeSet()
+
+        for name in removed:
+            previous = self._items.pop(name, None)
+            if previous is not None:
+                changes.merge(ChangeSet(removed=[previous]))
+
+        for properties in [*added, *updated]:
+            if not properties.name:
+                continue
+            exists = properties.name in self._items
+            self._items[properties.name] = properties
+            changes.merge(
+                ChangeSet(updated=[properties])
+                if exists
+                else ChangeSet(added=[properties])
+            )
+
+        return self._commit(changes)
+
+    def changes_since(self, generation: int) -> ChangeSet | None:
+        """Get everything that changed after a generation.
+
+        Args:
+            generation (int): The generation a view last synced to.
+
+        Returns:
+            ChangeSet | None: The combined changes, empty if the generation has not moved, or None if the history no
+                longer reaches back that far or the dataset was reset, in which case the view should rebuild.
+        """
+
+        changes = ChangeSet()
+        if generation >= self.generation:
+            return changes
+
+        if not self._history or self._history[0][0] > generation + 1:
+            return None
+
+        for number, change in self._history:
+            if number > generation:
+                changes.merge(change)
+
+        return None if changes.reset else changes
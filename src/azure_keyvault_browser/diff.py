@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import asyncio
+from enum import Enum
+from typing import Any, AsyncIterator
+
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend, throttle_delay
+from .concurrency import RateLimiter, retry
+from .duplicates import HashIndex, hash_value
+
+"""
+Comparing vaults, such as staging and production. The vaults are listed concurrently and their names are joined as
+they arrive: a name is compared as soon as it has been seen in every vault and is then forgotten, so only the names
+that are still unmatched are held in memory. Values are compared by salted digest and never kept.
+"""
+
+
+class DiffStatus(Enum):
+    """An enum containing the outcomes of comparing a secret across vaults."""
+
+    MISSING = "missing"
+    EXTRA = "extra"
+    DIFFERENT = "different"
+    IDENTICAL = "identical"
+    PRESENT = "present"
+    UNKNOWN = "unknown"
+
+
+class DiffEntry:
+    """How a secret compares across vaults."""
+
+    def __init__(
+        self,
+        name: str,
+        status: DiffStatus,
+        present: list[str],
+        missing: list[str] | None = None,
+        groups: list[list[str]] | None = None,
+        error: str = "",
+    ) -> None:
+        """How a secret compares across vaults.
+
+        Args:
+            name (str): The name of the secret.
+            status (DiffStatus): The outcome.
+            present (list[str]): The vaults the secret is in.
+            missing (list[str] | None): The vaults the secret is not in. Defaults to None.
+            groups (list[list[str]] | None): The vaults that share each distinct value, when values differ. Defaults
+                to None.
+            error (str): Why the values could not be compared. Defaults to "".
+        """
+
+        self.name = name
+        self.status = status
+        self.present = present
+        self.missing = missing or []
+        self.groups = groups or []
+        self.error = error
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the entry to a JSON serialisable dictionary.
+
+        Returns:
+            dict[str, Any]: The entry.
+        """
+
+        return {
+            "name": self.name,
+            "status": self.status.value,
+            "present": self.present,
+            "missing": self.missing,
+            "groups": self.groups,
+            "error": self.error,
+        }
+
+
+class VaultDiff:
+    """Compares the secrets in two or more vaults. The first vault is the one the others are compared against."""
+
+    def __init__(
+        self,
+        clients: list[SecretBackend],
+        index: HashIndex | None = None,
+        rate: float = 10,
+        concurrency: int = 8,
+        attempts: int = 3,
+    ) -> None:
+        """Compares the secrets in two or more vaults. The first vault is the one the others are compared against.
+
+        Args:
+            clients (list[SecretBackend]): The clients for the vaults.
+            index (HashIndex | None): The digests to compare values with. Values are only compared when this is
+                given, and a digest is reused while the secret's updated_on is unchanged. Defaults to None.
+            rate (float): The maximum number of values fetched per second per vault. Defaults to 10.
+            concurrency (int): The maximum number of secrets compared at once. Defaults to 8.
+            attempts (int): The maximum number of attempts per value. Defaults to 3.
+        """
+
+        self.clients = clients
+        self.index = index
+        self.limiters = [RateLimiter(rate) for _ in clients]
+        self.concurrency = concurrency
+        self.attempts = attempts
+        self.fetched = 0
+
+    @property
+    def vaults(self) -> list[str]:
+        """The names of the vaults, in the order they are compared.
+
+        Returns:
+            list[str]: The vault names.
+        """
+
+        return [x.vault_name for x in self.clients]
+
+    async def _list(self, position: int, queue: asyncio.Queue) -> None:
+        try:
+            async for properties in self.clients[position].iter_secrets():
+                if properties.name:
+                    await queue.put((position, properties))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The end of the listing is announced either way, and run collects the error from the task.
+            await queue.put((position, None))
+            raise
+        await queue.put((position, None))
+
+    async def _digest(self, position: int, properties: SecretProperties) -> str:
+        client = self.clients[position]
+        name = properties.name or ""
+        updated_on = properties.updated_on.isoformat() if properties.updated_on else ""
+
+        assert self.index is not None
+        entries = self.index.entries.setdefault(client.vault_name, {})
+        entry = entries.get(name)
+        if entry and entry[0] == updated_on:
+            return entry[1]
+
+        value, _ = await retry(
+            lambda: client.get_secret_value(name),
+            throttle_delay,
+            attempts=self.attempts,
+            limiter=self.limiters[position],
+        )
+        self.fetched += 1
+
+        digest = hash_value(self.index.salt, value or "")
+        entries[name] = (updated_on, digest)
+        return digest
+
+    async def compare(self, found: list[SecretProperties]) -> DiffEntry:
+        """Compare the values of a secret that is in every vault.
+
+        Args:
+            found (list[SecretProperties]): The properties of the secret in each vault, in the order of the vaults.
+
+        Returns:
+            DiffEntry: How the values compare.
+        """
+
+        name = found[0].name or ""
+        vaults = self.vaults
+        if self.index is None:
+            return DiffEntry(name, DiffStatus.PRESENT, vaults)
+
+        disabled = [v for v, p in zip(vaults, found) if not p.enabled]
+        if disabled:
+            error = f"disabled in {', '.join(disabled)}"
+            return DiffEntry(name, DiffStatus.UNKNOWN, vaults, error=error)
+
+        try:
+            digests = await asyncio.gather(
+                *[self._digest(i, p) for i, p in enumerate(found)]
+            )
+        except Exception as e:
+            return DiffEntry(name, DiffStatus.UNKNOWN, vaults, error=str(e))
+
+        groups: dict[str, list[str]] = {}
+        for vault, digest in zip(vaults, digests):
+            groups.setdefault(digest, []).append(vault)
+
+        if len(groups) == 1:
+            return DiffEntry(name, DiffStatus.IDENTICAL, vaults)
+        return DiffEntry(
+            name, DiffStatus.DIFFERENT, vaults, groups=list(groups.values())
+        )
+
+    def _unmatched(self, found: dict[int, SecretProperties]) -> DiffEntry:
+        vaults = self.vaults
+        present = [v for i, v in enumerate(vaults) if i in found]
+        missing = [v for i, v in enumerate(vaults) if i not in found]
+        status = DiffStatus.MISSING if 0 in found else DiffStatus.EXTRA
+        return DiffEntry(found[min(found)].name or "", status, present, missing)
+
+    async def run(self) -> AsyncIterator[DiffEntry]:
+        """Compare the vaults.
+
+        Secrets in every vault are yielded as they are compared, which starts while the vaults are still being listed.
+        Secrets missing from some vaults can only be known once every vault has been listed, so they come last.
+
+        An error listing a vault is raised from the iteration once the vault's listing ends.
+
+        Yields:
+            DiffEntry: How each secret compares.
+        """
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        listing = [
+            asyncio.ensure_future(self._list(i, queue))
+            for i in range(len(self.clients))
+        ]
+        # Names are not case sensitive. Only names that have not yet been seen in every vault are kept.
+        unmatched: dict[str, dict[int, SecretProperties]] = {}
+        pending: set[asyncio.Future] = set()
+        remaining = len(listing)
+
+        try:
+            while remaining:
+                position, item = await queue.get()
+                if item is None:
+                    # Raises the error if the listing failed.
+                    await listing[position]
+                    remaining -= 1
+                    continue
+
+                key = (item.name or "").lower()
+                found = unmatched.setdefault(key, {})
+                found[position] = item
+                if len(found) < len(self.clients):
+                    continue
+
+                del unmatched[key]
+                for task in [x for x in pending if x.done()]:
+                    pending.discard(task)
+                    yield task.result()
+
+                if len(pending) >= max(self.concurrency, 1):
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        yield task.result()
+
+                pending.add(
+                    asyncio.ensure_future(
+                        self.compare([found[i] for i in range(len(self.clients))])
+                    )
+                )
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+
+            for key in sorted(unmatched):
+                yield self._unmatched(unmatched[key])
+
+        finally:
+            for task in [*listing, *pending]:
+                task.cancel()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import os
+from collections import defaultdict
+from typing import Any, Iterable
+
+from azure.core.exceptions import HttpResponseError
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend
+from .concurrency import RateLimiter, map_bounded
+from .config import HASH_INDEX_PATH, SALT_PATH
+
+"""
+Duplicate value detection. Values are reduced to salted digests as soon as they are fetched and plaintext is never
+kept. Digests are persisted alongside the updated_on timestamp they were computed from so that re-runs only fetch
+values that have changed.
+"""
+
+DIGEST_SIZE = 16
+
+
+def write_private(path: str, data: bytes) -> None:
+    """Write a file that only the current user can read.
+
+    Args:
+        path (str): The path to write to.
+        data (bytes): The file contents.
+    """
+
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+
+def get_salt(path: str = SALT_PATH) -> bytes:
+    """Retrieve or create the salt used to hash secret values on this machine.
+
+    Args:
+        path (str): The path of the salt file. Defaults to SALT_PATH.
+
+    Returns:
+        bytes: The salt.
+    """
+
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    salt = os.urandom(32)
+    write_private(path, salt)
+    return salt
+
+
+def hash_value(salt: bytes, value: str) -> str:
+    """Hash a secret value.
+
+    Args:
+        salt (bytes): The salt.
+        value (str): The value to hash.
+
+    Returns:
+        str: A hex encoded, truncated HMAC-SHA256 digest.
+    """
+
+    digest = hmac.new(salt, value.encode("utf-8"), hashlib.sha256).digest()
+    return digest[:DIGEST_SIZE].hex()
+
+
+class HashIndex:
+    """A persisted index of salted value digests for the secrets in one or more vaults."""
+
+    def __init__(self, salt: bytes, path: str = HASH_INDEX_PATH) -> None:
+        """A persisted index of salted value digests for the secrets in one or more vaults.
+
+        Args:
+            salt (bytes): The salt used to hash values.
+            path (str): The path of the index file. Defaults to HASH_INDEX_PATH.
+        """
+
+        self.salt = salt
+        self.path = path
+        # vault -> name -> (updated_on, digest)
+        self.entries: dict[str, dict[str, tuple[str, str]]] = {}
+
+    def load(self) -> None:
+        """Load the index from disk."""
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path) as f:
+            data = json.load(f)
+
+        self.entries = {
+            vault: {name: (x[0], x[1]) for name, x in names.items()}
+            for vault, names in data.items()
+        }
+
+    def save(self) -> None:
+        """Save the index to disk."""
+
+        data = {
+            vault: {name: list(x) for name, x in names.items()}
+            for vault, names in self.entries.items()
+        }
+        write_private(self.path, json.dumps(data).encode("utf-8"))
+
+    async def refresh(
+        self,
+        client: SecretBackend,
+        rate: float = 10,
+        concurrency: int = 8,
+    ) -> int:
+        """Bring the digests for a vault up to date, only fetching values whose updated_on has changed.
+
+        Args:
+            client (SecretBackend): The client for the vault.
+            rate (float): The maximum number of values fetched per second. Defaults to 10.
+            concurrency (int): The maximum number of fetches in flight. Defaults to 8.
+
+        Returns:
+            int: The number of values that were fetched and hashed.
+        """
+
+        previous = self.entries.get(client.vault_name, {})
+        current: dict[str, tuple[str, str]] = {}
+        stale: list[SecretProperties] = []
+
+        async for properties in client.iter_secrets():
+            if not properties.name or not properties.enabled:
+                continue
+
+            updated_on = (
+                properties.updated_on.isoformat() if properties.updated_on else ""
+            )
+            entry = previous.get(properties.name)
+            if entry and entry[0] == updated_on:
+                current[properties.name] = entry
+            else:
+                stale.append(properties)
+
+        limiter = RateLimiter(rate)
+
+        async def fetch(properties: SecretProperties) -> tuple[str, str, str | None]:
+            name = properties.name or ""
+            updated_on = (
+                properties.updated_on.isoformat() if properties.updated_on else ""
+            )
+            async with limiter:
+                try:
+                    value = await client.get_secret_value(name)
+                except HttpResponseError:
+                    return name, updated_on, None
+
+            return name, updated_on, hash_value(self.salt, value or "")
+
+        async for name, updated_on, digest in map_bounded(
+            fetch, stale, limit=concurrency
+        ):
+            if digest is not None:
+                current[name] = (updated_on, digest)
+
+        self.entries[client.vault_name] = current
+        return len(stale)
+
+    def duplicates(
+        self, vaults: Iterable[str] | None = None
+    ) -> list[list[tuple[str, str]]]:
+        """Group secrets that share a value.
+
+        Args:
+            vaults (Iterable[str] | None): Restrict grouping to these vaults. Defaults to every indexed vault.
+
+        Returns:
+            list[list[tuple[str, str]]]: Groups of (vault, name) pairs, largest first.
+        """
+
+        selected = set(vaults) if vaults is not None else set(self.entries)
+        groups: dict[str, list[tuple[str, str]]] = defaultdict(list)
+
+        for vault, names in self.entries.items():
+            if vault not in selected:
+                continue
+            for name, (_, digest) in names.items():
+                groups[digest].append((vault, name))
+
+        return sorted(
+            (sorted(x) for x in groups.values() if len(x) > 1),
+            key=lambda x: (-len(x), x),
+        )
+
+
+def group_to_dict(group: list[tuple[str, str]]) -> dict[str, Any]:
+    """Convert a duplicate group to a JSON serialisable dictionary.
+
+    Args:
+        group (list[tuple[str, str]]): The (vault, name) pairs that share a value.
+
+    Returns:
+        dict[str, Any]: The group.
+    """
+
+    return {
+        "count": len(group),
+        "vaults": sorted({vault for vault, _ in group}),
+        "secrets": [{"vault": vault, "name": name} for vault, name in group],
+    }
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import os
+import time
+from typing import AsyncIterator, Iterable
+
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend
+from .concurrency import map_bounded
+from .config import HISTORY_DIR
+
+"""
+Remembers which secrets are opened in the browser so that the ones used every day can be pinned and warmed up when it
+starts. Only the names of secrets are recorded, never their values or properties.
+"""
+
+
+class AccessHistory:
+    """How often and how recently each secret in a vault has been opened, stored on disk."""
+
+    def __init__(
+        self,
+        vault: str,
+        directory: str = HISTORY_DIR,
+        half_life: float = 7 * 24 * 60 * 60,
+        max_entries: int = 500,
+    ) -> None:
+        """How often and how recently each secret in a vault has been opened, stored on disk.
+
+        Every time a secret is opened its score goes up by one, and scores halve every half life, so a secret opened
+        daily outranks one that was opened many times last month.
+
+        Args:
+            vault (str): The name of the vault.
+            directory (str): The directory histories are kept in. Defaults to HISTORY_DIR.
+            half_life (float): The number of seconds it takes for a score to halve. Defaults to a week.
+            max_entries (int): The number of secrets remembered. The lowest scores are dropped on save. Defaults to
+                500.
+        """
+
+        self.vault = vault
+        self.path = f"{directory}/{vault}.json"
+        self.half_life = half_life
+        self.max_entries = max_entries
+        # The score of each secret as of the last time it was opened, and when that was.
+        self.entries: dict[str, tuple[float, float]] = {}
+
+    def load(self) -> bool:
+        """Load the stored history.
+
+        Returns:
+            bool: True if there was a history to load.
+        """
+
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path) as f:
+                self.entries = {k: (v[0], v[1]) for k, v in json.load(f).items()}
+        except (OSError, ValueError, TypeError, IndexError, AttributeError):
+            # A damaged history only costs the pins, so start again rather than stopping the browser.
+            self.entries = {}
+            return False
+
+        return True
+
+    def save(self) -> None:
+        """Store the history, replacing the previous one atomically."""
+
+        now = time.time()
+        entries = heapq.nlargest(
+            self.max_entries, self.entries.items(), key=lambda x: self._decay(x[1], now)
+        )
+
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(dict(entries), f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def _decay(self, entry: tuple[float, float], now: float) -> float:
+        score, last = entry
+        return score * 0.5 ** (max(now - last, 0) / self.half_life)
+
+    def record(self, name: str, now: float | None = None) -> None:
+        """Record that a secret was opened.
+
+        Args:
+            name (str): The name of the secret.
+            now (float | None): The time it was opened, in seconds since the epoch. Defaults to the current time.
+        """
+
+        now = time.time() if now is None else now
+        entry = self.entries.get(name)
+        score = self._decay(entry, now) if entry else 0.0
+        self.entries[name] = (score + 1, now)
+
+    def forget(self, name: str) -> None:
+        """Forget a secret, for example because it has been deleted.
+
+        Args:
+            name (str): The name of the secret.
+        """
+
+        self.entries.pop(name, None)
+
+    def frecent(self, limit: int, minimum: float = 0.5) -> list[str]:
+        """The secrets opened most often and most recently.
+
+        Args:
+            limit (int): The maximum number of names to return.
+            minimum (float): Secrets scoring less than this are left out, so that a secret opened once a long time
+                ago is not pinned. Defaults to 0.5.
+
+        Returns:
+            list[str]: The names, highest score first.
+        """
+
+        now = time.time()
+        scores = ((self._decay(v, now), k) for k, v in self.entries.items())
+        return [k for s, k in heapq.nlargest(max(limit, 0), scores) if s >= minimum]
+
+
+async def prefetch_versions(
+    client: SecretBackend, names: Iterable[str], concurrency: int = 4
+) -> AsyncIterator[tuple[str, list[SecretProperties]]]:
+    """Fetch the versions of secrets in the background.
+
+    Secrets that cannot be listed for any reason, such as ones that have been deleted since they were last opened, are
+    skipped, so one failure does not stop the rest from being fetched.
+
+    Args:
+        client (SecretBackend): The vault client.
+        names (Iterable[str]): The names of the secrets.
+        concurrency (int): The maximum number of listings in flight. Defaults to 4.
+
+    Yields:
+        tuple[str, list[SecretProperties]]: The name of each secret and its versions, newest first, as they arrive.
+    """
+
+    async def fetch(name: str) -> tuple[str, list[SecretProperties] | None]:
+        try:
+            return name, await client.get_secret_versions(name)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return name, None
+
+    async for name, versions in map_bounded(fetch, names, concurrency):
+        if versions is not None:
+            yield name, versions
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable
+
+from azure.core.exceptions import AzureError
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend
+from .concurrency import map_bounded
+
+
+class FindingType(Enum):
+    """An enum containing the hygiene problems a scan can report."""
+
+    EXPIRED = "expired"
+    EXPIRING_SOON = "expiring_soon"
+    DISABLED = "disabled"
+    MISSING_EXPIRY = "missing_expires_on"
+    MISSING_CONTENT_TYPE = "missing_content_type"
+    STALE_VERSIONS = "stale_versions"
+    ERROR = "error"
+
+
+class Finding:
+    """A single hygiene problem found on a secret."""
+
+    def __init__(
+        self,
+        vault: str,
+        properties: SecretProperties,
+        type: FindingType,
+        detail: str = "",
+    ) -> None:
+        """A single hygiene problem found on a secret.
+
+        Args:
+            vault (str): The name of the vault the secret belongs to.
+            properties (SecretProperties): The properties of the secret.
+            type (FindingType): The type of problem.
+            detail (str): Additional human readable detail. Defaults to "".
+        """
+
+        self.vault = vault
+        self.properties = properties
+        self.type = type
+        self.detail = detail
+
+    @property
+    def name(self) -> str:
+        """The name of the secret.
+
+        Returns:
+            str: The secret name.
+        """
+
+        return self.properties.name or ""
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the finding to a JSON serialisable dictionary.
+
+        Returns:
+            dict[str, Any]: The finding.
+        """
+
+        expires_on = self.properties.expires_on
+        updated_on = self.properties.updated_on
+        return {
+            "vault": self.vault,
+            "name": self.name,
+            "version": self.properties.version,
+            "finding": self.type.value,
+            "detail": self.detail,
+            "enabled": self.properties.enabled,
+            "expires_on": expires_on.isoformat() if expires_on else None,
+            "updated_on": updated_on.isoformat() if updated_on else None,
+        }
+
+
+class HygieneScanner:
+    """Checks secrets for expiry and hygiene problems."""
+
+    def __init__(
+        self,
+        expiring_within: timedelta = timedelta(days=30),
+        stale_versions: int = 0,
+        concurrency: int = 8,
+    ) -> None:
+        """Checks secrets for expiry and hygiene problems.
+
+        Args:
+            expiring_within (timedelta): Secrets that expire within this window are reported as expiring soon.
+                Defaults to 30 days.
+            stale_versions (int): Report secrets with at least this many enabled versions other than the latest.
+                Version histories are only walked when this is greater than 0. Defaults to 0.
+            concurrency (int): The maximum number of version histories walked at once. Defaults to 8.
+        """
+
+        self.expiring_within = expiring_within
+        self.stale_versions = stale_versions
+        self.concurrency = concurrency
+
+    def check(
+        self, vault: str, properties: SecretProperties, now: datetime | None = None
+    ) -> list[Finding]:
+        """Check the properties of a single secret. No service calls are made.
+
+        Args:
+            vault (str): The name of the vault the secret belongs to.
+            properties (SecretProperties): The properties of the secret.
+            now (datetime | None): The time to check expiry against. Defaults to the current time.
+
+        Returns:
+            list[Finding]: Any problems found.
+        """
+
+        now = now or datetime.now(timezone.utc)
+        findings = []
+
+        if not properties.enabled:
+            findings.append(Finding(vault, properties, FindingType.DISABLED))
+
+        expires_on = properties.expires_on
+        if expires_on is None:
+            findings.append(Finding(vault, properties, FindingType.MISSING_EXPIRY))
+        elif expires_on <= now:
+            findings.append(
+                Finding(
+                    vault,
+                    properties,
+                    FindingType.EXPIRED,
+                    f"expired {(now - expires_on).days} days ago",
+                )
+            )
+        elif expires_on - now <= self.expiring_within:
+            findings.append(
+                Finding(
+                    vault,
+                    properties,
+                    FindingType.EXPIRING_SOON,
+                    f"expires in {(expires_on - now).days} days",
+                )
+            )
+
+        if not properties.content_type:
+            findings.append(
+                Finding(vault, properties, FindingType.MISSING_CONTENT_TYPE)
+            )
+
+        return findings
+
+    def check_all(self, vault: str, items: Iterable[SecretProperties]) -> list[Finding]:
+        """Check the properties of secrets that have already been listed.
+
+        Args:
+            vault (str): The name of the vault the secrets belong to.
+            items (Iterable[SecretProperties]): The properties of the secrets.
+
+        Returns:
+            list[Finding]: Any problems found.
+        """
+
+        now = datetime.now(timezone.utc)
+        return [f for x in items for f in self.check(vault, x, now)]
+
+    async def check_versions(
+        self, client: SecretBackend, properties: SecretProperties
+    ) -> Finding | None:
+        """Walk the version history of a secret looking for stale enabled versions.
+
+        Args:
+            client (SecretBackend): The client for the vault the secret belongs to.
+            properties (SecretProperties): The properties of the secret.
+
+        Returns:
+            Finding | None: A finding if there are too many stale enabled versions, or an error finding if the versions
+                could not be listed.
+        """
+
+        now = datetime.now(timezone.utc)
+
+        latest: SecretProperties | None = None
+        enabled = 0
+        try:
+            async for v in client.iter_secret_versions(properties.name or ""):
+                if v.enabled:
+                    enabled += 1
+                if latest is None or (v.created_on or now) > (latest.created_on or now):
+                    latest = v
+        except AzureError as e:
+            return Finding(
+                client.vault_name,
+                properties,
+                FindingType.ERROR,
+                f"could not list versions: {e}",
+            )
+
+        stale = enabled - 1 if latest and latest.enabled else enabled
+        if stale < self.stale_versions:
+            return None
+
+        return Finding(
+            client.vault_name,
+            properties,
+            FindingType.STALE_VERSIONS,
+            f"{stale} enabled versions besides the latest",
+        )
+
+    async def scan(self, client: SecretBackend) -> AsyncIterator[Finding]:
+        """Scan a vault, streaming findings as secrets are enumerated.
+
+        Args:
+            client (SecretBackend): The client for the vault to scan.
+
+        Yields:
+            Finding: Each problem as it is found.
+        """
+
+        now = datetime.now(timezone.utc)
+
+        if self.stale_versions <= 0:
+            async for properties in client.iter_secrets():
+                for finding in self.check(client.vault_name, properties, now):
+                    yield finding
+            return
+
+        async def check(properties: SecretProperties) -> list[Finding]:
+            findings = self.check(client.vault_name, properties, now)
+            stale = await self.check_versions(client, properties)
+            return findings + [stale] if stale else findings
+
+        async for findings in map_bounded(
+            check, client.iter_secrets(), limit=self.concurrency
+        ):
+            for finding in findings:
+                yield finding
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import tempfile
+from typing import Iterable
+
+from .config import NAMES_DIR
+
+"""
+A per vault list of secret names kept on disk for completing names in a shell. The browser, the daemon and watch save
+the names whenever they list a vault, and completion reads them without contacting Azure.
+
+The file is a header, a table of offsets and the names, sorted case insensitively. It is memory mapped and searched in
+place, so completing a prefix in a vault of 100,000 secrets only reads the handful of pages it needs.
+"""
+
+MAGIC = b"KVNAMES1"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<I")
+
+
+class NameIndex:
+    """A sorted, memory mapped list of the secret names in a vault."""
+
+    def __init__(self, vault: str, directory: str = NAMES_DIR) -> None:
+        """A sorted, memory mapped list of the secret names in a vault.
+
+        Args:
+            vault (str): The name of the vault.
+            directory (str): The directory name indexes are kept in. Defaults to NAMES_DIR.
+        """
+
+        self.vault = vault
+        self.path = f"{directory}/{vault}.idx"
+        self._map: mmap.mmap | None = None
+        self._count = 0
+
+    def __enter__(self) -> NameIndex:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def write(self, names: Iterable[str]) -> None:
+        """Save the names, replacing the previous index atomically.
+
+        Args:
+            names (Iterable[str]): The secret names.
+        """
+
+        encoded = sorted({x.encode() for x in names}, key=lambda x: (x.lower(), x))
+
+        offsets = [0]
+        for name in encoded:
+            offsets.append(offsets[-1] + len(name))
+
+        directory = os.path.dirname(self.path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # Every writer gets its own temporary file, so the browser and the daemon can save the same vault at once.
+        fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, len(encoded)))
+            f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+            f.writelines(encoded)
+        os.replace(temp, self.path)
+
+    def open(self) -> bool:
+        """Map the saved index into memory.
+
+        Returns:
+            bool: True if there is a readable index for the vault.
+        """
+
+        self.close()
+        try:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            return False
+
+        magic, count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            return False
+
+        self._count = count
+        return True
+
+    def close(self) -> None:
+        """Unmap the index."""
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._count = 0
+
+    def _name(self, index: int) -> bytes:
+        assert self._map is not None
+        position = HEADER.size + index * OFFSET.size
+        start, end = struct.unpack_from("<II", self._map, position)
+        blob = HEADER.size + (self._count + 1) * OFFSET.size
+        return self._map[blob + start : blob + end]
+
+    def complete(self, prefix: str, limit: int = 200) -> list[str]:
+        """Find the names that start with a prefix, ignoring case.
+
+        Args:
+            prefix (str): The prefix.
+            limit (int): The maximum number of names to return. Defaults to 200.
+
+        Returns:
+            list[str]: The names, in case insensitive order.
+        """
+
+        if self._map is None:
+            return []
+
+        key = prefix.lower().encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(middle).lower() < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        names = []
+        for index in range(low, min(low + limit, self._count)):
+            name = self._name(index)
+            if not name.lower().startswith(key):
+                break
+            names.append(name.decode())
+
+        return names
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from collections import defaultdict
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable, Mapping
+from urllib.parse import urlparse
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+
+from .azure import SecretBackend, throttle_delay
+from .backend import open_backend
+from .concurrency import RateLimiter, attempts_made, map_bounded, retry
+
+"""
+Key Vault references are how App Service, Functions and Container Apps settings point at secrets, either by URI,
+@Microsoft.KeyVault(SecretUri=https://vault.vault.azure.net/secrets/name/version), or by name,
+@Microsoft.KeyVault(VaultName=vault;SecretName=name;SecretVersion=version). The version is optional in both.
+"""
+
+REFERENCE_PATTERN = re.compile(r"@Microsoft\.KeyVault\(([^)]*)\)", re.IGNORECASE)
+
+
+class SecretReference:
+    """A reference to a secret, and optionally a version of it, in a vault."""
+
+    def __init__(self, vault: str, name: str, version: str | None = None) -> None:
+        """A reference to a secret, and optionally a version of it, in a vault.
+
+        Args:
+            vault (str): The name of the vault.
+            name (str): The name of the secret.
+            version (str | None): The version. Defaults to None, which is the latest version.
+        """
+
+        self.vault = vault
+        self.name = name
+        self.version = version or None
+
+    @property
+    def key(self) -> tuple[str, str, str]:
+        """Identifies the secret version referred to. Vault and secret names are not case sensitive.
+
+        Returns:
+            tuple[str, str, str]: The vault, name and version.
+        """
+
+        return (self.vault.lower(), self.name.lower(), self.version or "")
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SecretReference) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __str__(self) -> str:
+        return "/".join(x for x in (self.vault, self.name, self.version) if x)
+
+    @classmethod
+    def parse(cls, body: str) -> SecretReference:
+        """Parse the parameters of a reference, the text between the brackets of @Microsoft.KeyVault(...).
+
+        Args:
+            body (str): The parameters.
+
+        Returns:
+            SecretReference: The reference.
+
+        Raises:
+            ValueError: If the parameters do not name a secret.
+        """
+
+        params = {}
+        for part in body.split(";"):
+            key, _, value = part.partition("=")
+            if key.strip():
+                params[key.strip().lower()] = value.strip()
+
+        if "secreturi" in params:
+            uri = urlparse(params["secreturi"])
+            path = [x for x in uri.path.split("/") if x]
+            if not uri.hostname or len(path) not in (2, 3) or path[0] != "secrets":
+                raise ValueError(f"'{params['secreturi']}' is not a secret URI")
+            return cls(uri.hostname.split(".")[0], *path[1:])
+
+        if params.get("vaultname") and params.get("secretname"):
+            return cls(
+                params["vaultname"], params["secretname"], params.get("secretversion")
+            )
+
+        raise ValueError("a reference needs a SecretUri, or a VaultName and SecretName")
+
+    @classmethod
+    def from_spec(cls, spec: str, vault: str | None = None) -> SecretReference:
+        """Parse the short form used on the command line.
+
+        A spec is a secret name in the default vault, vault/name, vault/name/version or a full Key Vault reference.
+
+        Args:
+            spec (str): The spec.
+            vault (str | None): The vault of a bare secret name. Defaults to None.
+
+        Returns:
+            SecretReference: The reference.
+
+        Raises:
+            ValueError: If the spec is malformed, or is a bare name and there is no default vault.
+        """
+
+        match = REFERENCE_PATTERN.fullmatch(spec.strip())
+        if match is not None:
+            return cls.parse(match.group(1))
+
+        parts = spec.strip().split("/")
+        if len(parts) == 1 and parts[0]:
+            if not vault:
+                raise ValueError(f"'{spec}' does not name a vault")
+            return cls(vault, parts[0])
+        if len(parts) in (2, 3) and all(parts):
+            return cls(*parts)
+
+        raise ValueError(
+            f"'{spec}' is not a secret name, vault/name or vault/name/version"
+        )
+
+
+class ReferenceMatch:
+    """A reference found in a file."""
+
+    def __init__(
+        self,
+        path: str,
+        line: int,
+        text: str,
+        reference: SecretReference | None,
+        error: str = "",
+    ) -> None:
+        """A reference found in a file.
+
+        Args:
+            path (str): The file the reference was found in.
+            line (int): The line the reference starts on, counting from 1.
+            text (str): The reference as written.
+            reference (SecretReference | None): The parsed reference, or None if it could not be parsed.
+            error (str): Why the reference could not be parsed. Defaults to "".
+        """
+
+        self.path = path
+        self.line = line
+        self.text = text
+        self.reference = reference
+        self.error = error
+
+
+def find_references(text: str, path: str = "") -> list[ReferenceMatch]:
+    """Find the Key Vault references in some text.
+
+    Args:
+        text (str): The text, such as the contents of a settings file.
+        path (str): The file the text was read from. Defaults to "".
+
+    Returns:
+        list[ReferenceMatch]: The references, in the order they appear.
+    """
+
+    matches = []
+    for match in REFERENCE_PATTERN.finditer(text):
+        line = text.count("\n", 0, match.start()) + 1
+        try:
+            reference: SecretReference | None = SecretReference.parse(match.group(1))
+            error = ""
+        except ValueError as e:
+            reference, error = None, str(e)
+        matches.append(ReferenceMatch(path, line, match.group(0), reference, error))
+
+    return matches
+
+
+def substitute(
+    text: str, values: dict[SecretReference, str], escape_json: bool = False
+) -> str:
+    """Replace the references in some text with the values they resolved to.
+
+    References without a value are left as they are.
+
+    Args:
+        text (str): The text.
+        values (dict[SecretReference, str]): The value of each resolved reference.
+        escape_json (bool): Escape values for use inside a JSON string. Defaults to False.
+
+    Returns:
+        str: The text with references replaced.
+    """
+
+    def replace(match: re.Match) -> str:
+        try:
+            value = values.get(SecretReference.parse(match.group(1)))
+        except ValueError:
+            value = None
+
+        if value is None:
+            return match.group(0)
+        return json.dumps(value)[1:-1] if escape_json else value
+
+    return REFERENCE_PATTERN.sub(replace, text)
+
+
+class ResolveStatus(Enum):
+    """An enum containing the outcomes of resolving a reference."""
+
+    RESOLVED = "resolved"
+    NOT_FOUND = "not_found"
+    DISABLED = "disabled"
+    FORBIDDEN = "forbidden"
+    INVALID = "invalid"
+    FAILED = "failed"
+
+
+class Resolution:
+    """The outcome of resolving a reference. The value is never included when the outcome is reported."""
+
+    def __init__(
+        self,
+        reference: SecretReference,
+        status: ResolveStatus,
+        value: str | None = None,
+        attempts: int = 0,
+        error: str = "",
+    ) -> None:
+        """The outcome of resolving a reference. The value is never included when the outcome is reported.
+
+        Args:
+            reference (SecretReference): The reference.
+            status (ResolveStatus): The outcome.
+            value (str | None): The value of the secret, if it was resolved. Defaults to None.
+            attempts (int): The number of attempts made. Defaults to 0.
+            error (str): The error message if the reference could not be resolved. Defaults to "".
+        """
+
+        self.reference = reference
+        self.status = status
+        self.value = value
+        self.attempts = attempts
+        self.error = error
+
+    def to_dict(self, matches: Iterable[ReferenceMatch] = ()) -> dict[str, Any]:
+        """Convert the outcome to a JSON serialisable dictionary.
+
+        Args:
+            matches (Iterable[ReferenceMatch]): Where the reference was found. Defaults to ().
+
+        Returns:
+            dict[str, Any]: The outcome.
+        """
+
+        return {
+            "reference": str(self.reference),
+            "vault": self.reference.vault,
+            "name": self.reference.name,
+            "version": self.reference.version,
+            "status": self.status.value,
+            "attempts": self.attempts,
+            "error": self.error,
+            "locations": [f"{x.path}:{x.line}" for x in matches],
+        }
+
+
+def resolve_status(error: Exception) -> ResolveStatus:
+    """Classify why a reference could not be resolved.
+
+    Args:
+        error (Exception): The error raised when fetching the secret.
+
+    Returns:
+        ResolveStatus: The outcome.
+    """
+
+    if isinstance(error, ResourceNotFoundError):
+        return ResolveStatus.NOT_FOUND
+
+    if isinstance(error, HttpResponseError) and error.status_code in (401, 403):
+        # Key Vault answers 403 both for missing permissions and for disabled secrets.
+        if "disabled" in str(error).lower():
+            return ResolveStatus.DISABLED
+        return ResolveStatus.FORBIDDEN
+
+    return ResolveStatus.FAILED
+
+
+class ReferenceResolver:
+    """Resolves references to the secrets in a vault through a bounded, throttle aware pipeline."""
+
+    def __init__(
+        self,
+        client: SecretBackend,
+        concurrency: int = 32,
+        rate: float = 200,
+        attempts: int = 3,
+    ) -> None:
+        """Resolves references to the secrets in a vault through a bounded, throttle aware pipeline.
+
+        Args:
+            client (SecretBackend): The client for the vault the references point at.
+            concurrency (int): The maximum number of fetches in flight. Defaults to 32.
+            rate (float): The maximum number of fetches started per second. Defaults to 200.
+            attempts (int): The maximum number of attempts per reference. Defaults to 3.
+        """
+
+        self.client = client
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.attempts = attempts
+
+    async def resolve(self, reference: SecretReference) -> Resolution:
+        """Fetch the value a single reference points at.
+
+        Args:
+            reference (SecretReference): The reference.
+
+        Returns:
+            Resolution: The outcome.
+        """
+
+        try:
+            value, attempts = await retry(
+                lambda: self.client.get_secret_value(reference.name, reference.version),
+                throttle_delay,
+                attempts=self.attempts,
+                limiter=self.limiter,
+            )
+        except Exception as e:
+            attempts = attempts_made(e)
+            return Resolution(
+                reference, resolve_status(e), attempts=attempts, error=str(e)
+            )
+
+        return Resolution(reference, ResolveStatus.RESOLVED, value, attempts)
+
+    async def resolve_all(
+        self, references: Iterable[SecretReference]
+    ) -> AsyncIterator[Resolution]:
+        """Fetch the values many references point at, yielding outcomes as they complete.
+
+        Args:
+            references (Iterable[SecretReference]): The references, which should be unique.
+
+        Yields:
+            Resolution: The outcome for each reference.
+        """
+
+        async for resolution in map_bounded(
+            self.resolve, references, limit=self.concurrency
+        ):
+            yield resolution
+
+
+async def resolve_references(
+    references: list[SecretReference],
+    concurrency: int = 32,
+    rate: float = 200,
+    attempts: int = 3,
+    config: Mapping[str, Any] | None = None,
+) -> list[Resolution]:
+    """Resolve references, with the vaults they point at resolved concurrently.
+
+    Args:
+        references (list[SecretReference]): The unique references.
+        concurrency (int): The maximum number of fetches in flight per vault. Defaults to 32.
+        rate (float): The maximum number of fetches started per second per vault. Defaults to 200.
+        attempts (int): The maximum number of attempts per reference. Defaults to 3.
+        config (Mapping[str, Any] | None): The configuration that picks the backend. Defaults to None.
+
+    Returns:
+        list[Resolution]: The outcome for each reference.
+    """
+
+    by_vault: dict[str, list[SecretReference]] = defaultdict(list)
+    for reference in references:
+        by_vault[reference.vault.lower()].append(reference)
+
+    async def resolve_vault(
+        vault: str, items: list[SecretReference]
+    ) -> list[Resolution]:
+        async with await open_backend(vault, config) as client:
+            resolver = ReferenceResolver(
+                client, concurrency=concurrency, rate=rate, attempts=attempts
+            )
+            return [x async for x in resolver.resolve_all(items)]
+
+    results = await asyncio.gather(*[resolve_vault(k, v) for k, v in by_vault.items()])
+    return [x for items in results for x in items]
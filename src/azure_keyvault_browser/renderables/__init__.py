@@ -2,9 +2,11 @@ from .help import HelpRenderable
 from .secret_properties import SecretPropertiesRenderable
 from .secret_versions_table import SecretVersionsTableRenderable
 from .secrets_table import SecretsTableRenderable
+from .secrets_tree import SecretsTreeRenderable
 
 __all__ = (
     "SecretsTableRenderable",
+    "SecretsTreeRenderable",
     "SecretVersionsTableRenderable",
     "SecretPropertiesRenderable",
     "HelpRenderable",
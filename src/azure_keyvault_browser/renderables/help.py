@@ -17,6 +17,8 @@ class HelpRenderable:
         "global": {
             "back": Keys.Escape,
             "help": "?",
+            "scan": Keys.ControlE,
+            "wipe cache": Keys.ControlX,
             "quit": Keys.ControlC,
         },
         "navigation": {
@@ -30,6 +32,14 @@ class HelpRenderable:
             "last page": "l",
             "select": Keys.Enter,
         },
+        "secrets": {
+            "cycle sort": "s",
+            "reverse sort": "r",
+            "toggle selection": "space",
+            "select all": "a",
+            "tree view": "t",
+            "bulk update": Keys.ControlU,
+        },
         "secret properties": {
             "unlock": Keys.ControlS,
             "view": Keys.ControlK,
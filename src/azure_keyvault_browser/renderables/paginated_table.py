@@ -46,6 +46,18 @@ class PaginatedTableRenderable(ABC):
         index = row - 1 if row > 1 else 0
         return next(itertools.islice(cells, index, None))
 
+    def selected_renderable(self) -> Any | None:
+        """The renderable for the selected row, read from the data rather than the last rendered table.
+
+        Returns:
+            Any | None: The renderable or None if no row is selected.
+        """
+
+        renderables = self.renderables(self.start_index(), self.end_index())
+        if 0 < self.row <= len(renderables):
+            return renderables[self.row - 1]
+        return None
+
     @property
     def row(self) -> int:
         return self.__row
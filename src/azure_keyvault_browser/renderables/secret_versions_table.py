@@ -1,10 +1,9 @@
 from __future__ import annotations
 
-from azure.keyvault.secrets import SecretProperties
 from rich.table import Table
 
 from .. import styles
-from ..util import format_datetime
+from ..viewmodels import SecretVersionsTableViewModel
 from .paginated_table import PaginatedTableRenderable
 
 
@@ -13,7 +12,7 @@ class SecretVersionsTableRenderable(PaginatedTableRenderable):
 
     def __init__(
         self,
-        items: list[SecretProperties],
+        rows: SecretVersionsTableViewModel,
         title: str,
         page_size: int = -1,
         page: int = 1,
@@ -22,21 +21,19 @@ class SecretVersionsTableRenderable(PaginatedTableRenderable):
         """A renderable that displays build history.
 
         Args:
-            items (list[str]): A list of items to display.
+            rows (SecretVersionsTableViewModel): The formatted rows to display.
             title (str): Title of the table.
             page_size (int): The size of the page before pagination happens. Defaults to -1.
             page (int): The starting page. Defaults to 1.
             row (int): The starting row. Defaults to 0.
         """
 
-        self.items = items
+        self.rows = rows
         self.title = title
 
-        super().__init__(
-            len(items), page_size=page_size, page=page, row=row, row_size=1
-        )
+        super().__init__(len(rows), page_size=page_size, page=page, row=row, row_size=1)
 
-    def renderables(self, start_index: int, end_index: int) -> list[SecretProperties]:
+    def renderables(self, start_index: int, end_index: int) -> list[tuple[str, ...]]:
         """Generate a list of renderables.
 
         Args:
@@ -44,25 +41,21 @@ class SecretVersionsTableRenderable(PaginatedTableRenderable):
             end_index (int): The ending index.
 
         Returns:
-            list[str]: A list of renderables.
+            list[tuple[str, ...]]: A list of precomputed rows.
         """
 
-        return self.items[start_index:end_index]
+        return self.rows.rows(start_index, end_index)
 
-    def render_rows(self, table: Table, renderables: list[SecretProperties]) -> None:
+    def render_rows(self, table: Table, renderables: list[tuple[str, ...]]) -> None:
         """Renders rows for the table.
 
         Args:
             table (Table): The table to render rows for.
-            renderables (list[str): The renderables to render.
+            renderables (list[tuple[str, ...]]): The precomputed rows to render.
         """
 
-        for item in renderables:
-            version = item.version
-
-            created_on = format_datetime(item.created_on)
-
-            table.add_row(version, created_on)
+        for row in renderables:
+            table.add_row(*row)
 
     def render_columns(self, table: Table) -> None:
         """Renders columns for the table.
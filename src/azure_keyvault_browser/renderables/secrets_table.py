@@ -1,40 +1,44 @@
 from __future__ import annotations
 
-from azure.keyvault.secrets import SecretProperties
+from rich.style import Style
 from rich.table import Table
 
 from .. import styles
-from ..util import format_datetime
+from ..viewmodels import SecretsTableViewModel
 from .paginated_table import PaginatedTableRenderable
 
 
 class SecretsTableRenderable(PaginatedTableRenderable):
     def __init__(
         self,
-        items: list[SecretProperties],
+        rows: SecretsTableViewModel,
         title: str,
         page_size: int = -1,
         page: int = 1,
         row: int = 0,
+        selected: set[str] | None = None,
+        pinned: set[str] | None = None,
     ) -> None:
         """A renderable that displays build history.
 
         Args:
-            items (list[str]): A list of items to display.
+            rows (SecretsTableViewModel): The formatted rows to display.
             title (str): Title of the table.
             page_size (int): The size of the page before pagination happens. Defaults to -1.
             page (int): The starting page. Defaults to 1.
             row (int): The starting row. Defaults to 0.
+            selected (set[str] | None): Names of selected secrets. Defaults to None.
+            pinned (set[str] | None): Names of pinned secrets. Defaults to None.
         """
 
-        self.items = items
+        self.rows = rows
+        self.selected = selected or set()
+        self.pinned = pinned or set()
         self.title = title
 
-        super().__init__(
-            len(items), page_size=page_size, page=page, row=row, row_size=1
-        )
+        super().__init__(len(rows), page_size=page_size, page=page, row=row, row_size=1)
 
-    def renderables(self, start_index: int, end_index: int) -> list[SecretProperties]:
+    def renderables(self, start_index: int, end_index: int) -> list[tuple[str, ...]]:
         """Generate a list of renderables.
 
         Args:
@@ -42,25 +46,29 @@ class SecretsTableRenderable(PaginatedTableRenderable):
             end_index (int): The ending index.
 
         Returns:
-            list[str]: A list of renderables.
+            list[tuple[str, ...]]: A list of precomputed rows.
         """
 
-        return self.items[start_index:end_index]
+        return self.rows.rows(start_index, end_index)
 
-    def render_rows(self, table: Table, renderables: list[SecretProperties]) -> None:
+    def render_rows(self, table: Table, renderables: list[tuple[str, ...]]) -> None:
         """Renders rows for the table.
 
         Args:
             table (Table): The table to render rows for.
-            renderables (list[str): The renderables to render.
+            renderables (list[tuple[str, ...]]): The precomputed rows to render.
         """
 
-        for item in renderables:
-
-            name = item.name
-            updated_on = format_datetime(item.updated_on)
-
-            table.add_row(name, updated_on)
+        selected_style = Style(color=styles.ORANGE, bold=True)
+        pinned_style = Style(color=styles.GREEN)
+        for row in renderables:
+            if row[0] in self.selected:
+                style = selected_style
+            elif row[0] in self.pinned:
+                style = pinned_style
+            else:
+                style = None
+            table.add_row(*row, style=style)
 
     def render_columns(self, table: Table) -> None:
         """Renders columns for the table.
@@ -72,5 +80,5 @@ class SecretsTableRenderable(PaginatedTableRenderable):
             "name", header_style=f"{styles.GREY} bold", no_wrap=True, ratio=40
         )
         table.add_column(
-            "last updated", header_style=f"{styles.GREY} bold", no_wrap=True
+            self.rows.date_label, header_style=f"{styles.GREY} bold", no_wrap=True
         )
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from rich.style import Style
+from rich.table import Table
+
+from .. import styles
+from ..viewmodels import SecretsTreeViewModel
+from .paginated_table import PaginatedTableRenderable
+
+
+class SecretsTreeRenderable(PaginatedTableRenderable):
+    def __init__(
+        self,
+        rows: SecretsTreeViewModel,
+        title: str,
+        page_size: int = -1,
+        page: int = 1,
+        row: int = 0,
+        selected: set[str] | None = None,
+        pinned: set[str] | None = None,
+    ) -> None:
+        """A renderable that displays secrets as a tree of their names.
+
+        Args:
+            rows (SecretsTreeViewModel): The formatted rows to display.
+            title (str): Title of the table.
+            page_size (int): The size of the page before pagination happens. Defaults to -1.
+            page (int): The starting page. Defaults to 1.
+            row (int): The starting row. Defaults to 0.
+            selected (set[str] | None): Names of selected secrets. Defaults to None.
+            pinned (set[str] | None): Names of pinned secrets. Defaults to None.
+        """
+
+        self.rows = rows
+        self.selected = selected or set()
+        self.pinned = pinned or set()
+        self.title = title
+
+        super().__init__(len(rows), page_size=page_size, page=page, row=row, row_size=1)
+
+    def renderables(self, start_index: int, end_index: int) -> list[tuple[str, ...]]:
+        """Generate a list of renderables.
+
+        Args:
+            start_index (int): The starting index.
+            end_index (int): The ending index.
+
+        Returns:
+            list[tuple[str, ...]]: A list of precomputed rows.
+        """
+
+        return self.rows.rows(start_index, end_index)
+
+    def render_rows(self, table: Table, renderables: list[tuple[str, ...]]) -> None:
+        """Renders rows for the table. The path and secret name that lead each row are not shown.
+
+        Args:
+            table (Table): The table to render rows for.
+            renderables (list[tuple[str, ...]]): The precomputed rows to render.
+        """
+
+        selected_style = Style(color=styles.ORANGE, bold=True)
+        pinned_style = Style(color=styles.GREEN)
+        for row in renderables:
+            if row[1] in self.selected:
+                style = selected_style
+            elif row[1] in self.pinned:
+                style = pinned_style
+            else:
+                style = None
+            table.add_row(*row[2:], style=style)
+
+    def render_columns(self, table: Table) -> None:
+        """Renders columns for the table.
+
+        Args:
+            table (Table): The table to render columns for.
+        """
+        table.add_column(
+            "name", header_style=f"{styles.GREY} bold", no_wrap=True, ratio=40
+        )
+        table.add_column(
+            self.rows.date_label, header_style=f"{styles.GREY} bold", no_wrap=True
+        )
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+from textual.widget import Widget
+
+
+class FrameScheduler:
+    """Coalesces widget refresh requests into frames.
+
+    Widgets ask the scheduler for a refresh instead of refreshing themselves. Requests made between two frames are
+    merged, so holding down a key produces at most one repaint per widget per frame. A layout of the whole view is
+    only requested when a widget's geometry has actually changed, otherwise the widget is just repainted in place.
+    """
+
+    def __init__(self, max_fps: float = 30) -> None:
+        """Coalesces widget refresh requests into frames.
+
+        Args:
+            max_fps (float): The maximum number of frames per second. Defaults to 30.
+        """
+
+        self.interval = 1 / max_fps if max_fps > 0 else 0
+        self._pending: dict[Widget, bool] = {}
+        self._geometry: dict[Widget, tuple[Any, ...]] = {}
+        self._handle: asyncio.TimerHandle | None = None
+        self._last_frame = 0.0
+
+    def geometry(self, widget: Widget) -> tuple[Any, ...]:
+        """The properties of a widget that affect the layout of the view.
+
+        Args:
+            widget (Widget): The widget.
+
+        Returns:
+            tuple[Any, ...]: The widget's geometry.
+        """
+
+        return (
+            widget.visible,
+            widget.layout_size,
+            widget.layout_fraction,
+            widget.layout_min_size,
+            widget.layout_offset_x,
+            widget.layout_offset_y,
+        )
+
+    def request(
+        self, widget: Widget, layout: bool = False, force: bool = False
+    ) -> None:
+        """Request a refresh of a widget in the next frame.
+
+        Args:
+            widget (Widget): The widget to refresh.
+            layout (bool): The widget may need the view to be laid out again. Defaults to False.
+            force (bool): Lay out the view even if the geometry is unchanged, for example after the screen has been
+                taken over by an editor. Defaults to False.
+        """
+
+        if force:
+            self._geometry.pop(widget, None)
+
+        self._pending[widget] = self._pending.get(widget, False) or layout or force
+
+        if self._handle is None:
+            delay = max(0.0, self._last_frame + self.interval - time.monotonic())
+            self._handle = asyncio.get_event_loop().call_later(delay, self.flush)
+
+    def flush(self) -> None:
+        """Refresh every widget with a pending request."""
+
+        self._handle = None
+        self._last_frame = time.monotonic()
+        pending, self._pending = self._pending, {}
+
+        for widget, layout in pending.items():
+            if layout:
+                geometry = self.geometry(widget)
+                layout = self._geometry.get(widget) != geometry
+                self._geometry[widget] = geometry
+
+            widget.refresh(layout=layout)
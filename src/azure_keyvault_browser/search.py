@@ -1,14 +1,251 @@
 from __future__ import annotations
 
 import os
-
-from whoosh.analysis import NgramWordAnalyzer
-from whoosh.fields import TEXT, Schema
-from whoosh.index import FileIndex, create_in
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Iterable, Sequence
+
+from azure.keyvault.secrets import SecretProperties
+from whoosh.analysis import (
+    Analyzer,
+    LowercaseFilter,
+    NgramWordAnalyzer,
+    RegexTokenizer,
+)
+from whoosh.fields import ID, NUMERIC, TEXT, Schema
+from whoosh.index import FileIndex, create_in, open_dir
 from whoosh.qparser import QueryParser
+from whoosh.query import Query
+from whoosh.searching import Searcher
+from whoosh.writing import CLEAR
 
 from .config import INDEX_DIR
 
+# Changes to this many secrets or more are written by rebuilding the index rather than updating it.
+REBUILD_THRESHOLD = 5000
+PAGE_SIZE = 100
+
+# Names are split into tokens on whitespace and the separators commonly used in secret names.
+TOKEN_PATTERN = r"[^\s\-_.]+"
+
+# Missing dates are indexed as the largest timestamp so that they sort after present ones.
+MISSING_DATE = 2**62
+
+
+class AnalyzerProfile(Enum):
+    """An enum containing the ways that secret names can be analysed for searching."""
+
+    NGRAM = "ngram"
+    EDGE = "edge"
+    TRIGRAM = "trigram"
+    TOKENS = "tokens"
+
+    @property
+    def description(self) -> str:
+        """A human friendly description of the profile.
+
+        Returns:
+            str: The description.
+        """
+
+        return {
+            "ngram": "every substring of 2 to 50 characters",
+            "edge": "prefixes of each token",
+            "trigram": "substrings of 2 to 3 characters",
+            "tokens": "whole tokens split on -, _ and .",
+        }[self.value]
+
+    def analyzer(self) -> Analyzer:
+        """Build the analyzer for the profile.
+
+        Returns:
+            Analyzer: The analyzer.
+        """
+
+        tokenizer = RegexTokenizer(TOKEN_PATTERN)
+
+        if self is AnalyzerProfile.EDGE:
+            return NgramWordAnalyzer(2, 50, tokenizer=tokenizer, at="start")
+        if self is AnalyzerProfile.TRIGRAM:
+            return NgramWordAnalyzer(2, 3)
+        if self is AnalyzerProfile.TOKENS:
+            return tokenizer | LowercaseFilter()
+        return NgramWordAnalyzer(minsize=2, maxsize=50)
+
+
+def timestamp(dt: datetime | None) -> int:
+    """Convert an optional datetime to a sortable timestamp.
+
+    Args:
+        dt (datetime | None): The datetime.
+
+    Returns:
+        int: The timestamp in microseconds, or MISSING_DATE.
+    """
+
+    return int(dt.timestamp() * 1_000_000) if dt else MISSING_DATE
+
+
+def document(properties: SecretProperties) -> dict[str, Any]:
+    """Build the index document for a secret.
+
+    Args:
+        properties (SecretProperties): The secret.
+
+    Returns:
+        dict[str, Any]: The document fields.
+    """
+
+    word = (properties.name or "").lower()
+    return {
+        "name": word,
+        "title": word,
+        "content": word,
+        "updated_on": timestamp(properties.updated_on),
+        "expires_on": timestamp(properties.expires_on),
+    }
+
+
+class SearchCursor(Sequence[str]):
+    """A lazily paged view over the results of a query.
+
+    Nothing is fetched until an item is requested, and then only the page that holds it. Pages are ranked by score, or
+    by a sortable field without scoring at all, so broad queries only ever materialise the pages that are shown.
+    """
+
+    def __init__(
+        self,
+        index: FileIndex,
+        query: Query,
+        sortedby: str | None = None,
+        reverse: bool = False,
+        page_size: int = PAGE_SIZE,
+        searcher: Searcher | None = None,
+    ) -> None:
+        """A lazily paged view over the results of a query.
+
+        Args:
+            index (FileIndex): The index to search.
+            query (Query): The parsed query.
+            sortedby (str | None): A sortable field to order by. Defaults to None, which orders by score.
+            reverse (bool): Reverse the order. Defaults to False.
+            page_size (int): The number of results fetched at a time. Defaults to PAGE_SIZE.
+            searcher (Searcher | None): A searcher to share with another cursor over the same query. Defaults to None.
+        """
+
+        self.file_index = index
+        self.query = query
+        self.sortedby = sortedby
+        self.reverse = reverse
+        self.page_size = max(page_size, 1)
+        self._searcher = searcher
+        self._pages: dict[int, list[str]] = {}
+        self._total: int | None = None
+
+    @property
+    def searcher(self) -> Searcher:
+        """A point in time searcher, opened on first use.
+
+        Returns:
+            Searcher: The searcher.
+        """
+
+        if self._searcher is None:
+            self._searcher = self.file_index.searcher()
+        return self._searcher
+
+    def close(self) -> None:
+        """Close the searcher. Cursors sorted from this one share it, so they are closed as well."""
+
+        if self._searcher is not None:
+            self._searcher.close()
+            self._searcher = None
+
+    def sorted(
+        self, sortedby: str | None, reverse: bool = False, page_size: int | None = None
+    ) -> SearchCursor:
+        """Get a cursor over the same results in a different order.
+
+        Args:
+            sortedby (str | None): A sortable field to order by, or None to order by score.
+            reverse (bool): Reverse the order. Defaults to False.
+            page_size (int | None): The number of results fetched at a time. Defaults to this cursor's page size.
+
+        Returns:
+            SearchCursor: The cursor.
+        """
+
+        cursor = SearchCursor(
+            self.file_index,
+            self.query,
+            sortedby=sortedby,
+            reverse=reverse,
+            page_size=page_size or self.page_size,
+            searcher=self.searcher,
+        )
+        cursor._total = self._total
+        return cursor
+
+    def page(self, pagenum: int) -> list[str]:
+        """Fetch a page of results.
+
+        Args:
+            pagenum (int): The page number, starting at 1.
+
+        Returns:
+            list[str]: The names on the page.
+        """
+
+        if pagenum not in self._pages:
+            if self.sortedby is None:
+                sortedby: Any = None
+            elif self.sortedby == "name":
+                sortedby = "name"
+            else:
+                sortedby = [self.sortedby, "name"]
+
+            results = self.searcher.search_page(
+                self.query,
+                pagenum,
+                pagelen=self.page_size,
+                sortedby=sortedby,
+                reverse=self.reverse,
+            )
+            self._total = results.total
+            self._pages[pagenum] = [x["name"] for x in results]
+
+        return self._pages[pagenum]
+
+    def names(self) -> list[str]:
+        """Every matching name, unscored and in index order.
+
+        Returns:
+            list[str]: The names.
+        """
+
+        searcher = self.searcher
+        return [
+            searcher.stored_fields(x)["name"]
+            for x in searcher.docs_for_query(self.query)
+        ]
+
+    def __len__(self) -> int:
+        if self._total is None:
+            self.page(1)
+        return self._total or 0
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("search cursor index out of range")
+
+        return self.page(index // self.page_size + 1)[index % self.page_size]
+
 
 class NoSchemaException(Exception):
     """Exception raised when no schema is found."""
@@ -25,7 +262,19 @@ class NoIndexException(Exception):
 class Search(object):
     """A wrapper class for Whoosh."""
 
-    def __init__(self):
+    def __init__(
+        self, profile: AnalyzerProfile = AnalyzerProfile.NGRAM, path: str = INDEX_DIR
+    ) -> None:
+        """A wrapper class for Whoosh.
+
+        Args:
+            profile (AnalyzerProfile): How names are analysed. Defaults to AnalyzerProfile.NGRAM.
+            path (str): The directory the index is kept in. Defaults to INDEX_DIR.
+        """
+
+        self.profile = profile
+        self.path = path
+        self.readonly = False
         self.__index: FileIndex | None = None
         self.__schema: Schema | None = None
 
@@ -42,10 +291,16 @@ class Search(object):
     def build_schema(self) -> None:
         """Build the schema for the index."""
 
-        analyzer = NgramWordAnalyzer(minsize=2, maxsize=50)
+        analyzer = self.profile.analyzer()
         title = TEXT(analyzer=analyzer, phrase=False, stored=True)
         content = TEXT(phrase=False, stored=True)
-        self.__schema = Schema(title=title, content=content)
+        self.__schema = Schema(
+            name=ID(unique=True, stored=True, sortable=True),
+            title=title,
+            content=content,
+            updated_on=NUMERIC(bits=64, sortable=True),
+            expires_on=NUMERIC(bits=64, sortable=True),
+        )
 
     @property
     def index(self) -> FileIndex | None:
@@ -58,33 +313,104 @@ class Search(object):
         return self.__index
 
     @index.setter
-    def index(self, nodes: list[str]) -> None:
+    def index(self, nodes: list[SecretProperties]) -> None:
         """Index the nodes. This will overwrite the existing index.
 
         Args:
-            nodes (list[str]): A list of nodes to index.
+            nodes (list[SecretProperties]): A list of nodes to index.
+        """
+
+        self.build(nodes)
+
+    def open(self, path: str) -> None:
+        """Open an index kept up to date by another process, such as the daemon, for searching only.
+
+        Args:
+            path (str): The directory the index is kept in.
         """
 
-        if not os.path.exists(INDEX_DIR):
-            os.mkdir(INDEX_DIR)
+        self.path = path
+        self.readonly = True
+        self.__index = open_dir(path)
+        self.__schema = self.__index.schema
+
+    def build(
+        self,
+        nodes: list[SecretProperties],
+        progress: Callable[[int, int], None] | None = None,
+    ) -> None:
+        """Index the nodes. This will overwrite the existing index.
+
+        An index that is already open is replaced by a writer that clears it when it commits, so searches keep using
+        the previous contents until the new ones are complete. This blocks, so call it from an executor when the event
+        loop needs to stay responsive.
+
+        Args:
+            nodes (list[SecretProperties]): A list of nodes to index.
+            progress (Callable[[int, int], None] | None): Called with the number of nodes handed to the writer so far
+                and the total. Called with equal values once every node has been added and the writer is committing.
+                Defaults to None.
+        """
+
+        index = self.__index
+        if index is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.build_schema()
+            index = create_in(self.path, self.schema)
+
+        total = len(nodes)
+        batchsize = max(100, total // 100)
+
+        writer = index.writer()
+        try:
+            for i, properties in enumerate(nodes, 1):
+                writer.add_document(**document(properties))
+                if progress is not None and i % batchsize == 0:
+                    progress(i, total)
+
+            if progress is not None:
+                progress(total, total)
+
+            # The existing segments are dropped in the same commit that adds the new one.
+            writer.commit(mergetype=CLEAR)
+        finally:
+            if not writer.is_closed:
+                writer.cancel()
+
+        self.__index = index
+
+    def update(
+        self, added: Iterable[SecretProperties] = (), removed: Iterable[str] = ()
+    ) -> None:
+        """Add, replace and remove nodes without rebuilding the index.
+
+        Args:
+            added (Iterable[SecretProperties]): Nodes to add or replace. Defaults to ().
+            removed (Iterable[str]): The names of nodes to remove. Defaults to ().
 
-        self.build_schema()
+        Raises:
+            NoIndexException: If the index is not set.
+        """
 
-        self.__index = create_in(INDEX_DIR, self.schema)
+        if not self.__index:
+            raise NoIndexException(
+                "No index found. Ensure that you have indexed your nodes."
+            )
 
         with self.__index.writer() as w:
-            for word in nodes:
-                w.add_document(title=word, content=word)
+            for word in removed:
+                w.delete_by_term("name", word.lower())
+            for properties in added:
+                w.update_document(**document(properties))
 
-    def search(self, query_string: str, top: int | None = None) -> list[str]:
-        """Search for a query string.
+    def parse(self, query_string: str) -> Query:
+        """Parse a query string.
 
         Args:
-            query_string (str): The query string to search for.
-            top (int): The number of results to return. Defaults to 5.
+            query_string (str): The query string to parse.
 
         Returns:
-            list[str]: The results of the search.
+            Query: The parsed query.
 
         Raises:
             NoIndexException: If the index is not set.
@@ -92,11 +418,40 @@ class Search(object):
 
         if not self.__index:
             raise NoIndexException(
-                "Index found. Ensure that you have indexed your nodes."
+                "No index found. Ensure that you have indexed your nodes."
             )
 
         query_parser = QueryParser("title", self.__index.schema)
-        query = query_parser.parse(query_string)
+        return query_parser.parse(query_string)
+
+    def cursor(self, query_string: str, page_size: int = PAGE_SIZE) -> SearchCursor:
+        """Search for a query string, returning a lazily paged cursor ranked by score.
+
+        Args:
+            query_string (str): The query string to search for.
+            page_size (int): The number of results fetched at a time. Defaults to PAGE_SIZE.
+
+        Returns:
+            SearchCursor: The results.
+        """
+
+        query = self.parse(query_string)
+        assert self.__index is not None
+        return SearchCursor(self.__index, query, page_size=page_size)
+
+    def search(self, query_string: str, top: int | None = None) -> list[str]:
+        """Search for a query string.
+
+        Args:
+            query_string (str): The query string to search for.
+            top (int): The number of results to return. Defaults to 5.
+
+        Returns:
+            list[str]: The results of the search.
+        """
+
+        query = self.parse(query_string)
+        assert self.__index is not None
 
         with self.__index.searcher() as s:
             results = s.search(query, limit=top)
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Collection, Iterable, Sequence
+
+from azure.keyvault.secrets import SecretProperties
+
+
+class SortKey(Enum):
+    """An enum containing the fields that secrets can be sorted by."""
+
+    NAME = "name"
+    UPDATED_ON = "updated_on"
+    EXPIRES_ON = "expires_on"
+
+    @property
+    def label(self) -> str:
+        """A human friendly label for the sort key.
+
+        Returns:
+            str: The label.
+        """
+
+        return {
+            "name": "name",
+            "updated_on": "last updated",
+            "expires_on": "expires on",
+        }[self.value]
+
+    def next(self) -> SortKey:
+        """Get the sort key that follows this one.
+
+        Returns:
+            SortKey: The next sort key, wrapping around to the first.
+        """
+
+        keys = list(SortKey)
+        return keys[(keys.index(self) + 1) % len(keys)]
+
+
+def sort_entry(key: SortKey, properties: SecretProperties) -> tuple[Any, ...]:
+    """Build a comparable entry for a secret.
+
+    Missing values always sort after present ones and the name is used as a tie breaker so that
+    every entry in an index is unique.
+
+    Args:
+        key (SortKey): The field to sort by.
+        properties (SecretProperties): The secret to build the entry for.
+
+    Returns:
+        tuple[Any, ...]: The sort entry.
+    """
+
+    name = properties.name or ""
+    if key is SortKey.NAME:
+        return (0, name.lower(), name)
+
+    value = getattr(properties, key.value)
+    return (0, value, name) if value else (1, 0, name)
+
+
+class SortIndex:
+    """A sorted index of secret names for a single sort key."""
+
+    def __init__(self, key: SortKey) -> None:
+        """A sorted index of secret names for a single sort key.
+
+        Args:
+            key (SortKey): The field the index is sorted by.
+        """
+
+        self.key = key
+        self._entries: list[tuple[Any, ...]] = []
+        self._entry_map: dict[str, tuple[Any, ...]] = {}
+        self._order: list[str] | None = None
+        self._rank: dict[str, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(self, items: Iterable[SecretProperties]) -> None:
+        """Build the index from scratch. This will overwrite the existing index.
+
+        Args:
+            items (Iterable[SecretProperties]): The secrets to index.
+        """
+
+        self._entry_map = {x.name: sort_entry(self.key, x) for x in items if x.name}
+        self._entries = sorted(self._entry_map.values())
+        self._invalidate()
+
+    def add(self, properties: SecretProperties) -> None:
+        """Add or replace a single secret in the index.
+
+        Args:
+            properties (SecretProperties): The secret to add.
+        """
+
+        if properties.name in self._entry_map:
+            self.remove(properties.name)
+
+        entry = sort_entry(self.key, properties)
+        self._entry_map[entry[-1]] = entry
+        insort(self._entries, entry)
+        self._invalidate()
+
+    def remove(self, name: str) -> None:
+        """Remove a single secret from the index.
+
+        Args:
+            name (str): The name of the secret to remove.
+        """
+
+        entry = self._entry_map.pop(name, None)
+        if entry is None:
+            return
+
+        del self._entries[bisect_left(self._entries, entry)]
+        self._invalidate()
+
+    def order(self) -> list[str]:
+        """Secret names in ascending order.
+
+        Returns:
+            list[str]: The ordered names.
+        """
+
+        if self._order is None:
+            self._order = [x[-1] for x in self._entries]
+        return self._order
+
+    def rank(self) -> dict[str, int]:
+        """The position of each secret name in the index.
+
+        Returns:
+            dict[str, int]: A mapping of name to position.
+        """
+
+        if self._rank is None:
+            self._rank = {name: i for i, name in enumerate(self.order())}
+        return self._rank
+
+    def _invalidate(self) -> None:
+        self._order = None
+        self._rank = None
+
+
+class SortedView:
+    """Maintains a sort index per sort key and produces ordered views of secret names."""
+
+    def __init__(self, key: SortKey = SortKey.NAME, reverse: bool = False) -> None:
+        """Maintains a sort index per sort key and produces ordered views of secret names.
+
+        Args:
+            key (SortKey): The active sort key. Defaults to SortKey.NAME.
+            reverse (bool): Whether to sort in descending order. Defaults to False.
+        """
+
+        self.key = key
+        self.reverse = reverse
+        self.indexes = {k: SortIndex(k) for k in SortKey}
+
+    def build(self, items: Collection[SecretProperties]) -> None:
+        """Build every index from scratch.
+
+        Args:
+            items (Collection[SecretProperties]): The secrets to index.
+        """
+
+        for index in self.indexes.values():
+            index.build(items)
+
+    def add(self, properties: SecretProperties) -> None:
+        """Add or replace a secret in every index.
+
+        Args:
+            properties (SecretProperties): The secret to add.
+        """
+
+        for index in self.indexes.values():
+            index.add(properties)
+
+    def remove(self, name: str) -> None:
+        """Remove a secret from every index.
+
+        Args:
+            name (str): The name of the secret to remove.
+        """
+
+        for index in self.indexes.values():
+            index.remove(name)
+
+    def sort(self, names: Collection[str] | None = None) -> list[str]:
+        """Order secret names by the active sort key.
+
+        Args:
+            names (Collection[str] | None): A subset of names to order, such as a search result. If None every
+                indexed name is returned. Defaults to None.
+
+        Returns:
+            list[str]: The ordered names.
+        """
+
+        index = self.indexes[self.key]
+
+        if names is None:
+            ordered = index.order()
+        elif len(names) * 8 < len(index):
+            # Small subsets are cheaper to sort by rank than to filter the full order.
+            rank = index.rank()
+            ordered = sorted((x for x in names if x in rank), key=rank.__getitem__)
+        else:
+            subset = names if isinstance(names, (set, frozenset, dict)) else set(names)
+            ordered = [x for x in index.order() if x in subset]
+
+        return ordered[::-1] if self.reverse else list(ordered)
+
+
+class VersionHistory(Sequence[SecretProperties]):
+    """The versions of a secret, newest first, that can be read while the versions are still arriving.
+
+    The newest versions seen so far are kept in a heap bounded to a page, so the first page can be shown after the
+    first page of results from the service instead of after the whole history has been listed. The full order is only
+    sorted when something past the first page is read, and is kept until more versions arrive.
+    """
+
+    def __init__(self, head_size: int) -> None:
+        """The versions of a secret, newest first, that can be read while the versions are still arriving.
+
+        Args:
+            head_size (int): The number of newest versions that are kept ready, usually a page of the table.
+        """
+
+        self.head_size = max(head_size, 1)
+        self._entries: list[tuple[datetime, int, SecretProperties]] = []
+        self._newest: list[tuple[datetime, int, SecretProperties]] = []
+        self._head: list[SecretProperties] | None = None
+        self._order: list[SecretProperties] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            items = (
+                self.head() if step == 1 and stop <= self.head_size else self.order()
+            )
+            return items[index]
+
+        if 0 <= index < self.head_size:
+            return self.head()[index]
+        return self.order()[index]
+
+    def add(self, properties: SecretProperties) -> None:
+        """Add a version.
+
+        Args:
+            properties (SecretProperties): The version to add.
+        """
+
+        created_on = properties.created_on or datetime.min.replace(tzinfo=timezone.utc)
+        entry = (created_on, len(self._entries), properties)
+        self._entries.append(entry)
+        self._order = None
+
+        if len(self._newest) < self.head_size:
+            heapq.heappush(self._newest, entry)
+            self._head = None
+        elif entry > self._newest[0]:
+            heapq.heapreplace(self._newest, entry)
+            self._head = None
+
+    def head(self) -> list[SecretProperties]:
+        """The newest versions seen so far.
+
+        Returns:
+            list[SecretProperties]: Up to head_size versions, newest first.
+        """
+
+        if self._head is None:
+            self._head = [x[-1] for x in sorted(self._newest, reverse=True)]
+        return self._head
+
+    def order(self) -> list[SecretProperties]:
+        """Every version seen so far.
+
+        Returns:
+            list[SecretProperties]: The versions, newest first.
+        """
+
+        if self._order is None:
+            self._order = [x[-1] for x in sorted(self._entries, reverse=True)]
+        return self._order
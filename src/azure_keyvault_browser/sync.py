@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import json
+import re
+from enum import Enum
+from typing import Any, AsyncIterator, Mapping
+
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend, throttle_delay
+from .concurrency import RateLimiter, attempts_made, map_bounded, retry
+from .duplicates import HashIndex, hash_value
+
+"""
+Syncing secrets into a vault from a .env or JSON file. The values in the vault are compared with the file by salted
+digest and only secrets whose values differ are written, so re-running a sync does not create new versions. Digests
+are kept in the hash index shared with duplicates and diff, so a secret that has not changed since it was last
+compared is not read again.
+"""
+
+NAME_PATTERN = re.compile(r"^[0-9a-zA-Z-]{1,127}$")
+ESCAPES = {"n": "\n", "r": "\r", "t": "\t", '"': '"', "\\": "\\"}
+
+
+def secret_name(key: str) -> str:
+    """Convert a key from a source file to a secret name. Key Vault does not allow underscores, so they become dashes.
+
+    Args:
+        key (str): The key, such as DB_PASSWORD.
+
+    Returns:
+        str: The secret name, such as DB-PASSWORD.
+
+    Raises:
+        ValueError: If the key cannot be a secret name.
+    """
+
+    name = key.replace("_", "-")
+    if not NAME_PATTERN.match(name):
+        raise ValueError(
+            f"'{key}' is not a valid secret name. Use letters, digits and dashes."
+        )
+    return name
+
+
+def parse_env(text: str) -> dict[str, str]:
+    """Parse the contents of a .env file.
+
+    Lines are KEY=VALUE, optionally starting with export. Values can be single quoted, which is taken literally, or
+    double quoted, which understands \\n, \\t, \\" and \\\\. Blank lines and comments are skipped.
+
+    Args:
+        text (str): The contents.
+
+    Returns:
+        dict[str, str]: The values by key. Later lines win.
+
+    Raises:
+        ValueError: If a line is malformed.
+    """
+
+    values = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export ") :].lstrip()
+
+        key, separator, value = line.partition("=")
+        key, value = key.strip(), value.strip()
+        if not separator or not key:
+            raise ValueError(f"Line {number} is not in the form KEY=VALUE.")
+
+        if len(value) >= 2 and value[0] == value[-1] == "'":
+            value = value[1:-1]
+        elif len(value) >= 2 and value[0] == value[-1] == '"':
+            value = re.sub(
+                r"\\(.)", lambda m: ESCAPES.get(m.group(1), m.group(0)), value[1:-1]
+            )
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+
+        values[key] = value
+
+    return values
+
+
+def parse_json(text: str) -> dict[str, str]:
+    """Parse the contents of a JSON file, which must be an object of keys and scalar values.
+
+    Args:
+        text (str): The contents.
+
+    Returns:
+        dict[str, str]: The values by key. Numbers, booleans and null are written as JSON.
+
+    Raises:
+        ValueError: If the file is not an object of scalars.
+    """
+
+    data = json.loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("The file must contain a JSON object.")
+
+    values = {}
+    for key, value in data.items():
+        if isinstance(value, (dict, list)):
+            raise ValueError(
+                f"The value of '{key}' must be a string, not {type(value).__name__}."
+            )
+        values[key] = value if isinstance(value, str) else json.dumps(value)
+
+    return values
+
+
+def read_source(text: str, is_json: bool) -> dict[str, str]:
+    """Read the secrets to sync from the contents of a source file.
+
+    Args:
+        text (str): The contents.
+        is_json (bool): Whether the file is JSON rather than .env.
+
+    Returns:
+        dict[str, str]: The values by secret name.
+
+    Raises:
+        ValueError: If the file is malformed, a key is not a valid secret name, or two keys name the same secret.
+    """
+
+    values: dict[str, str] = {}
+    keys: dict[str, str] = {}
+    for key, value in (parse_json(text) if is_json else parse_env(text)).items():
+        name = secret_name(key)
+        # Secret names are not case sensitive, so DB_PASSWORD and db-password are the same secret.
+        if name.lower() in keys:
+            raise ValueError(f"'{key}' and '{keys[name.lower()]}' are the same secret.")
+        keys[name.lower()] = key
+        values[name] = value
+
+    return values
+
+
+class SyncStatus(Enum):
+    """An enum containing the outcomes of syncing a single secret."""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+    PLANNED = "planned"
+    FAILED = "failed"
+
+
+class SyncResult:
+    """The outcome of syncing a single secret. The value is never included."""
+
+    def __init__(
+        self,
+        name: str,
+        status: SyncStatus,
+        action: str = "",
+        version: str | None = None,
+        attempts: int = 0,
+        error: str = "",
+    ) -> None:
+        """The outcome of syncing a single secret. The value is never included.
+
+        Args:
+            name (str): The name of the secret.
+            status (SyncStatus): The outcome.
+            action (str): What was or would be done, create or update. Defaults to "".
+            version (str | None): The version that was written. Defaults to None.
+            attempts (int): The number of requests made. Defaults to 0.
+            error (str): The error message if the sync failed. Defaults to "".
+        """
+
+        self.name = name
+        self.status = status
+        self.action = action
+        self.version = version
+        self.attempts = attempts
+        self.error = error
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert the result to a JSON serialisable dictionary.
+
+        Returns:
+            dict[str, Any]: The result.
+        """
+
+        return {
+            "name": self.name,
+            "status": self.status.value,
+            "action": self.action,
+            "version": self.version,
+            "attempts": self.attempts,
+            "error": self.error,
+        }
+
+
+class SecretSync:
+    """Writes the secrets whose values differ from a source through a bounded, throttle aware pipeline."""
+
+    def __init__(
+        self,
+        client: SecretBackend,
+        index: HashIndex,
+        concurrency: int = 8,
+        rate: float = 10,
+        attempts: int = 3,
+    ) -> None:
+        """Writes the secrets whose values differ from a source through a bounded, throttle aware pipeline.
+
+        Args:
+            client (SecretBackend): The client for the vault to sync into.
+            index (HashIndex): The digests of values already read, which are updated as values are read and written.
+            concurrency (int): The maximum number of secrets synced at once. Defaults to 8.
+            rate (float): The maximum number of reads and writes started per second. Defaults to 10.
+            attempts (int): The maximum number of attempts per request. Defaults to 3.
+        """
+
+        self.client = client
+        self.index = index
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.attempts = attempts
+
+    def _remember(self, properties: SecretProperties, digest: str) -> None:
+        updated_on = properties.updated_on.isoformat() if properties.updated_on else ""
+        entries = self.index.entries.setdefault(self.client.vault_name, {})
+        entries[properties.name or ""] = (updated_on, digest)
+
+    async def _current(self, properties: SecretProperties) -> tuple[str, int]:
+        updated_on = properties.updated_on.isoformat() if properties.updated_on else ""
+        entry = self.index.entries.get(self.client.vault_name, {}).get(
+            properties.name or ""
+        )
+        if entry and entry[0] == updated_on:
+            return entry[1], 0
+
+        value, attempts = await retry(
+            lambda: self.client.get_secret_value(properties.name or ""),
+            throttle_delay,
+            attempts=self.attempts,
+            limiter=self.limiter,
+        )
+        digest = hash_value(self.index.salt, value or "")
+        self._remember(properties, digest)
+        return digest, attempts
+
+    async def sync(
+        self,
+        name: str,
+        value: str,
+        properties: SecretProperties | None,
+        dry_run: bool = False,
+    ) -> SyncResult:
+        """Sync a single secret, only writing it if its value differs.
+
+        Args:
+            name (str): The name of the secret.
+            value (str): The value it should have.
+            properties (SecretProperties | None): The listed properties of the secret, or None if it does not exist.
+            dry_run (bool): Plan the write without making it. Defaults to False.
+
+        Returns:
+            SyncResult: The outcome.
+        """
+
+        digest = hash_value(self.index.salt, value)
+        action = "create"
+        attempts = 0
+
+        if properties is not None:
+            name = properties.name or name
+            action = "update"
+            # Writing a disabled secret would add an enabled version, which would quietly turn it back on.
+            if not properties.enabled:
+                return SyncResult(
+                    name, SyncStatus.FAILED, action, error="secret is disabled"
+                )
+
+            try:
+                current, attempts = await self._current(properties)
+            except Exception as e:
+                attempts = attempts_made(e)
+                return SyncResult(
+                    name, SyncStatus.FAILED, action, attempts=attempts, error=str(e)
+                )
+
+            if current == digest:
+                return SyncResult(name, SyncStatus.UNCHANGED, attempts=attempts)
+
+        if dry_run:
+            return SyncResult(name, SyncStatus.PLANNED, action, attempts=attempts)
+
+        try:
+            written, tries = await retry(
+                lambda: self.client.set_secret(name, value),
+                throttle_delay,
+                attempts=self.attempts,
+                limiter=self.limiter,
+            )
+        except Exception as e:
+            tries = attempts_made(e)
+            return SyncResult(
+                name, SyncStatus.FAILED, action, attempts=attempts + tries, error=str(e)
+            )
+
+        self._remember(written, digest)
+        status = SyncStatus.CREATED if properties is None else SyncStatus.UPDATED
+        return SyncResult(name, status, action, written.version, attempts + tries)
+
+    async def apply(
+        self,
+        values: Mapping[str, str],
+        existing: Mapping[str, SecretProperties],
+        dry_run: bool = False,
+    ) -> AsyncIterator[SyncResult]:
+        """Sync many secrets, yielding results as they complete.
+
+        Args:
+            values (Mapping[str, str]): The values the secrets should have, by name.
+            existing (Mapping[str, SecretProperties]): The listed properties of the secrets in the vault, by lower
+                case name.
+            dry_run (bool): Plan the writes without making them. Defaults to False.
+
+        Yields:
+            SyncResult: The outcome for each secret.
+        """
+
+        async def sync(item: tuple[str, str]) -> SyncResult:
+            name, value = item
+            return await self.sync(name, value, existing.get(name.lower()), dry_run)
+
+        async for result in map_bounded(sync, values.items(), limit=self.concurrency):
+            yield result
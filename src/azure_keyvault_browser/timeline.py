@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterable
+
+from azure.core.exceptions import AzureError
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend
+from .concurrency import map_bounded
+
+"""
+Point in time views of a vault, for answering which value each secret had at a given moment. Each version of a secret
+is current from when it was created until the next version was created, so the version histories of a vault give the
+intervals every version was current for. Key Vault does not record when a version was disabled or retagged, so a
+historical version is shown with the properties it has now, and secrets that have since been deleted are not listed.
+"""
+
+AS_OF_PREFIX = "@"
+
+
+def parse_as_of(text: str) -> datetime | None:
+    """Parse a moment typed in the browser, such as 2024-03-01 or 2024-03-01T14:30.
+
+    Args:
+        text (str): The moment, as ISO 8601. Times without a timezone are UTC. Empty or now means the present.
+
+    Returns:
+        datetime | None: The moment, or None for the present.
+
+    Raises:
+        ValueError: If the text is not a date.
+    """
+
+    text = text.strip()
+    if not text or text.lower() == "now":
+        return None
+
+    try:
+        when = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(
+            f'"{text}" is not a date. Use a date such as 2024-03-01 or 2024-03-01T14:30.'
+        ) from None
+    return when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+
+
+def became_current(properties: SecretProperties) -> float | None:
+    """When a version became the current version of its secret.
+
+    Args:
+        properties (SecretProperties): The version.
+
+    Returns:
+        float | None: The time in seconds since the epoch, or None if the service did not say.
+    """
+
+    when = properties.created_on or properties.updated_on
+    return when.timestamp() if when else None
+
+
+class SecretTimeline:
+    """The intervals each version of a secret was current for."""
+
+    def __init__(self, versions: Iterable[SecretProperties]) -> None:
+        """The intervals each version of a secret was current for.
+
+        Args:
+            versions (Iterable[SecretProperties]): The versions of the secret, in any order.
+        """
+
+        ordered = sorted(
+            ((became_current(x), x.version or "", x) for x in versions),
+            key=lambda x: (x[0] or 0.0, x[1]),
+        )
+        # A version is current from its start until the start of the next one.
+        self.starts = [x[0] for x in ordered if x[0] is not None]
+        self.versions = [x[2] for x in ordered if x[0] is not None]
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def at(self, when: datetime) -> SecretProperties | None:
+        """Find the version that was current at a moment.
+
+        Args:
+            when (datetime): The moment.
+
+        Returns:
+            SecretProperties | None: The version, or None if the secret did not exist yet.
+        """
+
+        position = bisect_right(self.starts, when.timestamp())
+        return self.versions[position - 1] if position else None
+
+
+class VaultTimeline:
+    """The version intervals of every secret in a vault, for showing the vault as it was at any moment."""
+
+    def __init__(self) -> None:
+        """The version intervals of every secret in a vault, for showing the vault as it was at any moment."""
+
+        self.secrets: dict[str, SecretTimeline] = {}
+
+    def __len__(self) -> int:
+        return len(self.secrets)
+
+    def add(self, name: str, versions: Iterable[SecretProperties]) -> None:
+        """Add or replace the history of a secret.
+
+        Args:
+            name (str): The name of the secret.
+            versions (Iterable[SecretProperties]): Its versions.
+        """
+
+        self.secrets[name] = SecretTimeline(versions)
+
+    def at(self, name: str, when: datetime) -> SecretProperties | None:
+        """Find the version of a secret that was current at a moment.
+
+        Args:
+            name (str): The name of the secret.
+            when (datetime): The moment.
+
+        Returns:
+            SecretProperties | None: The version, or None if the secret did not exist then or has no history.
+        """
+
+        timeline = self.secrets.get(name)
+        return timeline.at(when) if timeline is not None else None
+
+    def snapshot(self, when: datetime) -> list[SecretProperties]:
+        """Find the version of every secret that was current at a moment.
+
+        Args:
+            when (datetime): The moment.
+
+        Returns:
+            list[SecretProperties]: The current versions. Secrets created after the moment are left out.
+        """
+
+        found = (x.at(when) for x in self.secrets.values())
+        return [x for x in found if x is not None]
+
+    async def load(
+        self, client: SecretBackend, names: Iterable[str], concurrency: int = 8
+    ) -> AsyncIterator[str]:
+        """Fetch the version histories of secrets concurrently.
+
+        Secrets whose versions cannot be listed are left out of the timeline.
+
+        Args:
+            client (SecretBackend): The vault client.
+            names (Iterable[str]): The names of the secrets.
+            concurrency (int): The maximum number of listings in flight. Defaults to 8.
+
+        Yields:
+            str: The name of each secret whose history has been added, as they arrive.
+        """
+
+        async def fetch(name: str) -> tuple[str, list[SecretProperties] | None]:
+            try:
+                return name, [x async for x in client.iter_secret_versions(name)]
+            except AzureError:
+                return name, None
+
+        async for name, versions in map_bounded(fetch, names, concurrency):
+            if versions is not None:
+                self.add(name, versions)
+                yield name
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import re
+from typing import AbstractSet, Iterable, Iterator, Sequence
+
+from azure.keyvault.secrets import SecretProperties
+
+"""
+A prefix tree of secret names for browsing large vaults as a hierarchy. Names are split into segments on configurable
+delimiters, so payments--db--password and payments--api--key share the payments branch. Every node counts the secrets
+below it and is kept up to date as secrets are added and removed, so a change only touches the nodes on its path.
+
+Rows are produced by walking the expanded branches only, so a collapsed branch costs one row however many secrets it
+holds, and a filtered view only visits the branches that lead to a match.
+"""
+
+DEFAULT_DELIMITERS = ("--",)
+
+
+class TreeNode:
+    """A segment of the secret names in a tree, with the number of secrets below it."""
+
+    def __init__(self, label: str, path: str, parent: TreeNode | None = None) -> None:
+        """A segment of the secret names in a tree, with the number of secrets below it.
+
+        Args:
+            label (str): The segment, without the delimiter before it.
+            path (str): The names up to and including the segment.
+            parent (TreeNode | None): The node above this one, or None for the root. Defaults to None.
+        """
+
+        self.label = label
+        self.path = path
+        self.parent = parent
+        self.children: dict[str, TreeNode] = {}
+        self.secret: SecretProperties | None = None
+        self.count = 0
+        self.expanded = False
+        self._order: list[TreeNode] | None = None
+
+    def ordered_children(self) -> list[TreeNode]:
+        """The children of the node ordered by name. The order is cached until a child is added or removed.
+
+        Returns:
+            list[TreeNode]: The children.
+        """
+
+        if self._order is None:
+            self._order = sorted(
+                self.children.values(), key=lambda x: (x.label.lower(), x.label, x.path)
+            )
+        return self._order
+
+    def names(self) -> Iterator[str]:
+        """The names of the secrets in the subtree below and including this node.
+
+        Yields:
+            str: Each name.
+        """
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.secret is not None and node.secret.name:
+                yield node.secret.name
+            stack.extend(node.children.values())
+
+
+class TreeRow:
+    """A visible node of a tree, with its depth and the number of secrets it shows."""
+
+    def __init__(
+        self,
+        node: TreeNode,
+        depth: int,
+        count: int,
+        secret: SecretProperties | None = None,
+    ) -> None:
+        """A visible node of a tree, with its depth and the number of secrets it shows.
+
+        Args:
+            node (TreeNode): The node.
+            depth (int): The number of branches above it.
+            count (int): The number of secrets below it, or the number that match the filter.
+            secret (SecretProperties | None): The secret the node is, unless it is only a branch or the secret does
+                not match the filter. Defaults to None.
+        """
+
+        self.node = node
+        self.depth = depth
+        self.count = count
+        self.secret = secret
+
+
+class SecretTree:
+    """A prefix tree of secret names, split on delimiters, that is updated incrementally."""
+
+    def __init__(self, delimiters: Sequence[str] = DEFAULT_DELIMITERS) -> None:
+        """A prefix tree of secret names, split on delimiters, that is updated incrementally.
+
+        Args:
+            delimiters (Sequence[str]): The strings that separate the segments of a name. Defaults to ("--",).
+        """
+
+        # The longest delimiter wins, so a--b is split on -- rather than twice on -.
+        delimiters = sorted({x for x in delimiters if x}, key=len, reverse=True)
+        self.pattern = (
+            re.compile("|".join(re.escape(x) for x in delimiters))
+            if delimiters
+            else None
+        )
+        self.root = TreeNode("", "")
+        self.nodes: dict[str, TreeNode] = {}
+        self.leaves: dict[str, TreeNode] = {}
+
+    def __len__(self) -> int:
+        return self.root.count
+
+    def segments(self, name: str) -> list[tuple[str, str]]:
+        """Split a name into segments.
+
+        Args:
+            name (str): The name of a secret.
+
+        Returns:
+            list[tuple[str, str]]: Each segment and the name up to the end of it. The last one ends with the name.
+        """
+
+        if self.pattern is None:
+            return [(name, name)]
+
+        segments = []
+        start = 0
+        for match in self.pattern.finditer(name):
+            segments.append((name[start : match.start()], name[: match.start()]))
+            start = match.end()
+        segments.append((name[start:], name))
+
+        return segments
+
+    def build(self, items: Iterable[SecretProperties]) -> None:
+        """Build the tree from scratch. Branches that were expanded stay expanded if they still exist.
+
+        Args:
+            items (Iterable[SecretProperties]): The secrets.
+        """
+
+        expanded = {k for k, v in self.nodes.items() if v.expanded}
+        self.root = TreeNode("", "")
+        self.nodes = {}
+        self.leaves = {}
+
+        for properties in items:
+            self.add(properties)
+
+        for path in expanded:
+            node = self.nodes.get(path)
+            if node is not None:
+                node.expanded = True
+
+    def add(self, properties: SecretProperties) -> None:
+        """Add a secret, or replace the properties of one that is already in the tree.
+
+        Args:
+            properties (SecretProperties): The secret.
+        """
+
+        name = properties.name
+        if not name:
+            return
+
+        leaf = self.leaves.get(name.lower())
+        if leaf is not None:
+            leaf.secret = properties
+            return
+
+        node = self.root
+        node.count += 1
+        for label, path in self.segments(name):
+            # The path rather than the label is the key, so a--b and a.b are different branches.
+            child = node.children.get(path.lower())
+            if child is None:
+                child = TreeNode(label, path, node)
+                node.children[path.lower()] = child
+                node._order = None
+                self.nodes[path.lower()] = child
+            child.count += 1
+            node = child
+
+        node.secret = properties
+        self.leaves[name.lower()] = node
+
+    def remove(self, name: str) -> None:
+        """Remove a secret. Branches left without secrets are removed with it.
+
+        Args:
+            name (str): The name of the secret.
+        """
+
+        node: TreeNode | None = self.leaves.pop(name.lower(), None)
+        if node is None:
+            return
+
+        node.secret = None
+        while node is not None:
+            node.count -= 1
+            parent = node.parent
+            if parent is not None and node.count == 0:
+                del parent.children[node.path.lower()]
+                parent._order = None
+                self.nodes.pop(node.path.lower(), None)
+            node = parent
+
+    def find(self, path: str) -> TreeNode | None:
+        """Find a node by the names up to and including its segment.
+
+        Args:
+            path (str): The path of the node, such as payments--db.
+
+        Returns:
+            TreeNode | None: The node, or None if there is no such branch.
+        """
+
+        return self.nodes.get(path.lower())
+
+    def rows(
+        self, matches: AbstractSet[str] | None = None, reverse: bool = False
+    ) -> list[TreeRow]:
+        """List the visible rows, descending only into expanded branches.
+
+        Args:
+            matches (AbstractSet[str] | None): The names of the secrets that match a filter, or None to show every
+                secret. Defaults to None.
+            reverse (bool): Order siblings in reverse. Defaults to False.
+
+        Returns:
+            list[TreeRow]: The rows, in display order.
+        """
+
+        counts: dict[int, int] | None = None
+        if matches is not None:
+            # Count the matches under each branch by walking up from them, so branches without a match are never
+            # visited.
+            counts = {}
+            for name in matches:
+                node: TreeNode | None = self.leaves.get(name.lower())
+                while node is not None:
+                    counts[id(node)] = counts.get(id(node), 0) + 1
+                    node = node.parent
+
+        rows: list[TreeRow] = []
+
+        def visit(node: TreeNode, depth: int) -> None:
+            children = node.ordered_children()
+            for child in reversed(children) if reverse else children:
+                count = child.count if counts is None else counts.get(id(child), 0)
+                if not count:
+                    continue
+                secret = child.secret
+                if (
+                    matches is not None
+                    and secret is not None
+                    and secret.name not in matches
+                ):
+                    secret = None
+                rows.append(TreeRow(child, depth, count, secret))
+                if child.expanded:
+                    visit(child, depth + 1)
+
+        visit(self.root, 0)
+        return rows
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import base64
+import os
+import sqlite3
+import time
+from datetime import timedelta
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+from .config import CACHE_PATH, CACHE_SALT_PATH
+from .duplicates import get_salt
+
+"""
+An opt-in cache of viewed secret values so that they can be shown when the network or the az login is unavailable.
+Values are encrypted with AES-GCM before they touch the disk, using a key held in the OS keyring or derived from a
+passphrase, so the cache file is useless to anyone but the local user. The vault, name and version are bound to each
+ciphertext so rows cannot be swapped.
+"""
+
+KEYRING_SERVICE = "azure-keyvault-browser"
+KEYRING_USERNAME = "value-cache"
+PASSPHRASE_ENV = "AZURE_KEYVAULT_BROWSER_CACHE_PASSPHRASE"
+NONCE_SIZE = 12
+
+
+class CacheKeyException(Exception):
+    """Exception raised when no key is available to encrypt the cache."""
+
+    pass
+
+
+def derive_key(passphrase: str, salt: bytes) -> bytes:
+    """Derive a cache key from a passphrase.
+
+    Args:
+        passphrase (str): The passphrase.
+        salt (bytes): A salt unique to this machine.
+
+    Returns:
+        bytes: A 256 bit key.
+    """
+
+    return Scrypt(salt=salt, length=32, n=2**15, r=8, p=1).derive(passphrase.encode())
+
+
+def get_cache_key() -> bytes:
+    """Retrieve the key used to encrypt the cache.
+
+    A passphrase in the AZURE_KEYVAULT_BROWSER_CACHE_PASSPHRASE environment variable takes precedence. Otherwise a
+    random key is kept in the OS keyring, which requires the optional keyring package.
+
+    Returns:
+        bytes: A 256 bit key.
+
+    Raises:
+        CacheKeyException: If neither a passphrase nor a keyring is available.
+    """
+
+    passphrase = os.getenv(PASSPHRASE_ENV)
+    if passphrase:
+        return derive_key(passphrase, get_salt(CACHE_SALT_PATH))
+
+    try:
+        import keyring
+        from keyring.errors import KeyringError
+    except ImportError:
+        raise CacheKeyException(
+            f"Install the keyring extra or set {PASSPHRASE_ENV} to use the value cache."
+        )
+
+    try:
+        encoded = keyring.get_password(KEYRING_SERVICE, KEYRING_USERNAME)
+        if encoded is None:
+            encoded = base64.b64encode(AESGCM.generate_key(bit_length=256)).decode()
+            keyring.set_password(KEYRING_SERVICE, KEYRING_USERNAME, encoded)
+    except KeyringError as e:
+        raise CacheKeyException(f"The OS keyring is not available: {e}")
+
+    return base64.b64decode(encoded)
+
+
+class ValueCache:
+    """An encrypted, size and age limited cache of secret values."""
+
+    def __init__(
+        self,
+        key: bytes,
+        path: str = CACHE_PATH,
+        ttl: timedelta = timedelta(hours=24),
+        max_entries: int = 500,
+        max_value_size: int = 32768,
+    ) -> None:
+        """An encrypted, size and age limited cache of secret values.
+
+        Args:
+            key (bytes): A 256 bit key.
+            path (str): The path of the cache database. Defaults to CACHE_PATH.
+            ttl (timedelta): How long a value is kept after it was fetched. Defaults to 24 hours.
+            max_entries (int): The number of values kept. The least recently viewed are evicted first. Defaults to 500.
+            max_value_size (int): Values longer than this are never cached. Defaults to 32768.
+        """
+
+        self.aead = AESGCM(key)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_value_size = max_value_size
+        self._db: sqlite3.Connection | None = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """The cache database, created with owner only permissions on first use.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+            os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "vault TEXT, name TEXT, version TEXT, value BLOB, stored_at REAL, accessed_at REAL, "
+                "PRIMARY KEY (vault, name, version))"
+            )
+            self.expire()
+
+        return self._db
+
+    def _associated_data(self, vault: str, name: str, version: str) -> bytes:
+        return f"{vault}/{name}/{version}".encode()
+
+    def get(self, vault: str, name: str, version: str) -> str | None:
+        """Get a cached value.
+
+        Args:
+            vault (str): The name of the vault.
+            name (str): The name of the secret.
+            version (str): The version of the secret.
+
+        Returns:
+            str | None: The value, or None if it is not cached, has expired or was encrypted with another key.
+        """
+
+        now = time.time()
+        row = self.db.execute(
+            "SELECT value FROM entries WHERE vault = ? AND name = ? AND version = ? AND stored_at > ?",
+            (vault, name, version, now - self.ttl.total_seconds()),
+        ).fetchone()
+        if row is None:
+            return None
+
+        blob: bytes = row[0]
+        try:
+            value = self.aead.decrypt(
+                blob[:NONCE_SIZE],
+                blob[NONCE_SIZE:],
+                self._associated_data(vault, name, version),
+            )
+        except InvalidTag:
+            return None
+
+        with self.db:
+            self.db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE vault = ? AND name = ? AND version = ?",
+                (now, vault, name, version),
+            )
+
+        return value.decode()
+
+    def put(self, vault: str, name: str, version: str, value: str) -> None:
+        """Encrypt and cache a value.
+
+        Args:
+            vault (str): The name of the vault.
+            name (str): The name of the secret.
+            version (str): The version of the secret.
+            value (str): The value.
+        """
+
+        if len(value) > self.max_value_size:
+            return
+
+        nonce = os.urandom(NONCE_SIZE)
+        blob = nonce + self.aead.encrypt(
+            nonce, value.encode(), self._associated_data(vault, name, version)
+        )
+
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (vault, name, version, blob, now, now),
+            )
+            self.db.execute(
+                "DELETE FROM entries WHERE rowid NOT IN "
+                "(SELECT rowid FROM entries ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def expire(self) -> int:
+        """Delete values that have outlived the TTL.
+
+        Returns:
+            int: The number of values deleted.
+        """
+
+        with self.db:
+            cursor = self.db.execute(
+                "DELETE FROM entries WHERE stored_at <= ?",
+                (time.time() - self.ttl.total_seconds(),),
+            )
+        return cursor.rowcount
+
+    def wipe(self) -> None:
+        """Delete every cached value along with the database file."""
+
+        self.close()
+        wipe_cache(self.path)
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the cache database."""
+
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def wipe_cache(path: str = CACHE_PATH) -> bool:
+    """Delete the cache database. No key is needed.
+
+    Args:
+        path (str): The path of the cache database. Defaults to CACHE_PATH.
+
+    Returns:
+        bool: True if there was a cache to delete.
+    """
+
+    removed = False
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+            removed = True
+    return removed
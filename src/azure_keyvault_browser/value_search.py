@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable
+
+from azure.core.exceptions import AzureError
+from azure.keyvault.secrets import SecretProperties
+
+from .azure import SecretBackend
+from .concurrency import RateLimiter, map_bounded
+
+"""
+Opt-in full text search over secret values. Values are held in memory only, are never written to INDEX_DIR and
+are wiped when the app exits.
+"""
+
+VALUE_SEARCH_PREFIX = "="
+
+
+class ValueIndex:
+    """An in-memory trigram index over secret values."""
+
+    ngram_size = 3
+
+    def __init__(self, max_value_size: int = 32768) -> None:
+        """An in-memory trigram index over secret values.
+
+        Args:
+            max_value_size (int): Values longer than this are not indexed. Defaults to 32768.
+        """
+
+        self.max_value_size = max_value_size
+        self._values: dict[str, str] = {}
+        self._postings: dict[str, set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _ngrams(self, value: str) -> set[str]:
+        size = self.ngram_size
+        return {value[i : i + size] for i in range(len(value) - size + 1)}
+
+    def add(self, name: str, value: str) -> None:
+        """Add or replace the value of a secret.
+
+        Args:
+            name (str): The name of the secret.
+            value (str): The value of the secret.
+        """
+
+        self.remove(name)
+        if not value or len(value) > self.max_value_size:
+            return
+
+        value = value.lower()
+        self._values[name] = value
+        for ngram in self._ngrams(value):
+            self._postings[ngram].add(name)
+
+    def remove(self, name: str) -> None:
+        """Remove the value of a secret.
+
+        Args:
+            name (str): The name of the secret.
+        """
+
+        value = self._values.pop(name, None)
+        if value is None:
+            return
+
+        for ngram in self._ngrams(value):
+            names = self._postings[ngram]
+            names.discard(name)
+            if not names:
+                del self._postings[ngram]
+
+    def search(self, query: str) -> list[str]:
+        """Find secrets whose value contains the query, ignoring case.
+
+        Args:
+            query (str): The substring to search for.
+
+        Returns:
+            list[str]: The names of matching secrets.
+        """
+
+        query = query.lower()
+        if not query:
+            return []
+
+        if len(query) < self.ngram_size:
+            candidates: Iterable[str] = self._values
+        else:
+            postings = sorted(
+                (self._postings.get(x, set()) for x in self._ngrams(query)), key=len
+            )
+            candidates = set.intersection(*postings)
+
+        return sorted(x for x in candidates if query in self._values[x])
+
+    def wipe(self) -> None:
+        """Drop every value held by the index."""
+
+        self._values.clear()
+        self._postings.clear()
+
+    async def build(
+        self,
+        client: SecretBackend,
+        items: Iterable[SecretProperties],
+        rate: float = 10,
+        concurrency: int = 8,
+    ) -> int:
+        """Fetch the latest value of each enabled secret and index it.
+
+        Args:
+            client (SecretBackend): The client for the vault the secrets belong to.
+            items (Iterable[SecretProperties]): The secrets to fetch.
+            rate (float): The maximum number of values fetched per second. Defaults to 10.
+            concurrency (int): The maximum number of fetches in flight. Defaults to 8.
+
+        Returns:
+            int: The number of values indexed.
+        """
+
+        limiter = RateLimiter(rate)
+
+        async def fetch(name: str) -> tuple[str, str | None]:
+            async with limiter:
+                try:
+                    return name, await client.get_secret_value(name)
+                except AzureError:
+                    return name, None
+
+        names = [x.name for x in items if x.name and x.enabled]
+        async for name, value in map_bounded(fetch, names, limit=concurrency):
+            if value is not None:
+                self.add(name, value)
+
+        return len(self)
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Generic, Sequence, TypeVar
+
+from azure.keyvault.secrets import SecretProperties
+
+from .tree import TreeRow
+from .util import format_datetime
+
+"""
+View models sit between the data returned by Key Vault and the renderables. Display cells are
+formatted once per dataset and cached so that renderables only ever slice precomputed rows.
+"""
+
+T = TypeVar("T")
+
+
+def format_optional_datetime(dt: Any) -> str:
+    """Format an optional datetime object to a string.
+
+    Args:
+        dt (Any): The datetime object to format or None.
+
+    Returns:
+        str: The formatted datetime or an empty string.
+    """
+
+    return format_datetime(dt) if dt else ""
+
+
+class LazyItems(Sequence[SecretProperties]):
+    """Resolves a sequence of names to secret properties as items are requested."""
+
+    def __init__(
+        self, names: Sequence[str], resolve: Callable[[str], SecretProperties]
+    ) -> None:
+        """Resolves a sequence of names to secret properties as items are requested.
+
+        Args:
+            names (Sequence[str]): The names, which may themselves be fetched lazily.
+            resolve (Callable[[str], SecretProperties]): Looks up the properties for a name.
+        """
+
+        self.names = names
+        self.resolve = resolve
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self.resolve(x) for x in self.names[index]]
+        return self.resolve(self.names[index])
+
+
+class TableViewModel(ABC, Generic[T]):
+    """A lazily populated cache of formatted table rows. The cache is dropped when the items grow or shrink."""
+
+    def __init__(self, items: Sequence[T]) -> None:
+        """A lazily populated cache of formatted table rows.
+
+        Args:
+            items (Sequence[T]): The items backing the table.
+        """
+
+        self.items = items
+        self._rows: list[tuple[str, ...] | None] = [None] * len(items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @abstractmethod
+    def format_row(self, item: T) -> tuple[str, ...]:
+        pass
+
+    def rows(self, start_index: int, end_index: int) -> list[tuple[str, ...]]:
+        """Get formatted rows, formatting any that have not been seen before.
+
+        Args:
+            start_index (int): The starting index.
+            end_index (int): The ending index.
+
+        Returns:
+            list[tuple[str, ...]]: The formatted rows.
+        """
+
+        if len(self._rows) != len(self.items):
+            # The items are still arriving, and new ones can land anywhere in the order, so the cache is stale.
+            self._rows = [None] * len(self.items)
+
+        start_index = max(start_index, 0)
+        end_index = min(end_index, len(self.items))
+        for index in range(start_index, end_index):
+            if self._rows[index] is None:
+                self._rows[index] = self.format_row(self.items[index])
+
+        return self._rows[start_index:end_index]  # type: ignore
+
+
+class SecretsTableViewModel(TableViewModel[SecretProperties]):
+    """Rows for the secrets table."""
+
+    def __init__(
+        self,
+        items: Sequence[SecretProperties],
+        date_field: str = "updated_on",
+        date_label: str = "last updated",
+    ) -> None:
+        """Rows for the secrets table.
+
+        Args:
+            items (Sequence[SecretProperties]): The secrets backing the table.
+            date_field (str): The date property shown in the second column. Defaults to "updated_on".
+            date_label (str): The heading of the second column. Defaults to "last updated".
+        """
+
+        super().__init__(items)
+        self.date_field = date_field
+        self.date_label = date_label
+
+    def format_row(self, item: SecretProperties) -> tuple[str, ...]:
+        """Format a secret as a table row.
+
+        Args:
+            item (SecretProperties): The secret to format.
+
+        Returns:
+            tuple[str, ...]: The name and date cells.
+        """
+
+        date = getattr(item, self.date_field)
+        return (item.name or "", format_optional_datetime(date))
+
+
+class SecretsTreeViewModel(TableViewModel[TreeRow]):
+    """Rows for the secrets tree."""
+
+    def __init__(
+        self,
+        items: Sequence[TreeRow],
+        date_field: str = "updated_on",
+        date_label: str = "last updated",
+    ) -> None:
+        """Rows for the secrets tree.
+
+        Args:
+            items (Sequence[TreeRow]): The visible nodes of the tree.
+            date_field (str): The date property shown for secrets in the second column. Defaults to "updated_on".
+            date_label (str): The heading of the second column. Defaults to "last updated".
+        """
+
+        super().__init__(items)
+        self.date_field = date_field
+        self.date_label = date_label
+
+    def format_row(self, item: TreeRow) -> tuple[str, ...]:
+        """Format a node as a table row.
+
+        Args:
+            item (TreeRow): The node to format.
+
+        Returns:
+            tuple[str, ...]: The path of the node, the name of its secret, and the name and date cells. Branches are
+                marked as expanded or collapsed and show how many secrets they hold.
+        """
+
+        node = item.node
+        secret = item.secret
+        if node.children:
+            marker = "▾" if node.expanded else "▸"
+            label = f"{marker} {node.label} ({item.count})"
+        else:
+            label = f"  {node.label}"
+
+        if secret is None:
+            return (node.path, "", "  " * item.depth + label, "")
+
+        date = getattr(secret, self.date_field)
+        return (
+            node.path,
+            secret.name or "",
+            "  " * item.depth + label,
+            format_optional_datetime(date),
+        )
+
+
+class SecretVersionsTableViewModel(TableViewModel[SecretProperties]):
+    """Rows for the secret versions table."""
+
+    def format_row(self, item: SecretProperties) -> tuple[str, ...]:
+        """Format a secret version as a table row.
+
+        Args:
+            item (SecretProperties): The secret version to format.
+
+        Returns:
+            tuple[str, ...]: The version and created on cells.
+        """
+
+        return (item.version or "", format_optional_datetime(item.created_on))
+
+
+class SecretPropertiesViewModel:
+    """Formatted properties of a single secret version."""
+
+    def __init__(self, properties: SecretProperties) -> None:
+        """Formatted properties of a single secret version.
+
+        Args:
+            properties (SecretProperties): The secret version to format.
+        """
+
+        self.title = f"{properties.name} @ {properties.version}"
+        self.properties: dict[str, str] = {
+            "created on": format_optional_datetime(properties.created_on),
+            "updated on": format_optional_datetime(properties.updated_on),
+            "expires on": format_optional_datetime(properties.expires_on),
+            "not before": format_optional_datetime(properties.not_before),
+            "content type": properties.content_type or "",
+            "enabled": str(properties.enabled) if properties.enabled else "",
+            "key id": properties.key_id or "",
+            "recoverable days": (
+                str(properties.recoverable_days) if properties.recoverable_days else ""
+            ),
+            "recovery level": properties.recovery_level or "",
+            "tags": str(properties.tags) if properties.tags else "",
+        }
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Callable
+
+"""
+A debug aid that finds what blocks the event loop. A heartbeat scheduled on the loop measures how late it runs, while
+a thread watches for the heartbeat going quiet and captures the stack of the loop thread as it is blocked. Stalls are
+logged with their stack and totalled per call site so that the worst offenders stand out.
+"""
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def call_site(stack: traceback.StackSummary, package: str = PACKAGE_DIR) -> str:
+    """Name the call site responsible for a stack.
+
+    The innermost frame in the package is the code that made the blocking call, and the innermost frame overall is
+    what was running when the stack was captured.
+
+    Args:
+        stack (traceback.StackSummary): The stack, outermost frame first.
+        package (str): The directory of the package. Defaults to the directory of this package.
+
+    Returns:
+        str: The call site.
+    """
+
+    if not stack:
+        return "unknown"
+
+    innermost = stack[-1]
+    for frame in reversed(stack):
+        if frame.filename.startswith(package):
+            site = f"{os.path.relpath(frame.filename, package)}:{frame.lineno} in {frame.name}"
+            if frame is not innermost:
+                site += f" -> {innermost.name}"
+            return site
+
+    return f"{innermost.filename}:{innermost.lineno} in {innermost.name}"
+
+
+class StallTotals:
+    """The number and duration of the stalls seen at a call site."""
+
+    def __init__(self) -> None:
+        """The number and duration of the stalls seen at a call site."""
+
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record a stall.
+
+        Args:
+            seconds (float): How long the loop was blocked for.
+        """
+
+        self.count += 1
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+
+
+class LoopWatchdog:
+    """Samples event loop lag and captures the stacks of calls that block it."""
+
+    def __init__(
+        self,
+        log: Callable[[str], None],
+        threshold: float = 0.1,
+        interval: float = 0.05,
+        depth: int = 12,
+    ) -> None:
+        """Samples event loop lag and captures the stacks of calls that block it.
+
+        Args:
+            log (Callable[[str], None]): Writes a message to the debug log. Only called from the event loop.
+            threshold (float): A heartbeat this many seconds late is reported as a stall. Defaults to 0.1.
+            interval (float): The number of seconds between heartbeats. Defaults to 0.05.
+            depth (int): The number of frames of each stack that are logged. Defaults to 12.
+        """
+
+        self.log = log
+        self.threshold = threshold
+        self.interval = interval
+        self.depth = depth
+        self.sites: dict[str, StallTotals] = {}
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._thread_id = 0
+        self._last_beat = 0.0
+        self._expected = 0.0
+        # The stack captured during a stall, along with the heartbeat that the stall followed.
+        self._captured: tuple[float, traceback.StackSummary] | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start watching the running event loop. Must be called from the loop."""
+
+        self._loop = asyncio.get_event_loop()
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._schedule(self._last_beat)
+
+        thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        thread.start()
+
+    def stop(self) -> None:
+        """Stop watching and log the totals."""
+
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self.log(self.summary())
+
+    def _schedule(self, now: float) -> None:
+        assert self._loop is not None
+        self._expected = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _beat(self) -> None:
+        now = time.monotonic()
+        lag = max(0.0, now - self._expected)
+
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+        if lag >= self.threshold:
+            self._report(lag)
+
+        self._last_beat = now
+        self._schedule(now)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval / 2):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            captured = self._captured
+            if stalled < self.threshold / 2 or (captured and captured[0] == last_beat):
+                continue
+
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._captured = (last_beat, traceback.extract_stack(frame))
+
+    def _report(self, lag: float) -> None:
+        captured = self._captured
+        if captured and captured[0] == self._last_beat:
+            stack = captured[1]
+        else:
+            stack = traceback.StackSummary()
+        site = call_site(stack)
+        self.sites.setdefault(site, StallTotals()).add(lag)
+
+        frames = "".join(traceback.format_list(stack[-self.depth :]))
+        self.log(f"Event loop blocked for {lag * 1000:.0f}ms at {site}\n{frames}")
+
+    def summary(self) -> str:
+        """Summarise the lag sampled and the stalls seen at each call site.
+
+        Returns:
+            str: The summary, with the call sites that blocked the longest first.
+        """
+
+        mean = self.total_lag / self.samples if self.samples else 0.0
+        lines = [
+            f"Event loop lag: {self.samples} samples, mean {mean * 1000:.1f}ms, max {self.max_lag * 1000:.0f}ms"
+        ]
+        for site, totals in sorted(self.sites.items(), key=lambda x: -x[1].total):
+            lines.append(
+                f"  {totals.count} stalls, {totals.total:.2f}s total, "
+                f"longest {totals.longest * 1000:.0f}ms at {site}"
+            )
+
+        return "\n".join(lines)
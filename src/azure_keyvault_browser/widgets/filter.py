@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import string
-from typing import Any
-
-from azure.keyvault.secrets import SecretProperties
+from functools import partial
+from typing import Any, Sequence
 
 # from fast_autocomplete import AutoComplete
 from rich.console import RenderableType
@@ -18,7 +19,9 @@ from textual.widget import Widget
 from textual_inputs.events import InputOnChange, InputOnFocus
 
 from .. import styles
-from ..search import Search
+from ..search import REBUILD_THRESHOLD, AnalyzerProfile, Search
+from ..timeline import AS_OF_PREFIX, parse_as_of
+from ..value_search import VALUE_SEARCH_PREFIX
 from .flash import FlashMessageType, ShowFlashNotification
 
 
@@ -90,7 +93,11 @@ class FilterWidget(Widget):
         self.has_password = False
         self._cursor_position = len(self.value)
 
-        self.search_engine: Search = Search()
+        self.search_engine: Search = Search(
+            profile=AnalyzerProfile(self.app.config.get("search_profile", "ngram"))
+        )
+        self.index_lock: asyncio.Lock | None = None
+        self.generation = 0
 
     def __rich_repr__(self):
         yield "name", self.name
@@ -114,7 +121,13 @@ class FilterWidget(Widget):
 
     async def on_mount(self) -> None:
         """Actions that are executed when the widget is mounted."""
-        watch(self.app, "searchable_nodes", self.index)
+        self.index_lock = asyncio.Lock()
+
+        daemon = self.app.daemon
+        if daemon is not None and daemon.index_path:
+            self.search_engine.open(daemon.index_path)
+
+        watch(self.app, "dataset_generation", self.index)
 
     def render(self) -> RenderableType:
         """Render the widget.
@@ -275,7 +288,10 @@ class FilterWidget(Widget):
 
         elif event.key == Keys.Enter:
 
-            if len(self.value) == 0:
+            if self.value.startswith(AS_OF_PREFIX):
+                await self.travel(self.value[len(AS_OF_PREFIX) :])
+
+            elif len(self.value) == 0:
                 await self.post_message_from_child(
                     ShowFlashNotification(
                         self,
@@ -333,20 +349,98 @@ class FilterWidget(Widget):
 
         self.valid = valid
 
-    async def index(self, nodes: list[SecretProperties]) -> None:
-        """Create an index from a list of searchable nodes.
+    async def index(self, generation: int) -> None:
+        """Keep the index in step with the listed secrets.
+
+        Only the secrets added or removed since the last generation indexed are written. The index is rebuilt when
+        the dataset has been replaced or too much has changed. An index opened from the daemon is kept up to date by
+        the daemon, so the search is just run again.
 
         Args:
-            nodes (list[SecretProperties]): A list of secret properties.
+            generation (int): The generation of the dataset.
         """
 
-        if len(nodes) == 0:
-            self.log("Nothing to index yet")
-            return
+        assert self.index_lock is not None
+
+        async with self.index_lock:
+            dataset = self.app.dataset
+            changes = dataset.changes_since(self.generation)
+            if changes is not None and not changes:
+                return
+
+            generation = dataset.generation
+            if self.search_engine.readonly:
+                self.generation = generation
+                if len(self.value) > 1:
+                    await self.search(search_string=self.value)
+                return
 
-        words = [x.name.lower() for x in nodes]
-        self.search_engine.index = words
-        self.log(f"{len(words)} searchable nodes have been indexed")
+            loop = asyncio.get_event_loop()
+            # Callbacks scheduled from the worker thread would otherwise run without the app's context variables.
+            context = contextvars.copy_context()
+
+            def progress(done: int, total: int) -> None:
+                loop.call_soon_threadsafe(
+                    self.show_progress, done, total, context=context
+                )
+
+            if (
+                changes is None
+                or not self.search_engine.index
+                or len(changes) >= REBUILD_THRESHOLD
+            ):
+                words = list(dataset)
+                if len(words) == 0:
+                    self.log("Nothing to index yet")
+                    self.generation = generation
+                    return
+
+                work = partial(self.search_engine.build, words, progress=progress)
+            else:
+                words = [*changes.added.values(), *changes.updated.values()]
+                work = partial(
+                    self.search_engine.update,
+                    added=words,
+                    removed=list(changes.removed),
+                )
+
+            try:
+                await loop.run_in_executor(None, work)
+            except Exception as e:
+                self.log(f"Failed to index searchable nodes: {e}")
+                await self.post_message_from_child(
+                    ShowFlashNotification(
+                        self,
+                        type=FlashMessageType.ERROR,
+                        value="Failed to build the search index.",
+                    )
+                )
+            else:
+                self.generation = generation
+                self.log(f"{len(words)} searchable nodes have been indexed")
+            finally:
+                self.show_progress()
+
+            if len(self.value) > 1:
+                await self.search(search_string=self.value)
+
+    def show_progress(self, done: int = 0, total: int = 0) -> None:
+        """Show the progress of indexing in the title of the widget.
+
+        Args:
+            done (int): The number of nodes indexed so far. Defaults to 0.
+            total (int): The total number of nodes. Defaults to 0, which clears the progress.
+        """
+
+        if not total:
+            status = ""
+        elif done < total:
+            status = f" · indexing {done * 100 // total}%"
+        else:
+            status = " · merging index"
+
+        self.title = f"🔍 [{styles.GREY}]filter{status}[/]"
+        self.app.frames.request(self)
 
     async def search(self, search_string: str) -> None:
         """Search for a string.
@@ -355,15 +449,51 @@ class FilterWidget(Widget):
             search_string (str): The string to search for.
         """
 
-        if not self.search_engine.index:
+        if search_string.startswith(AS_OF_PREFIX):
+            # A moment to travel to, which is only read when enter is pressed.
+            await self.toggle_field_status(valid=True)
             return
 
-        result = self.search_engine.search(search_string)
+        result: Sequence[str]
+        value_index = self.app.value_index
+        if search_string.startswith(VALUE_SEARCH_PREFIX) and value_index is not None:
+            query = search_string[len(VALUE_SEARCH_PREFIX) :]
+            result = [x.lower() for x in value_index.search(query)] if query else []
+
+        elif not self.search_engine.index:
+            return
+
+        else:
+            result = self.search_engine.cursor(search_string)
+            if len(result) == 0:
+                result.close()
+
         self.app.search_result = result if len(result) > 0 else ["none"]
         await self.toggle_field_status(valid=(len(result) > 0))
 
+    async def travel(self, text: str) -> None:
+        """Show the vault as it was at the moment typed after the prefix.
+
+        Args:
+            text (str): The moment, such as 2024-03-01T14:30, or now for the present.
+        """
+
+        try:
+            when = parse_as_of(text)
+        except ValueError as e:
+            await self.toggle_field_status(valid=False)
+            await self.post_message_from_child(
+                ShowFlashNotification(self, type=FlashMessageType.ERROR, value=str(e))
+            )
+            return
+
+        self._cursor_position = 0
+        await self.clear()
+        self.app.time_travel(when)
+
     async def clear(self) -> None:
         """Clear the search field."""
 
         self.value = ""
-        self.refresh(layout=True)
+        self.app.search_result = []
+        self.app.frames.request(self, layout=True)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import click
+from azure.core.exceptions import AzureError
 from rich.console import RenderableType
 from rich.panel import Panel
 from rich.style import Style
@@ -10,8 +11,9 @@ from textual.reactive import Reactive, watch
 from textual.widget import Widget
 
 from .. import styles
-from ..azure import KeyVault, SecretProperties
+from ..azure import SecretBackend, SecretProperties
 from ..renderables import SecretPropertiesRenderable
+from ..viewmodels import SecretPropertiesViewModel
 from .flash import FlashMessageType, ShowFlashNotification
 
 
@@ -26,10 +28,11 @@ class SecretPropertiesWidget(Widget):
         name = self.__class__.__name__
         super().__init__(name=name)
         self.selected_version: SecretProperties | None = None
+        self.view_model: SecretPropertiesViewModel | None = None
         self.renderable: SecretPropertiesRenderable | None = None
         self.value: str = ""
         self.reveal_secret_value: bool = False
-        self.client: KeyVault = self.app.client
+        self.client: SecretBackend = self.app.client
 
     async def on_mount(self) -> None:
         """Actions that are executed when the widget is mounted."""
@@ -51,8 +54,9 @@ class SecretPropertiesWidget(Widget):
         """Clears the widget."""
 
         self.selected_version = None
+        self.view_model = None
         self.renderable = None
-        self.refresh(layout=True)
+        self.app.frames.request(self, layout=True)
 
     async def update(self, selected_version: SecretProperties) -> None:
         """Updates the widget with new secret properties.
@@ -63,12 +67,49 @@ class SecretPropertiesWidget(Widget):
 
         if selected_version:
             self.selected_version = selected_version
-            self.value = await self.client.get_secret_value(
-                self.selected_version.name, selected_version.version
-            )
+            self.view_model = SecretPropertiesViewModel(selected_version)
+            self.value = await self.fetch_value(selected_version)
             await self.app.set_focus(self)
 
-        self.refresh(layout=True)
+        self.app.frames.request(self, layout=True)
+
+    async def fetch_value(self, properties: SecretProperties) -> str:
+        """Fetch the value of a secret version, serving it from the value cache when present.
+
+        Args:
+            properties (SecretProperties): The secret version.
+
+        Returns:
+            str: The value, or an empty string if it could not be fetched.
+        """
+
+        cache = self.app.value_cache
+        vault = self.client.vault_name
+        name = properties.name or ""
+        version = properties.version or ""
+
+        if cache is not None:
+            value = cache.get(vault, name, version)
+            if value is not None:
+                return value
+
+        try:
+            value = await self.client.get_secret_value(name, version)
+        except AzureError as e:
+            self.log(f"Failed to fetch the value of {name}: {e}")
+            await self.post_message_from_child(
+                ShowFlashNotification(
+                    self,
+                    type=FlashMessageType.ERROR,
+                    value=f"Unable to fetch the value of {name} and it is not cached.",
+                )
+            )
+            return ""
+
+        if cache is not None and value is not None:
+            cache.put(vault, name, version, value)
+
+        return value
 
     def on_key(self, event: events.Key) -> None:
         """Handle a key press.
@@ -106,13 +147,16 @@ class SecretPropertiesWidget(Widget):
                     driver.exit_event.clear()
                     driver.start_application_mode()
 
-        self.refresh(layout=True)
+                self.app.frames.request(self, force=True)
+                return
+
+        self.app.frames.request(self, layout=True)
 
     def render_table(self) -> None:
         """Renders the table."""
 
         self.renderable = SecretPropertiesRenderable(
-            properties=self.selected_version,
+            properties=self.view_model,
             value=self.value if self.reveal_secret_value else "",
         )
 
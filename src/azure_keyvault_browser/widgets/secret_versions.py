@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+from typing import Sequence
+
 from rich.console import RenderableType
 from rich.panel import Panel
 from rich.style import Style
@@ -9,8 +12,11 @@ from textual.reactive import Reactive, watch
 from textual.widget import Widget
 
 from .. import styles
-from ..azure import KeyVault, SecretProperties
+from ..azure import SecretBackend, SecretProperties
 from ..renderables import SecretVersionsTableRenderable
+from ..sorting import VersionHistory
+from ..viewmodels import SecretVersionsTableViewModel
+from .flash import FlashMessageType, ShowFlashNotification
 
 
 class SecretVersionsWidget(Widget):
@@ -21,16 +27,21 @@ class SecretVersionsWidget(Widget):
     page: int = 1
     row: int = 0
 
+    # The number of versions the service returns per page. The table is refreshed once per page while loading.
+    batch_size: int = 25
+
     def __init__(self) -> None:
         """A secret versions widget. Used to display versions of a secret."""
 
         name = self.__class__.__name__
         super().__init__(name=name)
-        self.versions: list[SecretProperties] = []
+        self.versions: Sequence[SecretProperties] = []
+        self.rows = SecretVersionsTableViewModel(self.versions)
         self.version_map: dict[str, SecretProperties] = {}
         self.renderable: SecretVersionsTableRenderable | None = None
+        self.loading: asyncio.Task | None = None
         self.reveal: bool
-        self.client: KeyVault = self.app.client
+        self.client: SecretBackend = self.app.client
 
     def on_focus(self) -> None:
         """Sets has_focus to true when the item is clicked."""
@@ -50,23 +61,86 @@ class SecretVersionsWidget(Widget):
     async def clear(self) -> None:
         """Clears the widget."""
 
+        self.cancel()
         self.versions = []
+        self.rows = SecretVersionsTableViewModel(self.versions)
         self.renderable = None
-        self.refresh(layout=True)
+        self.app.frames.request(self, layout=True)
+
+    def cancel(self) -> None:
+        """Stop loading the versions of the previously selected secret."""
+
+        if self.loading is not None:
+            self.loading.cancel()
+            self.loading = None
 
     async def update(self, secret_name: str) -> None:
         """Updates the widget with new secret version info.
 
+        The versions are loaded in the background so that the first page can be shown while a long history is still
+        being listed.
+
         Args:
             secret_name (str): The secret name.
         """
 
         if secret_name:
-            self.versions = await self.client.get_secret_versions(secret_name)
-            self.version_map = {v.version: v for v in self.versions}
+            self.cancel()
+            self.page = 1
+            self.row = 0
+            self.renderable = None
+            self.loading = asyncio.create_task(self.load(secret_name))
             await self.app.set_focus(self)
 
-        self.refresh(layout=True)
+        self.app.frames.request(self, layout=True)
+
+    async def load(self, secret_name: str) -> None:
+        """Stream the versions of a secret into the table, refreshing it after each page.
+
+        Args:
+            secret_name (str): The secret name.
+
+        Raises:
+            asyncio.CancelledError: If loading is stopped, such as when another secret is selected.
+        """
+
+        history = VersionHistory(max(self.size.height - 5, self.batch_size))
+        self.versions = history
+        self.version_map = {}
+        self.rows = SecretVersionsTableViewModel(history)
+
+        # Pinned secrets may have had their versions fetched when the browser started.
+        prefetched = self.app.prefetched.pop(secret_name, None)
+
+        try:
+            if prefetched is not None:
+                for version in prefetched:
+                    history.add(version)
+                    self.version_map[version.version or ""] = version
+                return
+
+            async for version in self.client.iter_secret_versions(secret_name):
+                history.add(version)
+                self.version_map[version.version or ""] = version
+                if len(history) % self.batch_size == 0:
+                    self.rows = SecretVersionsTableViewModel(history)
+                    self.app.frames.request(self, layout=True)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.log(f"Failed to list the versions of {secret_name}: {e}")
+            self.post_message_from_child_no_wait(
+                ShowFlashNotification(
+                    self,
+                    value=f"Unable to list every version of {secret_name}.",
+                    type=FlashMessageType.ERROR,
+                )
+            )
+        finally:
+            if self.loading is asyncio.current_task():
+                self.rows = SecretVersionsTableViewModel(history)
+                self.loading = None
+                self.app.frames.request(self, layout=True)
 
     def on_key(self, event: events.Key) -> None:
         """Handle a key press.
@@ -80,8 +154,10 @@ class SecretVersionsWidget(Widget):
 
         key = event.key
         if key == Keys.Enter:
-            row = self.renderable.get_cell_value(0, self.row)
-            self.app.selected_version = self.version_map[str(row)]
+            selected = self.renderable.selected_renderable()
+            if selected is None:
+                return
+            self.app.selected_version = self.version_map[selected[0]]
 
         elif key == Keys.Left:
             self.renderable.previous_page()
@@ -96,14 +172,15 @@ class SecretVersionsWidget(Widget):
         elif key == Keys.Down:
             self.renderable.next_row()
 
-        self.refresh(layout=True)
+        self.app.frames.request(self, layout=True)
 
     def render_table(self) -> None:
         """Render the table."""
 
+        loaded = f" ({len(self.versions)} loaded)" if self.loading else ""
         self.renderable = SecretVersionsTableRenderable(
-            items=self.versions or [],
-            title="versions",
+            rows=self.rows,
+            title=f"versions{loaded}",
             page_size=self.size.height - 5,
             page=self.page,
             row=self.row,
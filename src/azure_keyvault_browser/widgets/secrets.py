@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+from collections import Counter
+from datetime import timezone
+from typing import Sequence
+
+import click
+import toml
 from rich.console import RenderableType
 from rich.panel import Panel
 from rich.style import Style
@@ -9,8 +16,27 @@ from textual.reactive import Reactive, watch
 from textual.widget import Widget
 
 from .. import styles
-from ..azure import KeyVault, SecretProperties
-from ..renderables import SecretsTableRenderable
+from ..azure import SecretBackend, SecretProperties
+from ..bulk import BulkUpdater, PropertyChange, UpdateStatus
+from ..renderables import SecretsTableRenderable, SecretsTreeRenderable
+from ..search import SearchCursor
+from ..sorting import SortedView, SortKey
+from ..timeline import AS_OF_PREFIX
+from ..tree import DEFAULT_DELIMITERS, SecretTree, TreeNode
+from ..viewmodels import LazyItems, SecretsTableViewModel, SecretsTreeViewModel
+from .flash import FlashMessageType, ShowFlashNotification
+
+BULK_UPDATE_TEMPLATE = """# Bulk update {count} selected secrets.
+# Uncomment and edit the properties to change, then save and quit.
+# Secrets that already match are left untouched.
+#
+# enabled = true
+# expires_on = 2030-01-01T00:00:00Z
+# remove_tags = ["obsolete"]
+#
+# [tags]
+# owner = "platform"
+"""
 
 
 class SecretsWidget(Widget):
@@ -26,9 +52,26 @@ class SecretsWidget(Widget):
 
         name = self.__class__.__name__
         super().__init__(name=name)
-        self.secrets: list[SecretProperties] = []
-        self.renderable: SecretsTableRenderable | None = None
-        self.client: KeyVault = self.app.client
+        self.secrets: Sequence[SecretProperties] = []
+        self.rows: SecretsTableViewModel | SecretsTreeViewModel = SecretsTableViewModel(
+            self.secrets
+        )
+        self.secret_map: dict[str, SecretProperties] = {}
+        self.lower_names: dict[str, str] = {}
+        self.matches: set[str] | None = None
+        self.cursor: SearchCursor | None = None
+        self.ranked = False
+        self.sorted_view = SortedView()
+        self.generation = 0
+        self.selected: set[str] = set()
+        self.pinned: list[str] = list(self.app.pinned)
+        self.pinned_names = set(self.pinned)
+        self.renderable: SecretsTableRenderable | SecretsTreeRenderable | None = None
+        self.client: SecretBackend = self.app.client
+        self.tree: SecretTree | None = None
+        self.tree_view = False
+        if self.app.config.get("tree_view", False):
+            self.toggle_tree()
 
     def on_focus(self) -> None:
         """Sets has_focus to true when the item is clicked."""
@@ -43,28 +86,215 @@ class SecretsWidget(Widget):
     async def on_mount(self) -> None:
         """Actions that are executed when the widget is mounted."""
 
-        self.secrets = await self.client.get_secrets()
-        self.app.searchable_nodes = self.secrets
+        if self.app.as_of is None:
+            # When the browser starts in the past, the app fills the dataset once the version histories are in.
+            secrets = await self.client.get_secrets()
+            self.app.dataset.reset(secrets)
+            self.app.dataset_generation = self.app.dataset.generation
 
+        watch(self.app, "dataset_generation", self.sync)
         watch(self.app, "search_result", self.update)
 
-    async def update(self, search_result: list[str]) -> None:
+    async def sync(self, generation: int) -> None:
+        """Apply the changes made to the listed secrets since the widget last synced.
+
+        Args:
+            generation (int): The generation of the dataset.
+        """
+
+        dataset = self.app.dataset
+        changes = dataset.changes_since(self.generation)
+        self.generation = dataset.generation
+
+        if changes is None:
+            self.secret_map = {x.name: x for x in dataset if x.name}
+            self.lower_names = {x.lower(): x for x in self.secret_map}
+            self.sorted_view.build(list(self.secret_map.values()))
+            if self.tree is not None:
+                self.tree.build(self.secret_map.values())
+        elif not changes:
+            return
+        else:
+            for name in changes.removed:
+                if self.app.history is not None:
+                    self.app.history.forget(name)
+                self.secret_map.pop(name, None)
+                self.lower_names.pop(name.lower(), None)
+                self.sorted_view.remove(name)
+                self.selected.discard(name)
+                if self.tree is not None:
+                    self.tree.remove(name)
+
+            for name, properties in [*changes.added.items(), *changes.updated.items()]:
+                self.secret_map[name] = properties
+                self.lower_names[name.lower()] = name
+                self.sorted_view.add(properties)
+                if self.tree is not None:
+                    self.tree.add(properties)
+
+        if self.cursor is not None:
+            # The cursor reads a snapshot of the name index, which may still list removed secrets. Hold on to the
+            # matches until the filter searches the updated index.
+            self.matches = self.resolve_names(self.cursor.names())
+            self.cursor.close()
+            self.cursor = None
+
+        self.apply_sort()
+        self.app.frames.request(self, layout=True)
+
+    async def update(self, search_result: Sequence[str]) -> None:
         """Update the widget with the search result.
 
         Args:
-            search_result (list[str]): A list of secret names that match the search.
+            search_result (Sequence[str]): The lowercased names of the secrets that match the search. A search cursor
+                is paged lazily, ranked by score until another sort order is picked.
         """
 
-        if len(search_result) > 0:
-            if search_result[0] == "none":
-                self.secrets = self.app.searchable_nodes
-            else:
-                self.secrets = [
-                    x for x in self.secrets if x.name.lower() in search_result
-                ]
+        if self.cursor is not None and self.cursor is not search_result:
+            self.cursor.close()
+        self.cursor = None
+        self.matches = None
+
+        if isinstance(search_result, SearchCursor):
+            self.cursor = search_result
+            self.ranked = True
+        elif len(search_result) > 0 and search_result[0] != "none":
+            self.matches = self.resolve_names(search_result)
+
+        self.apply_sort()
+        self.app.frames.request(self, layout=True)
+
+    def resolve_names(self, names: Sequence[str]) -> set[str]:
+        """Map lowercased names from a search to the names of listed secrets.
+
+        Args:
+            names (Sequence[str]): The lowercased names.
+
+        Returns:
+            set[str]: The names of the listed secrets.
+        """
+
+        return {self.lower_names[x] for x in names if x in self.lower_names}
+
+    def apply_sort(self) -> None:
+        """Order the current secrets using the active sort key."""
+
+        key = self.sorted_view.key
+        date_field = key.value if key is SortKey.EXPIRES_ON else "updated_on"
+        date_label = key.label if key is SortKey.EXPIRES_ON else "last updated"
+
+        if self.tree is not None and self.tree_view:
+            # The tree is always ordered by name and only lists the expanded branches, so it is not sorted here.
+            matches = self.matches
+            if self.cursor is not None:
+                matches = self.resolve_names(self.cursor.names())
+            self.rows = SecretsTreeViewModel(
+                self.tree.rows(matches, reverse=self.sorted_view.reverse),
+                date_field=date_field,
+                date_label=date_label,
+            )
+            return
+
+        if self.cursor is not None:
+            names = self.cursor.sorted(
+                None if self.ranked else key.value,
+                reverse=not self.ranked and self.sorted_view.reverse,
+                page_size=max(self.size.height - 5, 0) or None,
+            )
+            self.secrets = LazyItems(
+                names, lambda x: self.secret_map[self.lower_names[x]]
+            )
         else:
-            self.secrets = self.app.searchable_nodes
-        self.refresh(layout=True)
+            ordered = self.sorted_view.sort(self.matches)
+            if self.pinned and self.matches is None:
+                # The secrets opened most often stay at the top of the full listing, whatever the sort order.
+                pinned = [x for x in self.pinned if x in self.secret_map]
+                unpinned = [x for x in ordered if x not in self.pinned_names]
+                ordered = pinned + unpinned
+            self.secrets = [self.secret_map[x] for x in ordered]
+
+        self.rows = SecretsTableViewModel(
+            self.secrets, date_field=date_field, date_label=date_label
+        )
+
+    def toggle_tree(self) -> None:
+        """Switch between listing the secrets and showing them as a tree of their names.
+
+        The tree is built the first time it is shown and is kept up to date from then on.
+        """
+
+        if self.tree is None:
+            self.tree = SecretTree(
+                self.app.config.get("tree_delimiters", DEFAULT_DELIMITERS)
+            )
+            self.tree.build(self.secret_map.values())
+
+        self.tree_view = not self.tree_view
+        self.renderable = None
+        self.page = 1
+        self.row = 0
+        self.apply_sort()
+
+    def selected_name(self) -> str | None:
+        """The name of the secret on the selected row.
+
+        Returns:
+            str | None: The name, or None if no row is selected or the row is a branch of the tree.
+        """
+
+        if self.renderable is None:
+            return None
+
+        selected = self.renderable.selected_renderable()
+        if selected is None:
+            return None
+        if isinstance(self.renderable, SecretsTreeRenderable):
+            return selected[1] or None
+        return selected[0]
+
+    def selected_node(self) -> TreeNode | None:
+        """The node of the tree on the selected row.
+
+        Returns:
+            TreeNode | None: The node, or None if no row is selected or the secrets are not shown as a tree.
+        """
+
+        if self.tree is None or not isinstance(self.renderable, SecretsTreeRenderable):
+            return None
+
+        selected = self.renderable.selected_renderable()
+        return self.tree.find(selected[0]) if selected is not None else None
+
+    def selected_branch(self) -> set[str] | None:
+        """The names of the secrets in the branch of the tree on the selected row.
+
+        Returns:
+            set[str] | None: The names that match the filter, or None if the selected row is not a branch.
+        """
+
+        node = self.selected_node()
+        if node is None or not node.children:
+            return None
+
+        names = set(node.names())
+        if self.cursor is not None:
+            return names & self.resolve_names(self.cursor.names())
+        return names if self.matches is None else names & self.matches
+
+    def toggle_branch(self) -> bool:
+        """Expand or collapse the branch of the tree on the selected row.
+
+        Returns:
+            bool: Whether the selected row is a branch.
+        """
+
+        node = self.selected_node()
+        if node is None or not node.children:
+            return False
+
+        node.expanded = not node.expanded
+        self.apply_sort()
+        return True
 
     def on_key(self, event: events.Key) -> None:
         """Handle a key press.
@@ -80,9 +310,19 @@ class SecretsWidget(Widget):
 
         if key == Keys.Enter:
 
-            row = self.renderable.get_cell_value(0, self.row)
-            self.app.selected_secret = row
-            self.app.selected_version = ""
+            name = self.selected_name()
+            # A secret can also be a branch, such as payments when there is a payments--db, so it opens and toggles.
+            if self.toggle_branch():
+                self.app.frames.request(self, layout=True)
+            if name is None:
+                return
+            self.app.selected_secret = name
+            # In the past, the listed properties are those of the version that was current, so show it straight away.
+            self.app.selected_version = (
+                self.secret_map.get(name, "") if self.app.as_of else ""
+            )
+            if self.app.history is not None:
+                self.app.history.record(name)
 
         if key == Keys.Left:
             self.renderable.previous_page()
@@ -96,19 +336,181 @@ class SecretsWidget(Widget):
             self.renderable.previous_row()
         elif key == Keys.Down:
             self.renderable.next_row()
+        elif key == " ":
+            branch = self.selected_branch()
+            name = self.selected_name()
+            if branch is not None:
+                # Selecting a branch selects every secret under it, or clears them if they are all selected.
+                self.selected = (
+                    self.selected - branch
+                    if branch <= self.selected
+                    else self.selected | branch
+                )
+            elif name is not None:
+                self.selected ^= {name}
+        elif key == "a":
+            if self.cursor is not None:
+                names = self.resolve_names(self.cursor.names())
+            elif self.tree_view:
+                names = set(self.secret_map) if self.matches is None else self.matches
+            else:
+                names = {x.name for x in self.secrets if x.name}
+            self.selected = set() if names <= self.selected else self.selected | names
+        elif key == "t":
+            self.toggle_tree()
+        elif key == Keys.ControlU:
+            self.edit_selected()
+        elif key == "s":
+            if self.ranked and self.cursor is not None:
+                # The first press leaves the ranking for the active sort key, then the keys are cycled as usual.
+                self.ranked = False
+            else:
+                self.sorted_view.key = self.sorted_view.key.next()
+            self.apply_sort()
+        elif key == "r":
+            self.ranked = False
+            self.sorted_view.reverse = not self.sorted_view.reverse
+            self.apply_sort()
+
+        self.app.frames.request(self, layout=True)
+
+    def edit_selected(self) -> None:
+        """Open an editor to describe a change for the selected secrets and apply it."""
+
+        if self.app.as_of is not None:
+            self.post_message_from_child_no_wait(
+                ShowFlashNotification(
+                    self,
+                    type=FlashMessageType.WARNING,
+                    value=f"Secrets cannot be changed in the past. Search for {AS_OF_PREFIX}now to return.",
+                )
+            )
+            return
 
-        self.refresh(layout=True)
+        if not self.selected:
+            self.post_message_from_child_no_wait(
+                ShowFlashNotification(
+                    self,
+                    type=FlashMessageType.WARNING,
+                    value="No secrets selected. Press space to select a secret.",
+                )
+            )
+            return
+
+        driver = self.app._driver
+        try:
+            driver.exit_event.set()
+            text = click.edit(
+                BULK_UPDATE_TEMPLATE.format(count=len(self.selected)),
+                extension=".toml",
+            )
+        finally:
+            driver.exit_event.clear()
+            driver.start_application_mode()
+            self.app.frames.request(self, force=True)
+
+        if not text:
+            return
+
+        try:
+            change = PropertyChange.from_dict(toml.loads(text))
+        except (toml.TomlDecodeError, ValueError) as e:
+            self.post_message_from_child_no_wait(
+                ShowFlashNotification(
+                    self, type=FlashMessageType.ERROR, value=f"Invalid change: {e}"
+                )
+            )
+            return
+
+        if change:
+            asyncio.ensure_future(self.bulk_update(change))
+
+    async def bulk_update(self, change: PropertyChange) -> None:
+        """Apply a change to the selected secrets. Secrets that fail remain selected so the change can be retried.
+
+        Args:
+            change (PropertyChange): The change to apply.
+        """
+
+        items = [self.secret_map[x] for x in self.selected if x in self.secret_map]
+        await self.post_message_from_child(
+            ShowFlashNotification(
+                self,
+                type=FlashMessageType.INFO,
+                value=f"Updating {len(items)} secrets...",
+            )
+        )
+
+        totals: Counter = Counter()
+        failed = set()
+        updated = []
+        updater = BulkUpdater(self.client)
+        async for result in updater.apply(items, change):
+            totals[result.status] += 1
+            if result.status is UpdateStatus.FAILED:
+                failed.add(result.name)
+                self.log(f"Failed to update {result.name}: {result.error}")
+            elif result.properties is not None:
+                updated.append(result.properties)
+
+        self.selected = failed
+        self.app.dataset.apply(updated=updated)
+        self.app.dataset_generation = self.app.dataset.generation
+        self.app.frames.request(self, layout=True)
+
+        summary = (
+            f"{totals[UpdateStatus.UPDATED]} updated, "
+            f"{totals[UpdateStatus.UNCHANGED]} unchanged, "
+            f"{totals[UpdateStatus.FAILED]} failed."
+        )
+        if failed:
+            summary += " Failed secrets are still selected, press ctrl+u to retry."
+
+        await self.post_message_from_child(
+            ShowFlashNotification(
+                self,
+                type=FlashMessageType.ERROR if failed else FlashMessageType.SUCCESS,
+                value=summary,
+            )
+        )
 
     def render_table(self) -> None:
         """Renders the build history table."""
 
-        self.renderable = SecretsTableRenderable(
-            items=self.secrets,
-            title="secrets",
-            page_size=self.size.height - 5,
-            page=self.page,
-            row=self.row,
-        )
+        direction = "↓" if self.sorted_view.reverse else "↑"
+        if self.tree_view:
+            title = f"secrets tree {direction} name"
+        elif self.ranked and self.cursor is not None:
+            title = "secrets ↓ relevance"
+        else:
+            title = f"secrets {direction} {self.sorted_view.key.label}"
+        if self.app.as_of is not None:
+            title += (
+                f" · as of {self.app.as_of.astimezone(timezone.utc):%Y-%m-%d %H:%M} UTC"
+            )
+        if self.selected:
+            title += f" · {len(self.selected)} selected"
+
+        if isinstance(self.rows, SecretsTreeViewModel):
+            self.renderable = SecretsTreeRenderable(
+                rows=self.rows,
+                title=title,
+                page_size=self.size.height - 5,
+                page=self.page,
+                row=self.row,
+                selected=self.selected,
+                pinned=self.pinned_names,
+            )
+        else:
+            self.renderable = SecretsTableRenderable(
+                rows=self.rows,
+                title=title,
+                page_size=self.size.height - 5,
+                page=self.page,
+                row=self.row,
+                selected=self.selected,
+                pinned=self.pinned_names,
+            )
 
     def render(self) -> RenderableType:
         """Render the widget.
@@ -122,7 +524,7 @@ class SecretsWidget(Widget):
             self.row = self.renderable.row
 
         self.render_table()
-        assert isinstance(self.renderable, SecretsTableRenderable)
+        assert self.renderable is not None
         return Panel(
             renderable=self.renderable,
             title=f"[{styles.GREY}]( {self.renderable.title} )[/]",